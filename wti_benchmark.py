@@ -0,0 +1,617 @@
+"""
+.. module:: wti_benchmark
+   :platform: Unix
+   :synopsis: Erzeugt synthetische WTI-XML-Dateien und misst den Durchsatz von wti_convert
+
+Das Script muss im selben Verzeichnis wie `wti_convert.py` ausgeführt werden (dort wird auch der Ordner
+'logs/' erwartet).
+
+"""
+
+import os
+import sys
+import json
+import gzip
+import time
+import random
+import shutil
+import filecmp
+import logging
+import tempfile
+from lxml import etree
+import isbnlib
+import wti_convert
+
+
+class Constants(object):
+  NUM_DOCS = 2000
+  CHECK_DOCS = 12000
+  NUM_FILES = 1
+  REPEAT = 3
+  SEED = 1
+  TOLERANCE = 0.1
+  CORPUS_FNAME = 'wti_synthetic'
+  USAGE_STRING = "Usage: 'python3 wti_benchmark.py [--generate directory/] [--docs N] [--files N] [--seed N] [--gzip] [--repeat N] [--workers N] [--json file] [--baseline file] [--tolerance F] [--check_split]"
+
+
+log = wti_convert.log
+
+# Synthetic corpus
+
+NAMESPACES = ' '.join('xmlns:' + prefix + '="' + uri + '"' for prefix, uri in sorted(wti_convert.NAMESPACES.items()))
+
+GENRES = ('J', 'J', 'J', 'CA', 'CA', 'B', 'R')
+TYPES = ('A', 'A', 'M', 'C')
+LANGUAGES = (('639-1', 'EN'), ('639-1', 'EN'), ('639-1', 'DE'), ('639-1', 'FR'), ('639-2', 'GER'), ('639-1', 'sp'), ('639-1', 'xx'))
+TITLE_LANGUAGES = ('EN', 'EN', 'DE')
+SYNONYM_TYPES = ('DES', 'DES', 'DES', 'SUP', 'NP')
+PAGES = ('1-10', '5', '12-20', '233-241', 'S. 7')
+PUBLISHERS = ('Springer', 'Elsevier', 'VDI Verlag', 'Wiley-VCH')
+PLACES = ('Berlin', 'Amsterdam', 'Düsseldorf', 'Weinheim')
+WORDS = ('Wasserstoff', 'Korrosion', 'Brennstoffzelle', 'Stahl', 'Polymer', 'Sensor', 'Emission', 'Werkstoff',
+         'hydrogen', 'corrosion', 'fuel cell', 'steel', 'polymer', 'sensor', 'emission', 'material')
+MARKUP = ('H<sub>2</sub>O', 'CO<sub>2</sub>', 'm<sup>2</sup>', 'x<sup>-1</sup>', 'NO<sub>x</sub>')
+
+
+def _isbn13(rnd):
+  digits = '978' + ''.join(rnd.choice('0123456789') for _ in range(9))
+
+  return digits + isbnlib.check_digit13(digits)
+
+
+def _words(rnd, num):
+  return ' '.join(rnd.choice(WORDS) for _ in range(num))
+
+
+def _escape(text):
+  return text.replace('&', '&amp;').replace('<', '&lt;')
+
+
+def _identifiers(rnd):
+  parts = []
+
+  for _ in range(rnd.randint(0, 3)):
+    id_type = rnd.choice(('isbn10', 'isbn13', 'isbn', 'issn', 'eissn'))
+
+    if id_type == 'isbn13':
+      value = _isbn13(rnd)
+
+    elif id_type == 'isbn10':
+      value = isbnlib.to_isbn10(_isbn13(rnd))
+
+    elif id_type == 'isbn':
+      value = rnd.choice((_isbn13(rnd), isbnlib.to_isbn10(_isbn13(rnd)), '3-12345'))
+
+    else:
+      value = '%04d-%04d' % (rnd.randint(0, 9999), rnd.randint(0, 9999))
+
+    parts.append('<identifier type="' + id_type + '">' + value + '</identifier>')
+
+  # ISBN-10 und ISBN-13 desselben Titels, die von `_match_isbns()` zusammengeführt werden
+  if rnd.random() < 0.2:
+    isbn13 = _isbn13(rnd)
+    parts.append('<identifier type="isbn13">' + isbn13 + '</identifier>')
+    parts.append('<identifier type="isbn10">' + isbnlib.to_isbn10(isbn13) + '</identifier>')
+
+  return parts
+
+
+def generate_document(rnd, num):
+  """
+  Erzeugt ein synthetisches `<document>` im WTI-Format.
+
+  Die Anteile der einzelnen Elemente (Gattungen, ISBN/ISSN-Kombinationen, Deskriptoren, Abstracts mit
+  `<sub>`/`<sup>`, Konferenzen usw.) orientieren sich grob an den realen Lieferungen.
+
+  :param rnd: Der Zufallsgenerator
+  :type rnd: random.Random
+  :param num: Die laufende Nummer des Titels (für die `documentID`)
+  :type num: int
+  :returns: str
+  """
+
+  dependent = rnd.random() < 0.7
+  genre = rnd.choice(GENRES)
+  parts = ['<document><systemInfo><documentID>TEMA%08d</documentID>' % num]
+
+  if rnd.random() < 0.5:
+    parts.append('<metadataCopyright><dc:rights>Copyright WTI-Frankfurt eG</dc:rights></metadataCopyright>')
+
+  parts.append('</systemInfo><formalInfo><documentTypes><documentAdvancedType>')
+  parts.append('<documentGenreGroup><documentGenre><documentGenreCode>' + genre + '</documentGenreCode></documentGenre></documentGenreGroup>')
+  parts.append('<documentTypeGroup><documentType><documentTypeCode>' + rnd.choice(TYPES) + '</documentTypeCode></documentType></documentTypeGroup>')
+  parts.append('</documentAdvancedType></documentTypes>')
+
+  if rnd.random() < 0.4:
+    parts.append('<copyright><dc:rights>(c) ' + rnd.choice(PUBLISHERS) + '</dc:rights></copyright>')
+
+  if rnd.random() < 0.5:
+    parts.append('<sizes><size>%d S.</size></sizes>' % rnd.randint(1, 400))
+
+  parts.append('<identifiers>')
+  parts.extend(_identifiers(rnd))
+  parts.append('</identifiers><documentLanguages>')
+
+  for _ in range(rnd.randint(1, 2)):
+    iso, code = rnd.choice(LANGUAGES)
+    parts.append('<documentLanguage><languageCodes><code iso="' + iso + '">' + code + '</code></languageCodes></documentLanguage>')
+
+  parts.append('</documentLanguages>')
+
+  if rnd.random() < 0.6:
+    subtype = rnd.choice(('doi', 'doi', 'html'))
+    parts.append('<locations><location type="url" subtype="' + subtype + '">https://doi.org/10.1000/%d</location></locations>' % num)
+
+  parts.append('</formalInfo><bibliographicInfo dependend="' + ('true' if dependent else 'false') + '">')
+
+  if rnd.random() < 0.97:
+    title = _escape(_words(rnd, rnd.randint(3, 12)).capitalize())
+
+    if rnd.random() < 0.3:
+      title += ' ' + rnd.choice(MARKUP)
+
+    parts.append('<dc:title xml:lang="' + rnd.choice(TITLE_LANGUAGES) + '">' + title + ' &amp; %d</dc:title>' % num)
+
+  if rnd.random() < 0.3:
+    parts.append('<alternativeTitles><alternativeTitle xml:lang="DE">' + _words(rnd, 5) + ' ' + rnd.choice(MARKUP) + '</alternativeTitle></alternativeTitles>')
+
+  parts.append('<abstracts>')
+
+  for _ in range(rnd.randint(0, 2)):
+    copyright = ' copyright="(c) WTI"' if rnd.random() < 0.5 else ''
+    text = _words(rnd, rnd.randint(30, 120))
+
+    if rnd.random() < 0.5:
+      text += ' ' + rnd.choice(MARKUP) + ' ' + _words(rnd, 10)
+
+    parts.append('<abstract xml:lang="' + rnd.choice(TITLE_LANGUAGES) + '"' + copyright + '>' + text + '</abstract>')
+
+  parts.append('</abstracts>')
+
+  if rnd.random() < 0.5:
+    parts.append('<authorsAffiliations><authorAffiliation><affiliation>Universität ' + rnd.choice(PLACES) + '</affiliation></authorAffiliation></authorsAffiliations>')
+
+  parts.append('<creators>')
+
+  for _ in range(rnd.randint(0, 5)):
+    parts.append('<creator><dc:creator>' + rnd.choice(('Müller', 'Schmidt', 'Smith', 'Doe')) + ', ' + rnd.choice(('A.', 'Jane', 'Klaus')) + '</dc:creator></creator>')
+
+  parts.append('</creators><additionalDocumentInfo>')
+
+  if rnd.random() < 0.7:
+    parts.append('<articleInfo><pages>' + rnd.choice(PAGES) + '</pages></articleInfo>')
+
+  if dependent and rnd.random() < 0.9:
+    parts.append('<journalInfo>')
+
+    if rnd.random() < 0.9:
+      parts.append('<dc:title>Journal of ' + _words(rnd, 2) + '</dc:title>')
+
+    parts.append('<volumeNumber>%d</volumeNumber><issueNumber>%d</issueNumber><coverDate>%d</coverDate></journalInfo>' % (rnd.randint(1, 80), rnd.randint(1, 12), rnd.randint(1990, 2020)))
+
+  if genre == 'CA' or rnd.random() < 0.05:
+    parts.append('<conferenceInfos><conferenceInfo><name>Conference on ' + _words(rnd, 3) + ', %d</name>' % rnd.randint(1, 40))
+    parts.append('<place>' + rnd.choice(PLACES) + '</place><dc:date type="begin">2019-05-06</dc:date><dc:date type="end">2019-05-08</dc:date></conferenceInfo></conferenceInfos>')
+
+  parts.append('</additionalDocumentInfo><publicationInfo><dcterms:Issued>%d</dcterms:Issued>' % rnd.randint(1990, 2020))
+
+  if rnd.random() < 0.5:
+    parts.append('<dc:publisher>' + rnd.choice(PUBLISHERS) + '</dc:publisher><publicationPlace>' + rnd.choice(PLACES) + '</publicationPlace>')
+
+  parts.append('</publicationInfo></bibliographicInfo><classificationInfo><classifications><classification classificationName="TEMA">')
+
+  for _ in range(rnd.randint(1, 3)):
+    parts.append('<class><code>%s%d</code></class>' % (rnd.choice(('AB', 'CD', 'EF')), rnd.randint(1, 99)))
+
+  parts.append('</classification></classifications><subjects><subject>' + _words(rnd, 2) + '</subject></subjects></classificationInfo>')
+  parts.append('<functionalInfo><thesaurusTerms><synonyms>')
+
+  for _ in range(rnd.randint(0, 8)):
+    parts.append('<synonym type="' + rnd.choice(SYNONYM_TYPES) + '" xml:lang="' + rnd.choice(('EN', 'DE')) + '">' + _words(rnd, rnd.randint(1, 3)) + '</synonym>')
+
+  parts.append('</synonyms></thesaurusTerms><freeTerms><freeTerm>' + _words(rnd, 2) + '</freeTerm></freeTerms></functionalInfo></document>\n')
+
+  return ''.join(parts)
+
+
+def generate_corpus(out_path, num_docs=Constants.NUM_DOCS, num_files=Constants.NUM_FILES, seed=Constants.SEED, compress=False):
+  """
+  Schreibt synthetische WTI-XML-Dateien mit zusammen `num_docs` Titeln in ein Verzeichnis.
+
+  Bei gleichem `seed` werden byte-identische Dateien erzeugt.
+
+  :param out_path: Das Zielverzeichnis
+  :type out_path: str
+  :param num_docs: Die Gesamtanzahl an Titeln
+  :type num_docs: int
+  :param num_files: Die Anzahl an Dateien, auf die die Titel verteilt werden
+  :type num_files: int
+  :param seed: Der Startwert des Zufallsgenerators
+  :type seed: int
+  :param compress: Eine Flag, ob die Dateien mit gzip komprimiert werden sollen ('.XML.gz')
+  :type compress: bool
+  :returns: list -- die erzeugten Dateinamen inklusive Pfad
+  """
+
+  rnd = random.Random(seed)
+  fnames = []
+  num = 0
+
+  os.makedirs(out_path, exist_ok=True)
+
+  for cur_file in range(num_files):
+    docs_in_file = num_docs // num_files + (1 if cur_file < num_docs % num_files else 0)
+
+    if compress:
+      fpath = os.path.join(out_path, Constants.CORPUS_FNAME + '_%03d.XML.gz' % cur_file)
+      f = gzip.open(fpath, 'wt', encoding='utf-8')
+
+    else:
+      fpath = os.path.join(out_path, Constants.CORPUS_FNAME + '_%03d.xml' % cur_file)
+      f = open(fpath, 'w', encoding='utf-8')
+
+    with f:
+      f.write('<?xml version="1.0" encoding="UTF-8"?>\n<documents ' + NAMESPACES + '>\n')
+
+      for _ in range(docs_in_file):
+        f.write(generate_document(rnd, num))
+        num += 1
+
+      f.write('</documents>\n')
+
+    fnames.append(fpath)
+
+  log.debug("Generated " + str(num) + " documents in " + str(num_files) + " files in " + out_path)
+
+  return fnames
+
+
+# Benchmarks
+
+def _best_time(func, repeat, setup=None):
+  """
+  Führt `func` `repeat`-mal aus und gibt die kürzeste Laufzeit in Sekunden zurück.
+
+  :param func: Die zu messende Funktion
+  :type func: callable
+  :param repeat: Die Anzahl an Durchläufen
+  :type repeat: int
+  :param setup: Eine Funktion, die vor jedem Durchlauf (ungemessen) aufgerufen wird
+  :type setup: callable
+  :returns: float
+  """
+
+  best = None
+
+  for _ in range(repeat):
+    if setup is not None:
+      setup()
+
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+
+    if best is None or elapsed < best:
+      best = elapsed
+
+  return best
+
+
+def _load_documents(fnames):
+  """
+  Parst die erzeugten Dateien vollständig, damit die Einzelschritte ohne Parser gemessen werden können.
+
+  :param fnames: Die Dateinamen inklusive Pfad
+  :type fnames: list
+  :returns: list -- die `<document>`-Elemente
+  """
+
+  documents = []
+
+  for fname in fnames:
+    with wti_convert._open_xml(fname) as f:
+      documents.extend(etree.parse(f).getroot().iterfind('document'))
+
+  return documents
+
+
+def run_benchmarks(corpus_path, fnames, work_path, repeat=Constants.REPEAT, workers=1):
+  """
+  Misst den Durchsatz der einzelnen Verarbeitungsschritte in Titeln pro Sekunde.
+
+  Gemessen werden `process_document()`, das Schreiben mit `write_to_file()` und `PicaWriter` (in allen Formaten), das Sammeln
+  (`collect_stats()`) und Zusammenführen (`StatsAccumulator.merge()`) der Statistiken sowie ein kompletter
+  Durchlauf von `handle_xml()` (mit beiden Engines).
+
+  :param corpus_path: Das Verzeichnis mit den erzeugten XML-Dateien
+  :type corpus_path: str
+  :param fnames: Die erzeugten XML-Dateien inklusive Pfad
+  :type fnames: list
+  :param work_path: Ein leeres Verzeichnis für die Output-Dateien
+  :type work_path: str
+  :param repeat: Die Anzahl an Durchläufen pro Messung (gewertet wird der schnellste)
+  :type repeat: int
+  :param workers: Die Anzahl an Prozessen für `handle_xml()`
+  :type workers: int
+  :returns: dict -- Titel pro Sekunde je Messung
+  """
+
+  documents = _load_documents(fnames)
+  num_docs = len(documents)
+  records = [wti_convert.process_document(document)[0] for document in documents]
+  per_doc_stats = [wti_convert.process_document(document)[1] for document in documents]
+  out_fpath = os.path.join(work_path, wti_convert.Constants.OUTPUT_FNAME)
+  out_path = os.path.join(work_path, 'output') + '/'
+  results = {}
+
+  def reset_output():
+    if os.path.isfile(out_fpath):
+      os.remove(out_fpath)
+
+    shutil.rmtree(out_path, ignore_errors=True)
+    os.makedirs(out_path)
+
+  def bench_process_document():
+    stats = wti_convert.StatsAccumulator()
+
+    for document in documents:
+      wti_convert.process_document(document, stats)
+
+  def bench_write_to_file():
+    for num, record in enumerate(records, 1):
+      wti_convert.write_to_file(record, num, out_fpath)
+
+  def bench_pica_writer(output_format=wti_convert.Constants.OUTPUT_FORMAT):
+    with wti_convert.PicaWriter(out_fpath, output_format=output_format) as writer:
+      for num, record in enumerate(records, 1):
+        writer.write(record, num)
+
+  def bench_collect_stats():
+    stats = wti_convert.StatsAccumulator()
+
+    for document in documents:
+      wti_convert.collect_stats(document, stats)
+
+  def bench_merge_stats():
+    stats = wti_convert.StatsAccumulator()
+
+    for doc_stats in per_doc_stats:
+      stats.merge(doc_stats)
+
+    stats.to_dict()
+
+  def bench_handle_xml(engine=wti_convert.Constants.ENGINE):
+    wti_convert.handle_xml(corpus_path, '', len(fnames), False, False, out_path, workers, engine=engine)
+
+  benchmarks = (
+    ('process_document', bench_process_document, None),
+    ('write_to_file', bench_write_to_file, reset_output),
+    ('PicaWriter', bench_pica_writer, reset_output),
+    ('PicaWriter (normalized)', lambda: bench_pica_writer('normalized'), reset_output),
+    ('PicaWriter (plain)', lambda: bench_pica_writer('plain'), reset_output),
+    ('collect_stats', bench_collect_stats, None),
+    ('StatsAccumulator.merge', bench_merge_stats, None),
+    ('handle_xml', bench_handle_xml, reset_output),
+    ('handle_xml (target)', lambda: bench_handle_xml('target'), reset_output)
+  )
+
+  for name, func, setup in benchmarks:
+    elapsed = _best_time(func, repeat, setup)
+    results[name] = round(num_docs / elapsed, 1)
+    print('{:<26} {:>12.1f} records/s  ({:.3f} s)'.format(name, results[name], elapsed))
+
+  return results
+
+
+def check_split(corpus_path, fnames, work_path, workers=2):
+  """
+  Konvertiert eine einzelne XML-Datei einmal seriell und zweimal parallel in Abschnitten (`_handle_split_file()`) und
+  vergleicht die Output-Dateien und die Statistiken mit dem seriellen Lauf. Der zweite parallele Lauf teilt die
+  Datei nur in einen Abschnitt pro Prozess, damit die Abschnitte größer als das Pufferlimit von libxml2 (10 MB) sind.
+
+  :param corpus_path: Das Verzeichnis mit der erzeugten XML-Datei
+  :type corpus_path: str
+  :param fnames: Die erzeugte XML-Datei inklusive Pfad (als Liste)
+  :type fnames: list
+  :param work_path: Ein leeres Verzeichnis für die Output-Dateien
+  :type work_path: str
+  :param workers: Die Anzahl an Prozessen für die parallelen Läufe (mindestens 2)
+  :type workers: int
+  :returns: list -- die Namen der Output-Dateien (bzw. 'stats') der parallelen Läufe, die sich unterscheiden
+  """
+
+  constants = wti_convert.Constants
+  defaults = (constants.CHUNKS_PER_WORKER, constants.CHUNK_BYTES)
+  runs = (
+    ('serial', 1, defaults),
+    ('split', workers, defaults),
+    ('split_large', workers, (1, os.path.getsize(fnames[0])))
+  )
+  results = []
+
+  for name, num, (chunks_per_worker, chunk_bytes) in runs:
+    out_path = os.path.join(work_path, name) + '/'
+    os.makedirs(out_path)
+    constants.CHUNKS_PER_WORKER, constants.CHUNK_BYTES = chunks_per_worker, chunk_bytes
+
+    try:
+      stats = wti_convert.handle_xml(corpus_path, '', len(fnames), False, False, out_path, num)[0]
+
+    finally:
+      constants.CHUNKS_PER_WORKER, constants.CHUNK_BYTES = defaults
+
+    results.append((name, out_path, stats.to_state()))
+
+  serial_path, serial_stats = results[0][1:]
+  differences = []
+
+  for name, out_path, stats in results[1:]:
+    for fname in sorted(set(os.listdir(serial_path)) | set(os.listdir(out_path))):
+      if not os.path.isfile(out_path + fname) or not os.path.isfile(serial_path + fname) or \
+         not filecmp.cmp(serial_path + fname, out_path + fname, shallow=False):
+        differences.append(name + '/' + fname)
+
+    if stats != serial_stats:
+      differences.append(name + '/stats')
+
+  return differences
+
+
+def compare_results(results, baseline, tolerance=Constants.TOLERANCE):
+  """
+  Vergleicht die Messergebnisse mit einem früheren Lauf.
+
+  :param results: Die aktuellen Ergebnisse (Titel pro Sekunde)
+  :type results: dict
+  :param baseline: Die Ergebnisse des Vergleichslaufs
+  :type baseline: dict
+  :param tolerance: Der Anteil, um den eine Messung langsamer sein darf, bevor sie als Regression gilt
+  :type tolerance: float
+  :returns: list -- die Namen der Messungen mit einer Regression
+  """
+
+  regressions = []
+
+  for name, rate in sorted(baseline.items()):
+    if name not in results:
+      continue
+
+    change = results[name] / rate - 1
+
+    if change < -tolerance:
+      log.error("Regression in " + name + ": " + str(results[name]) + " records/s (baseline " + str(rate) + ", " + '{:+.1%}'.format(change) + ")")
+      regressions.append(name)
+
+  return regressions
+
+
+# MAIN
+
+def main(argv):
+  """
+  Erzeugt einen synthetischen Korpus und misst den Durchsatz oder schreibt nur den Korpus (`--generate`).
+
+  :param argv: Die beim Programmstart übergebenen Parameter
+  :type argv: list
+  """
+
+  num_docs = Constants.NUM_DOCS
+  num_files = Constants.NUM_FILES
+  seed = Constants.SEED
+  repeat = Constants.REPEAT
+  workers = 1
+  tolerance = Constants.TOLERANCE
+  generate_path = ""
+  json_fname = ""
+  baseline_fname = ""
+
+  if '--help' in argv or '-h' in argv:
+    print(Constants.USAGE_STRING)
+    sys.exit()
+
+  for idx, arg in enumerate(argv):
+    if arg in ('--docs', '--files', '--seed', '--repeat', '--workers') and len(argv) > idx+1:
+      if not argv[idx+1].isdigit() or int(argv[idx+1]) < 1:
+        print(argv)
+        log.error(arg + " has to be a positive integer!")
+        sys.exit()
+
+      value = int(argv[idx+1])
+
+      if arg == '--docs':
+        num_docs = value
+
+      elif arg == '--files':
+        num_files = value
+
+      elif arg == '--seed':
+        seed = value
+
+      elif arg == '--repeat':
+        repeat = value
+
+      else:
+        workers = value
+
+    if arg == '--generate' and len(argv) > idx+1:
+      generate_path = argv[idx+1]
+
+    if arg == '--json' and len(argv) > idx+1:
+      json_fname = argv[idx+1]
+
+    if arg == '--baseline' and len(argv) > idx+1:
+      if os.path.isfile(argv[idx+1]):
+        baseline_fname = argv[idx+1]
+      else:
+        print(argv)
+        log.error("Baseline file does not exist!")
+        sys.exit()
+
+    if arg == '--tolerance' and len(argv) > idx+1:
+      try:
+        tolerance = float(argv[idx+1])
+      except ValueError:
+        print(argv)
+        log.error("Tolerance has to be a number (e.g. 0.1 for 10%)!")
+        sys.exit()
+
+  if generate_path:
+    generate_corpus(generate_path, num_docs, num_files, seed, '--gzip' in argv)
+    sys.exit()
+
+  if '--check_split' in argv:
+    # Eine unkomprimierte Datei, die größer als das Pufferlimit von libxml2 (10 MB) ist und in mehrere Abschnitte
+    # geteilt wird
+    if '--docs' not in argv:
+      num_docs = Constants.CHECK_DOCS
+
+    tmp_path = tempfile.mkdtemp(prefix='wti_check_')
+
+    try:
+      corpus_path = os.path.join(tmp_path, 'corpus')
+      work_path = os.path.join(tmp_path, 'work')
+      fnames = generate_corpus(corpus_path, num_docs, 1, seed)
+      log.info("Comparing serial and split conversion of " + str(os.path.getsize(fnames[0])) + " bytes..")
+      log.setLevel(logging.ERROR)
+      differences = check_split(corpus_path, fnames, work_path, max(workers, 2))
+
+    finally:
+      shutil.rmtree(tmp_path, ignore_errors=True)
+
+    if differences:
+      log.error("Split conversion differs from serial conversion: " + ", ".join(differences))
+      sys.exit(1)
+
+    print("Split conversion of " + str(num_docs) + " documents is identical to serial conversion")
+    sys.exit()
+
+  # Warnungen zu einzelnen Titeln würden die Messung verfälschen
+  log.setLevel(logging.ERROR)
+
+  tmp_path = tempfile.mkdtemp(prefix='wti_benchmark_')
+
+  try:
+    corpus_path = os.path.join(tmp_path, 'corpus')
+    work_path = os.path.join(tmp_path, 'work')
+    os.makedirs(work_path)
+    fnames = generate_corpus(corpus_path, num_docs, num_files, seed, '--gzip' in argv)
+
+    print('{} documents in {} files, best of {} runs:'.format(num_docs, num_files, repeat))
+    results = run_benchmarks(corpus_path, fnames, work_path, repeat, workers)
+
+  finally:
+    shutil.rmtree(tmp_path, ignore_errors=True)
+
+  if json_fname:
+    with open(json_fname, 'w') as f:
+      json.dump(results, f, indent=2, sort_keys=True)
+
+  if baseline_fname:
+    with open(baseline_fname) as f:
+      regressions = compare_results(results, json.load(f), tolerance)
+
+    if regressions:
+      sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -11,19 +11,36 @@ import os
 from lxml import etree
 import json
 import cgi
-import pycountry
 import html
 import re
-from urllib.parse import urlsplit
+from urllib.parse import urlsplit, quote
 from pprint import pprint
 import statistics
 import logging
+import logging.handlers
 import datetime
 import sys
 import gzip
 import time
+import concurrent.futures
+import collections
+import operator
+import functools
+import itertools
+import heapq
+import mmap
+import cProfile
+import threading
+import queue
+import shutil
+import multiprocessing
+import http.server
+import resource
+import sqlite3
+import hashlib
 import requests
 import isbnlib
+from wti_languages import LANGUAGE_CODES
 
 env = '.'
 if 'VIRTUAL_ENV' in os.environ:
@@ -31,10 +48,30 @@ if 'VIRTUAL_ENV' in os.environ:
 
 class Constants(object):
   STATS_PATH = './statistics/'
+  STATS_FNAME = 'stats.json'
+  MERGED_STATS_PATH = './statistics/merged/'
   HISTORY_FNAME = 'last_run.json'
   OUTPUT_PATH = './output/'
   OUTPUT_FNAME = 'wti_pica'
-  USAGE_STRING = "Usage: 'python3 wti_convert.py ['--stats_only'|'--no_stats'|'--update'] [--in directory/|/path/to/file] [--out directory/]"
+  OUTPUT_FORMAT = 'intern'
+  FORMAT_EXTENSIONS = {'intern': '', 'normalized': '.dat', 'plain': '.pp'}
+  COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+  COMPRESS_LEVELS = {'gzip': 6, 'zstd': 3}
+  MAX_COMPRESS_LEVELS = {'gzip': 9, 'zstd': 22}
+  BACKGROUND_QUEUE_SIZE = 4
+  CHUNKS_PER_WORKER = 4
+  CHUNK_BYTES = 1 << 22
+  WRITE_BUFFER_SIZE = 1 << 20
+  READ_SIZE = 1 << 16
+  DTD_PATH = './dtd/'
+  ENGINE = 'tree'
+  ENGINES = ('tree', 'target')
+  METRICS_INTERVAL = 10
+  CHECKPOINT_INTERVAL = 10000
+  PLAN_FNAME = 'partitions.json'
+  IDENTIFIER_CACHE_SIZE = 1 << 16
+  LANGUAGES_FNAME = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'wti_languages.py')
+  USAGE_STRING = "Usage: 'python3 wti_convert.py ['--stats_only'|'--no_stats'|'--update'] [--in directory/|/path/to/file] [--out directory/] [--workers N] [--buffer_size N] [--format intern|normalized|plain] [--shard_records N] [--shard_bytes N] [--compress gzip|zstd] [--compress_level N] [--index file] [--checkpoint_interval N] [--resume] [--plan N] [--partition k] [--merge] [--plan_file file] [--merge_stats file|directory/ ...] [--dtd directory/] [--huge_tree] [--engine tree|target] [--profile] [--profile_dump file] [--metrics_file file] [--metrics_port N] [--metrics_interval N] [--update_languages]"
 
 # Logging
 
@@ -52,994 +89,4369 @@ formatter = logging.Formatter('%(asctime)s %(levelname)s - %(message)s')
 ch.setFormatter(formatter)
 log.addHandler(ch)
 
+_log_queue = None
+_log_listener = None
+_log_handlers = []
 
-def _match_isbns(isbn10, isbn13):
+
+def _start_log_listener():
   """
-  Versucht aus getrennten Listen von ISBN-10 und ISBN-13 Paare zu bilden.
+  Leitet alle Log-Einträge über eine Queue an die Datei- und Konsolen-Handler weiter, die in einem
+  Hintergrund-Thread schreiben. So blockiert das Loggen die Konvertierung nicht.
 
-  :param isbn10: Liste mit ISBN-10
-  :type isbn10: list
-  :param isbn13: Liste mit ISBN-13
-  :type isbn13: list
+  Die Queue ist eine `multiprocessing.Queue`, damit auch die Worker-Prozesse (siehe `_init_worker()`) in sie
+  schreiben können.
   """
-  pairs = []
-  i10_matched = []
+  global _log_queue, _log_listener, _log_handlers
 
-  for i13 in isbn13:
-    short13 = i13[4:-2]
-    match = False
+  _log_handlers = log.handlers[:]
+  _log_queue = multiprocessing.Queue()
 
-    for index, i10 in enumerate(isbn10):
-      short10 = i10[:-2]
+  for handler in _log_handlers:
+    log.removeHandler(handler)
 
-      if short13 == short10:
-        pairs.append({'004A': [{'0': i10},{'A': i13}]})
-        i10_matched.append(index)
-        match = True
-        break
+  log.addHandler(logging.handlers.QueueHandler(_log_queue))
+  _log_listener = logging.handlers.QueueListener(_log_queue, *_log_handlers, respect_handler_level=True)
+  _log_listener.start()
 
-    if match == False:
-      pairs.append({'004A': [{'A': i13}]})
 
-  for index, i10 in enumerate(isbn10):
-    if index not in i10_matched:
-      pairs.append({'004A': [{'0': i10}]})
+def _stop_log_listener():
+  """
+  Schreibt die restlichen Einträge der Queue und hängt die Handler wieder direkt an den Logger.
+  """
+  global _log_queue, _log_listener
 
-  return pairs
+  if _log_listener is None:
+    return
 
+  _log_listener.stop()
 
+  for handler in log.handlers[:]:
+    if isinstance(handler, logging.handlers.QueueHandler):
+      log.removeHandler(handler)
 
-def _process_tails(node):
-  """
-  Verarbeitet mögliche HTML-Tags in einem XML-Knoten
+  for handler in _log_handlers:
+    log.addHandler(handler)
+
+  _log_queue.close()
+  _log_queue = None
+  _log_listener = None
 
-  :param node: Der zu untersuchende XML-Knoten
-  :type node: etree._Element
-  :returns: str
 
+def _init_worker(log_queue):
   """
-  c_node = node.text
+  Initialisiert einen Worker-Prozess: Log-Einträge werden an die Queue des Hauptprozesses geschickt, statt
+  (gleichzeitig mit anderen Prozessen) direkt in die Log-Datei geschrieben zu werden.
 
-  tails = node.xpath('child::*')
-  if tails is not None and len(tails) > 0:
-    c_node = ''.join(("<" + child.tag + ">" + child.text + "</" + child.tag + ">" if child.tag is not None and child.tag in ["sub","sup"] and child.text is not None else "") if isinstance(child, etree._Element) else str(child) for child in node.xpath('child::*|text()'))
+  :param log_queue: Die Queue aus `_start_log_listener()` oder `None`, wenn die Handler direkt schreiben
+  :type log_queue: multiprocessing.Queue
+  """
 
-  return c_node
+  if log_queue is None:
+    return
 
+  for handler in log.handlers[:]:
+    log.removeHandler(handler)
 
+  log.addHandler(logging.handlers.QueueHandler(log_queue))
 
-def _decide_material(dep, url, genres):
-  """
-  Diese Funktion generiert den Materialcode (002@) aus Angaben im XML.
 
-  :param dep: Abhängigkeit
-  :type dep: bool
-  :param url: Wurde eine URL gefunden?
-  :type url: bool
-  :param genres: Liste von documentGenreCodes
-  :type genres: list
-  :returns: str -- der Materialcode
+def _worker_pool(workers):
+  """
+  Gibt einen Pool von Worker-Prozessen zurück, die mit `_init_worker()` initialisiert werden.
 
+  :param workers: Die Anzahl an Prozessen
+  :type workers: int
+  :returns: concurrent.futures.ProcessPoolExecutor
   """
 
-  code = ["","","x"]
+  return concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(_log_queue,))
 
-  if url:
-    code[0] = 'O'
 
-  else:
-    code[0] = 'A'
+class WarningSummary(object):
+  """
+  Sammelt wiederkehrende Warnungen zu einzelnen Titeln (z.B. ungültige ISBNs), statt jede einzeln zu loggen.
 
-  if dep:
-    code[1] = 's'
+  Pro Art der Warnung werden die Anzahl und die ersten `SAMPLES` Titel-IDs gespeichert. Die Zusammenfassung wird
+  mit `log_summary()` einmal pro Datei geloggt, Teilergebnisse können mit `merge()` zusammengeführt werden.
+  """
+  __slots__ = ('counts', 'samples')
 
-  else:
-    code[1] = 'a'
+  SAMPLES = 5
 
-  return ''.join(code)
+  def __init__(self):
+    self.counts = collections.Counter()
+    self.samples = {}
 
+  def add(self, kind, sample):
+    """
+    Zählt eine Warnung.
 
+    :param kind: Die Art der Warnung
+    :type kind: str
+    :param sample: Die ID des betroffenen Titels (ggf. mit dem fehlerhaften Wert)
+    :type sample: str
+    """
+    self.counts[kind] += 1
+    samples = self.samples.setdefault(kind, [])
 
-def process_document(document):
-  """
-  Diese Funktion extrahiert PICA+-Felder und Statistiken zu diesen aus dem XML
+    if len(samples) < self.SAMPLES:
+      samples.append(sample)
 
-  :param document: Der XML-Knoten des Titels
-  :type document: etree._Element
-  :returns: list
+  def merge(self, other):
+    """
+    Addiert die Warnungen einer anderen `WarningSummary`.
 
-  """
+    :param other: Die zu addierenden Warnungen
+    :type other: WarningSummary
+    """
+    self.counts.update(other.counts)
 
-  xml_lang = '{http://www.w3.org/XML/1998/namespace}lang'
-  dependend = True
-  url_found = False
-  record = []
-
-  # Structure of Stats
-
-  stats = {
-    'genres':{
-      'values': []
-    },
-    'types':{
-      'values': []
-    },
-    'authors':{
-      'num': 0,
-      'with_aff': 0
-    },
-    'identifiers':{
-      'num': 0,
-      'isbn10': 0,
-      'isbn13': 0,
-      'isbnX': 0,
-      'issn': 0,
-      'eissn': 0
-    },
-    'lang':{
-      'num': 0,
-      'names': [],
-      'error': 0,
-      'iso3': 0,
-      'iso2': 0
-    },
-    'pages':{
-      'error': 0
-    },
-    'size':{
-      'num': 0
-    },
-    'locations':{
-      'num': 0,
-      'types': [],
-      'subtypes': []
-    },
-    'abstracts':{
-      'num': 0,
-      'tags': 0,
-      'lang': []
-    },
-    'title':{
-      'lang': "",
-      'tags': 0,
-      'alt': []
-    },
-    'conference':{
-      'num': 0,
-    },
-    'copyright':{
-      'num': 0
-    },
-    'publisher':{
-      'num': 0,
-      'place': 0
-    },
-    'date':{
-      'values': []
-    },
-    'classifications':{
-      'types': []
-    },
-    'subjects':{
-      'values': []
-    },
-    'thesaurus':{
-      'num': 0,
-      'des': []
-    }
-  }
+    for kind, other_samples in other.samples.items():
+      samples = self.samples.setdefault(kind, [])
+      samples.extend(other_samples[:self.SAMPLES - len(samples)])
 
-  # System Info
+  def log_summary(self, name):
+    """
+    Loggt eine Zeile pro Art der Warnung.
 
-  system_info = document.find('systemInfo')
+    :param name: Der Name der Datei (oder des Laufs), zu dem die Warnungen gehören
+    :type name: str
+    """
+    for kind, count in sorted(self.counts.items()):
+      log.warning(kind + " in " + name + ": " + str(count) + "x, e.g. " + ", ".join(self.samples[kind]))
 
-  metadata_cr = system_info.find('metadataCopyright')
+  def to_dict(self):
+    """
+    Gibt die Anzahl und die Beispiele je Art der Warnung zurück.
 
-  if metadata_cr is not None:
-    metadata_cr = metadata_cr.find('dc:rights', system_info.nsmap)
+    :returns: dict
+    """
+    return {kind: {'count': count, 'samples': self.samples[kind]} for kind, count in sorted(self.counts.items())}
 
-    if metadata_cr is not None and metadata_cr.text is not None:
-      md_cr = metadata_cr.text
-      md_cr.replace("Copyright", "©")
-      md_cr.replace("(c)", "©")
+  @classmethod
+  def from_dict(cls, d):
+    """
+    Erzeugt eine `WarningSummary` aus dem Ergebnis von `to_dict()`, z.B. aus einem Checkpoint.
 
-      record.append({'037I': [{'a': 'Metadaten: ' + md_cr}]})
+    :param d: Die Anzahl und die Beispiele je Art der Warnung
+    :type d: dict
+    :returns: WarningSummary
+    """
+    summary = cls()
 
-  doc_id = system_info.find('documentID')
+    for kind, entry in d.items():
+      summary.counts[kind] = entry['count']
+      summary.samples[kind] = list(entry['samples'])
 
-  if doc_id is not None and doc_id.text is not None:
-    record.append({'007G': [{'c': "WTI"}, {'0': doc_id.text }]})
+    return summary
 
-  else:
-    log.error("No WTI-ID found!")
-    pass
+# XML names
 
-  # Formal Info
+NAMESPACES = {
+  'dc': 'http://purl.org/dc/elements/1.1/',
+  'dcterms': 'http://purl.org/dc/terms/'
+}
 
-  formal_info = document.find('formalInfo')
+# Vorab aufgelöste Namen, damit `find()` keine Präfixe über `nsmap` auflösen muss
+DC_TITLE = '{%s}title' % NAMESPACES['dc']
+DC_RIGHTS = '{%s}rights' % NAMESPACES['dc']
+DC_CREATOR = '{%s}creator' % NAMESPACES['dc']
+DC_DATE = '{%s}date' % NAMESPACES['dc']
+DC_PUBLISHER = '{%s}publisher' % NAMESPACES['dc']
+DCTERMS_ISSUED = '{%s}Issued' % NAMESPACES['dcterms']
+XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
 
-  document_def = formal_info.find('documentTypes').find('documentAdvancedType')
+# PICA records
 
-  ## DocumentGenres
+PICA_TAGS = (
+  '002@', '004A', '004V', '007G', '009P/05', '010@', '011@', '020F', '021A', '021F', '027D', '028A', '028C',
+  '030F', '031A', '033A', '034D', '036E', '037I', '039B', '044L/00', '044L/01', '044N', '045X'
+)
 
-  genre_groups = document_def.findall('documentGenreGroup')
+# Position eines Feldes im fertigen Record, damit nicht jeder Record per Lambda nach Tags sortiert werden muss
+TAG_RANK = {tag: rank for rank, tag in enumerate(sorted(PICA_TAGS))}
 
-  if genre_groups is not None:
-    for genre_group in genre_groups:
-      for genre in genre_group:
-        stats['genres']['values'].append(genre.find('documentGenreCode').text)
 
-  ## DocumentTypes
+class PicaField(object):
+  """
+  Ein PICA+-Feld mit seinen Unterfeldern als Liste von (Code, Wert)-Tupeln.
 
-  type_groups = document_def.findall('documentTypeGroup')
+  Neue Tags müssen in `PICA_TAGS` eingetragen werden.
 
-  if type_groups is not None:
-    for type_group in type_groups:
-      for ty in type_group:
-        stats['types']['values'].append(ty.find('documentTypeCode').text)
+  :param tag: Das Feld, z.B. '021A'
+  :type tag: str
+  :param subfields: Die Unterfelder, z.B. `[('a', "Titel")]`
+  :type subfields: list
+  """
+  __slots__ = ('tag', 'rank', 'subfields')
 
-  ## Copyright
+  def __init__(self, tag, subfields):
+    self.tag = tag
+    self.rank = TAG_RANK[tag]
+    self.subfields = subfields
 
-  doc_copyright = formal_info.find('copyright')
 
-  if doc_copyright is not None:
-    doc_copyright = doc_copyright.find('dc:rights', formal_info.nsmap)
+class PicaRecord(object):
+  """
+  Ein PICA+-Record als Liste von `PicaField` in der Reihenfolge ihrer Erzeugung.
+  """
+  __slots__ = ('fields',)
 
-    if doc_copyright is not None and doc_copyright.text is not None:
-      doc_cr = doc_copyright.text
-      stats['copyright']['num'] += 1
-      doc_cr.replace("Copyright", "©")
-      doc_cr.replace("(c)", "©")
-      doc_cr.replace("(C)", "©")
-      record.append({'037I': [{'a': doc_cr}]})
+  def __init__(self):
+    self.fields = []
 
-  ## Sizes
+  def add(self, tag, subfields):
+    """
+    Hängt ein neues Feld an den Record an.
 
-  sizes = formal_info.find('sizes')
+    :param tag: Das Feld, z.B. '021A'
+    :type tag: str
+    :param subfields: Die Unterfelder, z.B. `[('a', "Titel")]`
+    :type subfields: list
+    """
+    self.fields.append(PicaField(tag, subfields))
 
-  if sizes is not None:
-    for size in sizes:
-      stats['size']['num'] += 1
-      record.append({'034D': [{'a': size.text}]})
+  def sorted_fields(self):
+    """
+    Gibt die Felder nach Tags sortiert zurück. Felder mit gleichem Tag behalten ihre Reihenfolge.
 
-  ## Identifiers
+    :returns: list
+    """
+    return sorted(self.fields, key=_field_rank)
 
-  identifiers = formal_info.find('identifiers')
-  isbn10 = []
-  isbn13 = []
-  journal = []
-  issn = []
-  eissn = []
 
-  if identifiers is not None:
-    for i in identifiers:
-      sel_type = i.get('type')
-      stats['identifiers']['num'] += 1
+_field_rank = operator.attrgetter('rank')
 
-      if sel_type == 'isbn10':
-        stats['identifiers'][sel_type] += 1
-        isbn10.append(i.text)
-
-      if sel_type == 'isbn13':
-        stats['identifiers'][sel_type] += 1
-        isbn13.append(i.text)
-
-      if sel_type == 'isbn':
-        if isbnlib.is_isbn10(i.text):
-          stats['identifiers']['isbn10'] += 1
-          isbn10.append(i.text)
-        elif isbnlib.is_isbn13(i.text):
-          stats['identifiers']['isbn13'] += 1
-          isbn13.append(i.text)
-        else:
-          stats['identifiers']['isbnX'] += 1
-          log.warning('Invalid isbn in TEMA' + doc_id.text + ':' + i.text)
+# Statistics
 
-      if sel_type == 'issn':
-        stats['identifiers'][sel_type] += 1
-        journal.append(i.text)
-        issn.append(i.text)
+class StatsAccumulator(object):
+  """
+  Kumuliert die Statistiken der konvertierten Titel in vordefinierten Zählern (`collections.Counter`).
 
-      if sel_type == 'eissn':
-        stats['identifiers'][sel_type] += 1
-        journal.append(i.text)
-        eissn.append(i.text)
+  Für jedes Thema in `TOPICS` gibt es einen Zähler pro Schlüssel. Bei Schlüsseln in `DISTRIBUTIONS` wird gezählt,
+  wie viele Titel einen bestimmten Wert (z.B. eine Anzahl an Autoren) haben, bei allen anderen die Vorkommnisse
+  der einzelnen Werte. Teilergebnisse (z.B. aus Worker-Prozessen) können mit `merge()` zusammengeführt werden.
+  """
+  __slots__ = ('num', 'counters', '_distributions')
+
+  TOPICS = (
+    ('genres', ('values',)),
+    ('types', ('values',)),
+    ('authors', ('num', 'with_aff')),
+    ('identifiers', ('num', 'isbn10', 'isbn13', 'isbnX', 'issn', 'eissn')),
+    ('lang', ('num', 'names', 'error', 'iso3', 'iso2')),
+    ('pages', ('error',)),
+    ('size', ('num',)),
+    ('locations', ('num', 'types', 'subtypes')),
+    ('abstracts', ('num', 'tags', 'lang')),
+    ('title', ('lang', 'tags', 'alt')),
+    ('conference', ('num',)),
+    ('copyright', ('num',)),
+    ('publisher', ('num', 'place')),
+    ('date', ('values',)),
+    ('classifications', ('types',)),
+    ('subjects', ('values',)),
+    ('thesaurus', ('num', 'des'))
+  )
+
+  DISTRIBUTIONS = (
+    'authors_num', 'authors_with_aff',
+    'identifiers_num', 'identifiers_isbn10', 'identifiers_isbn13', 'identifiers_isbnX', 'identifiers_issn',
+    'identifiers_eissn',
+    'lang_num', 'lang_error', 'lang_iso3', 'lang_iso2',
+    'pages_error', 'size_num', 'locations_num', 'abstracts_num', 'abstracts_tags', 'title_tags',
+    'conference_num', 'copyright_num', 'publisher_num', 'publisher_place', 'thesaurus_num'
+  )
+
+  def __init__(self):
+    self.num = 0
+    self.counters = {topic: {key: collections.Counter() for key in keys} for topic, keys in self.TOPICS}
+    self._distributions = {}
+
+    for name in self.DISTRIBUTIONS:
+      topic, key = name.split('_', 1)
+      self._distributions[name] = self.counters[topic][key]
+
+  def add_document(self, **counts):
+    """
+    Zählt einen Titel mit seinen Anzahlen, z.B. `authors_num=2`.
+
+    :param counts: Die Anzahlen je Schlüssel aus `DISTRIBUTIONS`
+    :type counts: int
+    """
+    self.num += 1
+    distributions = self._distributions
+
+    for name, value in counts.items():
+      distributions[name][value] += 1
+
+  def merge(self, other):
+    """
+    Addiert die Zähler eines anderen `StatsAccumulator`.
+
+    :param other: Die zu addierenden Statistiken
+    :type other: StatsAccumulator
+    """
+    self.num += other.num
+
+    for topic, keys in other.counters.items():
+      for key, counter in keys.items():
+        self.counters[topic][key].update(counter)
+
+  def to_dict(self):
+    """
+    Gibt die Statistiken in der Struktur zurück, die `prepare_stats()` erwartet.
+
+    :returns: dict
+    """
+    stats = {
+      'num': self.num
+    }
 
-  ## Languages
+    if self.num == 0:
+      return stats
 
-  languages = formal_info.find('documentLanguages')
+    for topic, keys in self.counters.items():
+      stats[topic] = {}
 
-  for lang in languages:
-    langcode = lang.find('languageCodes').find('code')
-    stats['lang']['num'] += 1
-    stats['lang']['names'].append(langcode.text)
+      for key, counter in keys.items():
+        stats[topic][key] = {(str(k) if type(k) is int else k): v for k, v in counter.items()}
 
-    if langcode.get('iso') == '639-1':
-      stats['lang']['iso2'] += 1
-      al2 = langcode.text.lower()
+    return stats
 
-      if al2 == 'sp':
-        stats['lang']['error'] += 1
-        al2 = 'es'
+  def to_state(self):
+    """
+    Gibt alle Zähler verlustfrei (Schlüssel behalten ihren Typ) als JSON-kompatible Struktur zurück, z.B. für einen
+    Checkpoint. Das Gegenstück ist `from_state()`.
 
-      try:
-        lang_obj = pycountry.languages.get(alpha2=al2)
+    :returns: dict
+    """
+    return {
+      'num': self.num,
+      'counters': {topic: {key: list(counter.items()) for key, counter in keys.items()} for topic, keys in self.counters.items()}
+    }
 
-      except:
-        stats['lang']['error'] += 1
+  @classmethod
+  def from_state(cls, state):
+    """
+    Erzeugt einen `StatsAccumulator` aus dem Ergebnis von `to_state()`.
 
-      else:
-        if lang_obj is not None:
-          record.append({'010@': [{'a': lang_obj.bibliographic}]})
+    :param state: Die gespeicherten Zähler
+    :type state: dict
+    :returns: StatsAccumulator
+    """
+    stats = cls()
+    stats.num = state['num']
 
-    elif langcode.get('iso') == '639-2':
+    for topic, keys in state['counters'].items():
+      for key, items in keys.items():
+        stats.counters[topic][key].update(dict(items))
 
-      stats['lang']['iso3'] += 1
-      record.append({'010@': [{'a': langcode.text.lower()}]})
+    return stats
 
-  ## Locations
+# Profiling
 
-  locations = formal_info.find('locations')
+class Profiler(object):
+  """
+  Misst die kumulierte Wall- und CPU-Zeit der einzelnen Verarbeitungsschritte (`--profile`).
 
-  if locations is not None:
+  Die Laufzeit wird lückenlos in Abschnitte aufgeteilt: `lap()` rechnet die seit der letzten Marke vergangene
+  Zeit dem angegebenen Abschnitt zu und setzt eine neue Marke. Abschnitte innerhalb eines Schritts werden mit
+  einem Punkt getrennt benannt (z.B. 'extract.formalInfo'). Wie beim `StatsAccumulator` können Teilergebnisse
+  aus Worker-Prozessen mit `merge()` zusammengeführt werden, die Zeiten sind dann über alle Prozesse summiert.
+  """
+  __slots__ = ('wall', 'cpu', '_wall', '_cpu')
+
+  def __init__(self):
+    self.wall = collections.Counter()
+    self.cpu = collections.Counter()
+    self.start()
+
+  def start(self):
+    """
+    Setzt eine neue Marke, ohne die bisherige Zeit einem Abschnitt zuzurechnen.
+    """
+    self._wall = time.perf_counter()
+    self._cpu = time.process_time()
+
+  def lap(self, name):
+    """
+    Rechnet die Zeit seit der letzten Marke dem Abschnitt `name` zu.
+
+    :param name: Der Name des Abschnitts
+    :type name: str
+    """
+    wall = time.perf_counter()
+    cpu = time.process_time()
+    self.wall[name] += wall - self._wall
+    self.cpu[name] += cpu - self._cpu
+    self._wall = wall
+    self._cpu = cpu
+
+  def merge(self, other):
+    """
+    Addiert die Zeiten eines anderen `Profiler`.
+
+    :param other: Die zu addierenden Zeiten
+    :type other: Profiler
+    """
+    self.wall.update(other.wall)
+    self.cpu.update(other.cpu)
+
+  def to_dict(self):
+    """
+    Gibt die Zeiten in Sekunden je Schritt zurück. Schritte mit Abschnitten enthalten zusätzlich deren Summe.
+
+    :returns: dict
+    """
+    profile = {}
+
+    for name in sorted(self.wall):
+      profile[name] = {'wall': round(self.wall[name], 3), 'cpu': round(self.cpu[name], 3)}
+      stage = name.split('.', 1)[0]
+
+      if stage != name:
+        total = profile.setdefault(stage, {'wall': 0, 'cpu': 0})
+        total['wall'] = round(total['wall'] + self.wall[name], 3)
+        total['cpu'] = round(total['cpu'] + self.cpu[name], 3)
+
+    return dict(sorted(profile.items()))
+
+  def log_summary(self):
+    """
+    Schreibt die Zeiten je Schritt und Abschnitt ins Log.
+    """
+    for name, times in self.to_dict().items():
+      log.debug('Profile {:<26} wall {:>9.3f}s  cpu {:>9.3f}s'.format(name, times['wall'], times['cpu']))
+
+# Metrics
+
+class Metrics(object):
+  """
+  Zählt den Fortschritt eines Laufs (Titel, gelesene Bytes, Warnungen, Parser-Fehler, aktuelle Datei), damit er
+  schon während der Konvertierung mit einem `MetricsExporter` abgefragt werden kann.
 
-    for loc in locations:
-      stats['locations']['num'] += 1
-      loc_type = loc.get('type')
-      loc_subtype = loc.get('subtype')
+  Im seriellen Betrieb wird das Objekt nach jedem Titel aktualisiert. Worker-Prozesse zählen in einem eigenen
+  Objekt, das nach jeder Datei bzw. jedem Abschnitt mit `merge()` übernommen wird. Die Zähler werden ohne Lock
+  erhöht, beim Abfragen kann ein Wert also höchstens einen Titel hinterherhinken.
+  """
+  __slots__ = ('docs', 'bytes_read', 'warnings', 'parse_errors', 'files_done', 'num_files', 'cur_file', 'file_name', 'started', 'updated')
+
+  def __init__(self):
+    self.docs = 0
+    self.bytes_read = 0
+    self.warnings = 0
+    self.parse_errors = 0
+    self.files_done = 0
+    self.num_files = 0
+    self.cur_file = 0
+    self.file_name = ''
+    self.started = time.time()
+    self.updated = self.started
+
+  def add_document(self):
+    """
+    Zählt einen verarbeiteten Titel.
+    """
+    self.docs += 1
+    self.updated = time.time()
+
+  def read_blocks(self, blocks):
+    """
+    Reicht die Blöcke einer Datei durch und zählt dabei die gelesenen Bytes.
+
+    :param blocks: Die Datei als Folge von Byte-Blöcken
+    :type blocks: iterable
+    :returns: generator
+    """
+    for block in blocks:
+      self.bytes_read += len(block)
+      yield block
+
+  def merge(self, other):
+    """
+    Addiert die Zähler eines anderen `Metrics`-Objekts (z.B. aus einem Worker-Prozess).
+
+    :param other: Die zu addierenden Zähler
+    :type other: Metrics
+    """
+    self.docs += other.docs
+    self.bytes_read += other.bytes_read
+    self.warnings += other.warnings
+    self.parse_errors += other.parse_errors
+    self.files_done += other.files_done
+    self.updated = time.time()
+
+  def render(self):
+    """
+    Gibt die Zähler im OpenMetrics-Textformat zurück.
+
+    :returns: str
+    """
+    elapsed = time.time() - self.started
+    rate = self.docs / elapsed if elapsed > 0 else 0.0
+    file_name = self.file_name.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    lines = [
+      '# TYPE wti_documents counter',
+      '# HELP wti_documents Converted WTI documents.',
+      'wti_documents_total ' + str(self.docs),
+      '# TYPE wti_read_bytes counter',
+      '# HELP wti_read_bytes Uncompressed XML bytes passed to the parser.',
+      'wti_read_bytes_total ' + str(self.bytes_read),
+      '# TYPE wti_warnings counter',
+      '# HELP wti_warnings Logged warnings and errors.',
+      'wti_warnings_total ' + str(self.warnings),
+      '# TYPE wti_parse_errors counter',
+      '# HELP wti_parse_errors Files or chunks that could not be parsed completely.',
+      'wti_parse_errors_total ' + str(self.parse_errors),
+      '# TYPE wti_records_per_second gauge',
+      '# HELP wti_records_per_second Average throughput since the start of the run.',
+      'wti_records_per_second ' + '{:.1f}'.format(rate),
+      '# TYPE wti_files_done gauge',
+      'wti_files_done ' + str(self.files_done),
+      '# TYPE wti_files gauge',
+      'wti_files ' + str(self.num_files),
+      '# TYPE wti_current_file info',
+      'wti_current_file_info{number="' + str(self.cur_file) + '",name="' + file_name + '"} 1',
+      '# TYPE wti_last_progress_timestamp_seconds gauge',
+      '# HELP wti_last_progress_timestamp_seconds Time of the last processed document (for stall alerts).',
+      'wti_last_progress_timestamp_seconds ' + '{:.3f}'.format(self.updated),
+      '# EOF'
+    ]
 
-      stats['locations']['types'].append(loc_type)
-      stats['locations']['subtypes'].append(loc_subtype)
+    return '\n'.join(lines) + '\n'
 
-      if loc_type == 'url':
-        url_text = loc.text
-        url_found = True
-        record.append({'009P/05': [{'a': url_text}]})
 
-        if loc_subtype == 'doi':
-          doi = urlsplit(url_text).path[1:]
-          record.append({'004V': [{'0': doi}]})
+class _WarningCounter(logging.Handler):
+  """
+  Zählt die geloggten Warnungen und Fehler in einem `Metrics`-Objekt.
+  """
 
-  # Bibliographic Info
+  def __init__(self, metrics):
+    super(_WarningCounter, self).__init__(logging.WARNING)
+    self.metrics = metrics
 
-  bibliographic_info = document.find('bibliographicInfo')
+  def emit(self, record):
+    self.metrics.warnings += 1
 
-  if bibliographic_info.get('dependend') == 'false':
-    dependend = False
 
-  ## Title
+class _MetricsRequestHandler(http.server.BaseHTTPRequestHandler):
+  """
+  Liefert die Metriken des Servers unter '/metrics' aus.
+  """
 
-  title = bibliographic_info.find('dc:title', bibliographic_info.nsmap)
+  def do_GET(self):
+    if self.path.split('?', 1)[0] != '/metrics':
+      self.send_error(404)
+      return
 
-  if title is not None:
-    clean_title = title.text
-    tails = title.xpath('child::*')
+    body = self.server.metrics.render().encode('utf-8')
+    self.send_response(200)
+    self.send_header('Content-Type', 'application/openmetrics-text; version=1.0.0; charset=utf-8')
+    self.send_header('Content-Length', str(len(body)))
+    self.end_headers()
+    self.wfile.write(body)
 
-    if tails is not None and len(tails) > 0:
-      clean_title = _process_tails(title)
-      stats['title']['tags'] += 1
+  def log_message(self, format, *args):
+    pass
 
-    if clean_title:
-      record.append({'021A': [{'a': clean_title}]})
-      stats['title']['lang'] = title.get(xml_lang)
 
-    else:
-      log.warning("No Title:")
-      log.warning(doc_id.text)
+class MetricsExporter(object):
+  """
+  Veröffentlicht ein `Metrics`-Objekt während des Laufs, als regelmäßig aktualisierte Textdatei und/oder über
+  einen lokalen HTTP-Endpunkt ('http://127.0.0.1:<port>/metrics'). Beides läuft in Hintergrund-Threads.
 
-  ## Alternative Titles
+  Die Datei wird über eine temporäre Datei ersetzt, sodass nie ein halb geschriebener Stand gelesen wird.
 
-  alt_titles = bibliographic_info.find('alternativeTitles')
+  :param metrics: Die zu veröffentlichenden Zähler
+  :type metrics: Metrics
+  :param fpath: Die Textdatei oder `None`
+  :type fpath: str
+  :param port: Der lokale Port des HTTP-Endpunkts oder `None`
+  :type port: int
+  :param interval: Der Abstand zwischen zwei Aktualisierungen der Datei in Sekunden
+  :type interval: int
+  """
 
-  if alt_titles is not None:
-    for alt in alt_titles:
-      alt_lang = alt.get(xml_lang)
-      clean_alt = _process_tails(alt)
+  def __init__(self, metrics, fpath=None, port=None, interval=Constants.METRICS_INTERVAL):
+    self.metrics = metrics
+    self.fpath = fpath
+    self.port = port
+    self.interval = interval
+    self._stop = threading.Event()
+    self._threads = []
+    self._server = None
+
+  def start(self):
+    if self.port is not None:
+      self._server = http.server.ThreadingHTTPServer(('127.0.0.1', self.port), _MetricsRequestHandler)
+      self._server.metrics = self.metrics
+      self._threads.append(threading.Thread(target=self._server.serve_forever, daemon=True))
+      log.debug("Serving metrics on http://127.0.0.1:" + str(self.port) + "/metrics")
+
+    if self.fpath:
+      self._threads.append(threading.Thread(target=self._write_periodically, daemon=True))
+      log.debug("Writing metrics to " + self.fpath + " every " + str(self.interval) + "s")
+
+    for thread in self._threads:
+      thread.start()
+
+  def write(self):
+    """
+    Schreibt den aktuellen Stand in die Textdatei.
+    """
+    tmp_fpath = self.fpath + '.tmp'
+
+    with open(tmp_fpath, 'w') as f:
+      f.write(self.metrics.render())
+
+    os.replace(tmp_fpath, self.fpath)
+
+  def _write_periodically(self):
+    while not self._stop.wait(self.interval):
+      try:
+        self.write()
 
-      if alt_lang and clean_alt:
-        stats['title']['alt'].append(alt_lang)
-        record.append({'021F': [{'a': clean_alt}]})
+      except OSError as e:
+        log.error("Could not write metrics file: " + str(e))
 
-  ## Abstracts
+  def stop(self):
+    """
+    Beendet die Threads und schreibt den Endstand in die Textdatei.
+    """
+    self._stop.set()
 
-  abstracts = bibliographic_info.find('abstracts')
+    if self._server is not None:
+      self._server.shutdown()
+      self._server.server_close()
 
-  if abstracts is not None:
-    for abstract in abstracts:
-      cleaned_abstract = abstract.text
-      tails = abstract.xpath('child::*')
+    for thread in self._threads:
+      thread.join()
 
-      if tails is not None and len(tails) > 0:
-        stats['abstracts']['tags'] += 1
-        cleaned_abstract = _process_tails(abstract)
+    if self.fpath:
+      self.write()
 
-      abs_lang = abstract.get(xml_lang)
+  def __enter__(self):
+    self.start()
+    return self
 
-      stats['abstracts']['num'] += 1
-      stats['abstracts']['lang'].append(abs_lang)
+  def __exit__(self, *exc):
+    self.stop()
+    return False
 
-      copyright = abstract.get('copyright')
 
-      if cleaned_abstract and copyright is not None:
-        cleaned_abstract += (' [' + copyright + ']')
+# Identifiers
 
-      if cleaned_abstract:
-        record.append({'020F': [{'a': cleaned_abstract}]})
+@functools.lru_cache(maxsize=Constants.IDENTIFIER_CACHE_SIZE)
+def _isbn_type(value):
+  """
+  Prüft einen Wert (inklusive Prüfziffer) als ISBN-10 bzw. ISBN-13.
 
-  ## Authors
+  Die Ergebnisse werden pro Prozess zwischengespeichert, da dieselben ISBNs (z.B. von Tagungsbänden) in vielen
+  Titeln vorkommen.
 
-  ### Affiliations
+  :param value: Die ISBN
+  :type value: str
+  :returns: str -- 'isbn10', 'isbn13' oder `None`, wenn der Wert keine gültige ISBN ist
+  """
 
-  aff_temp = bibliographic_info.find('authorsAffiliations')
-  affiliations = []
+  if not value:
+    return None
 
-  if aff_temp is not None:
-    for aff in aff_temp:
-      stats['authors']['with_aff'] += 1
-      affiliations.append(aff.find('affiliation').text)
+  if isbnlib.is_isbn10(value):
+    return 'isbn10'
 
-  ### Authors
+  if isbnlib.is_isbn13(value):
+    return 'isbn13'
 
-  authors = bibliographic_info.find('creators')
+  return None
 
-  if authors is not None:
-    for index, author in enumerate(authors):
-      name = author.find('dc:creator', authors.nsmap)
 
-      if name is not None and len(name) > 0:
-        stats['authors']['num'] += 1
-        name = name.text.split(", ")
+@functools.lru_cache(maxsize=Constants.IDENTIFIER_CACHE_SIZE)
+def _valid_issn(value):
+  """
+  Prüft Format und Prüfziffer (Modulo 11) einer ISSN bzw. eISSN, z.B. '0317-8471'.
 
-        author_fields = []
+  :param value: Die ISSN
+  :type value: str
+  :returns: bool
+  """
 
-        if len(name) > 1:
-          author_fields.append({'d': name[1]})
+  if not value:
+    return False
 
-        author_fields.append({'a': name[0]})
+  digits = value.strip().replace('-', '').upper()
 
-        #if aff_temp is not None and len(affiliations) > index:
-          #author_fields.append({'p': affiliations[index]})
+  if len(digits) != 8 or not digits[:7].isascii() or not digits[:7].isdigit():
+    return False
 
-        author_fields.append({'B': "VerfasserIn"})
-        author_fields.append({'4': "aut"})
+  check = -sum(int(digit) * weight for digit, weight in zip(digits[:7], range(8, 1, -1))) % 11
 
-        if index == 0:
-          record.append({'028A': author_fields})
+  return digits[7] == ('X' if check == 10 else str(check))
 
-        else:
-          record.append({'028C': author_fields})
 
-  ## Material Code
+def _check_identifier(sel_type, value, warnings, doc_id):
+  """
+  Prüft einen Identifier mit `_isbn_type()` bzw. `_valid_issn()` und zählt ungültige Werte in der `WarningSummary`
+  ('Invalid ISBN-10', 'Invalid ISBN-13', 'Invalid ISSN', 'Invalid eISSN'). Allgemeine ISBNs (Typ 'isbn') werden
+  dabei einer Art zugeordnet.
+
+  :param sel_type: Der Typ aus dem Attribut 'type'
+  :type sel_type: str
+  :param value: Der Wert
+  :type value: str
+  :param warnings: Die Zusammenfassung der Warnungen
+  :type warnings: WarningSummary
+  :param doc_id: Die WTI-ID des Titels (oder `None`)
+  :type doc_id: str
+  :returns: str -- der Typ des Identifiers, für 'isbn' 'isbn10', 'isbn13' oder `None`, wenn sie ungültig ist
+  """
 
-  material_code = _decide_material(dependend, url_found, stats['genres']['values'])
+  if sel_type == 'isbn':
+    return _isbn_type(value)
 
-  record.append({'002@': [{'0': material_code}]})
+  if sel_type in ('isbn10', 'isbn13'):
+    if _isbn_type(value) != sel_type:
+      warnings.add('Invalid ISBN-' + sel_type[4:], 'TEMA' + (doc_id or '?') + ':' + (value or ''))
 
-  ## Additional Info
+  elif sel_type in ('issn', 'eissn'):
+    if not _valid_issn(value):
+      warnings.add('Invalid ' + ('eISSN' if sel_type == 'eissn' else 'ISSN'), 'TEMA' + (doc_id or '?') + ':' + (value or ''))
 
-  additional_info = bibliographic_info.find('additionalDocumentInfo')
+  return sel_type
 
-  article_info = additional_info.find('articleInfo')
-  journal_info = additional_info.find('journalInfo')
 
-  ### Conference Info
+def _match_isbns(isbn10, isbn13):
+  """
+  Versucht aus getrennten Listen von ISBN-10 und ISBN-13 Paare zu bilden.
 
-  conference_info = additional_info.find('conferenceInfos')
+  Eine ISBN-13 gehört zu der ersten ISBN-10 mit demselben Mittelteil (ohne '978-' und Prüfziffer). Die ISBN-10
+  werden dafür einmal nach ihrem Mittelteil indiziert, sodass auch lange Listen nur linear durchlaufen werden.
 
-  if conference_info is not None:
-    conferences = conference_info.findall('conferenceInfo')
+  :param isbn10: Liste mit ISBN-10
+  :type isbn10: list
+  :param isbn13: Liste mit ISBN-13
+  :type isbn13: list
+  :returns: list -- eine Liste von `PicaField` (004A)
+  """
+  pairs = []
+  i10_index = {}
+  i10_matched = set()
 
-    for conf in conferences:
-      stats['conference']['num'] += 1
-      conf_date_parts = ["",""]
+  for index, i10 in enumerate(isbn10):
+    i10_index.setdefault(i10[:-2], index)
 
-      for date in conf.findall('dc:date', conf.nsmap):
-        if date.get('type') == 'begin':
-          conf_date_parts[0] = date.text.replace("-", ".")
+  for i13 in isbn13:
+    index = i10_index.get(i13[4:-2])
 
-        elif date.get('type') == 'end':
-          conf_date_parts[1] = date.text.replace("-", ".")
+    if index is None:
+      pairs.append(PicaField('004A', [('A', i13)]))
 
-      conf_date = '-'.join(conf_date_parts)
-      conf_place = conf.find('place')
-      conf_names = conf.findall('name')
+    else:
+      pairs.append(PicaField('004A', [('0', isbn10[index]), ('A', i13)]))
+      i10_matched.add(index)
 
-      for conf_name in conf_names:
-        if conf_name.text is not None:
-          conf_field = []
-          conf_split = conf_name.text.split(', ')
-          conf_field.append({'a': conf_split[0]})
+  for index, i10 in enumerate(isbn10):
+    if index not in i10_matched:
+      pairs.append(PicaField('004A', [('0', i10)]))
 
-          if len(conf_split) == 2:
-            conf_field.append({'j': conf_split[1]})
+  return pairs
 
-          if conf_place is not None and conf_place.text is not None:
-            conf_field.append({'k': conf_place.text})
 
-          if not conf_date == "-":
-            conf_field.append({'p': conf_date})
 
-          record.append({'030F': conf_field})
+def _has_child_elements(node):
+  """
+  Prüft, ob ein XML-Knoten Kind-Elemente (und nicht nur Text oder Kommentare) enthält.
 
+  :param node: Der zu untersuchende XML-Knoten
+  :type node: etree._Element
+  :returns: bool
+  """
 
-  ## Publication Info
+  for child in node:
+    if isinstance(child.tag, str):
+      return True
 
-  publication_info = bibliographic_info.find('publicationInfo')
-  publ_date = publication_info.find('dcterms:Issued', publication_info.nsmap)
+  return False
 
-  if journal_info is not None:
-    journal_title = ""
-    journal_year = ""
-    journal_vol = ""
-    journal_iss = ""
 
-    if journal_info.find('dc:title', journal_info.nsmap) is not None and journal_info.find('dc:title', journal_info.nsmap).text is not None:
-      journal_title = journal_info.find('dc:title', journal_info.nsmap).text
+def _first_child(node, tag):
+  """
+  Gibt das erste Kind-Element mit dem Namen `tag` zurück. Anders als `find()` wird dabei kein Pfad ausgewertet.
 
-    elif article_info is not None and article_info.find('dc:title', article_info.nsmap) is not None and article_info.find('dc:title', article_info.nsmap).text is not None:
-      journal_title = article_info.find('dc:title', article_info.nsmap).text
+  :param node: Der zu untersuchende XML-Knoten
+  :type node: etree._Element
+  :param tag: Der Name des Kind-Elements
+  :type tag: str
+  :returns: etree._Element -- das Element oder `None`
+  """
 
-    if journal_info.find('volumeNumber') is not None and journal_info.find('volumeNumber').text is not None:
-      journal_vol = journal_info.find('volumeNumber').text
+  return next(node.iterchildren(tag), None)
 
-    if journal_info.find('issueNumber') is not None and journal_info.find('issueNumber').text is not None:
-      journal_iss = journal_info.find('issueNumber').text
 
-    if journal_info.find('coverDate') is not None and journal_info.find('coverDate').text is not None:
-      journal_date = journal_info.find('coverDate').text
+def _child_text(node, tag):
+  """
+  Gibt den Text des ersten Kind-Elements mit dem Namen `tag` zurück.
 
-    if not dependend:
-      if journal_title:
-        series_fields = [{'a': journal_title}]
+  :param node: Der zu untersuchende XML-Knoten
+  :type node: etree._Element
+  :param tag: Der Name des Kind-Elements
+  :type tag: str
+  :returns: str -- der Text oder `None`
+  """
 
-        if journal_vol:
-          series_fields.append({'l': journal_vol})
+  child = _first_child(node, tag)
 
-        record.append({'036E': series_fields})
+  if child is None:
+    return None
 
-      if len(isbn10) > 0 and len(isbn13) > 0:
-        isbn_pairs = _match_isbns(isbn10, isbn13)
+  return child.text
 
-        for pair in isbn_pairs:
-          record.append(pair)
 
-      elif len(isbn13) > 0:
-        for isbn in isbn13:
-          record.append({'004A': [{'A': isbn}]})
+def _process_tails(node):
+  """
+  Verarbeitet mögliche HTML-Tags in einem XML-Knoten
 
-      elif len(isbn10) > 0:
-        for isbn in isbn10:
-          record.append({'004A': [{'0': isbn}]})
+  `<sub>` und `<sup>` bleiben als Markup erhalten, von anderen Kind-Elementen wird nur der nachfolgende Text
+  übernommen.
 
-    elif dependend:
-      if journal_title is not None:
-        pages = ""
-        if article_info is not None:
-          if article_info.find('pages') is not None and article_info.find('pages').text is not None:
-            splitpages = article_info.find('pages').text.split("-")
+  :param node: Der zu untersuchende XML-Knoten
+  :type node: etree._Element
+  :returns: str
 
-            if len(splitpages) == 2:
-              pages = article_info.find('pages').text
+  """
+  if not _has_child_elements(node):
+    return node.text
 
-            else:
-              stats['pages']['error'] += 1
+  parts = []
 
-        precise_infos = []
-        journal_fields = []
-        greater_fields = [{'c': "In"}]
+  if node.text:
+    parts.append(node.text)
 
-        if journal_title:
-          journal_fields.append({'a': journal_title})
-          greater_fields.append({'a': journal_title})
+  for child in node:
+    if child.tag in ("sub", "sup") and child.text is not None:
+      parts.append("<" + child.tag + ">" + child.text + "</" + child.tag + ">")
 
-        if journal_vol:
-          precise_infos.append({'d': journal_vol})
+    if child.tail:
+      parts.append(child.tail)
 
-        if journal_year:
-          precise_infos.append({'j': journal_year})
+  return ''.join(parts)
 
-        else:
-          precise_infos.append({'j': publ_date.text})
 
-        if journal_iss:
-          precise_infos.append({'e': journal_iss})
 
-        if pages:
-          precise_infos.append({'h': pages})
+def _language_code(al2):
+  """
+  Ermittelt den bibliographischen ISO 639-2-Code zu einem ISO 639-1-Code aus der Tabelle `LANGUAGE_CODES`.
 
-        record.append({'031A': precise_infos})
+  :param al2: Der ISO 639-1-Code in Kleinbuchstaben
+  :type al2: str
+  :returns: str -- der Code oder `None`, wenn die Sprache unbekannt ist
+  """
 
-        if len(journal) > 0:
-          if material_code == 'Osx':
-            for i in eissn:
-              journal_fields.append({'0': i})
-              greater_fields.append({'C': "ISS"})
-              greater_fields.append({'6': i})
+  return LANGUAGE_CODES.get(al2)
 
-          elif material_code == 'Asx':
-            for i in issn:
-              journal_fields.append({'0': i})
-              greater_fields.append({'C': "ISS"})
-              greater_fields.append({'6': i})
 
-        elif len(isbn13) > 0:
-          for isbn in isbn13:
-            journal_fields.append({'i': isbn})
-            greater_fields.append({'C': "ISB"})
-            greater_fields.append({'6': isbn})
+def update_language_table(fpath=Constants.LANGUAGES_FNAME):
+  """
+  Erzeugt die Tabelle `LANGUAGE_CODES` (ISO 639-1 -> bibliographischer ISO 639-2-Code) mit pycountry neu.
 
-        elif len(isbn10) > 0:
-          for isbn in isbn10:
-            journal_fields.append({'i': isbn})
-            greater_fields.append({'C': "ISB"})
-            greater_fields.append({'6': isbn})
+  pycountry wird nur hierfür geladen, die Konvertierung selbst verwendet die generierte Tabelle.
 
-        record.append({'027D': journal_fields})
+  :param fpath: Die zu schreibende Python-Datei
+  :type fpath: str
+  """
 
-        record.append({'039B': greater_fields})
+  import pycountry
 
-  ### Publisher
+  codes = {}
 
-  publisher = publication_info.find('dc:publisher', publication_info.nsmap)
-  publ_place = publication_info.find('publicationPlace')
+  for lang in pycountry.languages:
+    alpha_2 = getattr(lang, 'alpha_2', None)
 
-  if publisher is not None and publisher.text is not None:
-    stats['publisher']['num'] += 1
-    publ_fields = []
+    if alpha_2:
+      codes[alpha_2] = getattr(lang, 'bibliographic', lang.alpha_3)
 
-    if publ_place is not None and publ_place.text is not None:
-      stats['publisher']['place'] += 1
-      publ_fields.append({'p': publ_place.text})
+  with open(fpath, 'w') as f:
+    f.write('"""\n')
+    f.write('Generierte Tabelle der ISO 639-1-Sprachcodes mit den zugehörigen bibliographischen ISO 639-2-Codes.\n\n')
+    f.write("Nicht von Hand bearbeiten, sondern mit 'python3 wti_convert.py --update_languages' neu erzeugen.\n")
+    f.write('"""\n\n')
+    f.write('LANGUAGE_CODES = {\n')
+    f.write(',\n'.join("  '" + k + "': '" + codes[k] + "'" for k in sorted(codes)))
+    f.write('\n}\n')
 
-    publ_fields.append({'n': publisher.text})
-    record.append({'033A': publ_fields})
+  log.debug("Wrote " + str(len(codes)) + " language codes to " + fpath)
 
-  if publ_date is not None:
-    stats['date']['values'] = publ_date.text
-    record.append({'011@': [{'a': publ_date.text}]})
 
-  # Classification Info
 
-  classification_info = document.find('classificationInfo')
+def _decide_material(dep, url, genres):
+  """
+  Diese Funktion generiert den Materialcode (002@) aus Angaben im XML.
 
-  if classification_info is not None:
-    classifications = classification_info.find('classifications')
+  :param dep: Abhängigkeit
+  :type dep: bool
+  :param url: Wurde eine URL gefunden?
+  :type url: bool
+  :param genres: Liste von documentGenreCodes
+  :type genres: list
+  :returns: str -- der Materialcode
 
-    if classifications is not None:
-      for c in classifications:
-        c_name = c.get('classificationName')
-        stats['classifications']['types'].append(c_name)
-        nots = [{'b': c_name}]
+  """
 
-        for cl in c:
-          nots.append({'a': cl.find('code').text})
-        record.append({'045X': nots})
+  code = ["","","x"]
 
-    subjects = classification_info.find('subjects')
+  if url:
+    code[0] = 'O'
 
-    if subjects is not None:
-      for sub in subjects:
-        if sub.text is not None:
-          stats['subjects']['values'].append(sub.text)
-          record.append({'044L/00': [{'S': 's'},{'a': sub.text}]})
+  else:
+    code[0] = 'A'
 
-  # Functional Info
+  if dep:
+    code[1] = 's'
 
-  functional_info = document.find('functionalInfo')
-  thesaurus = functional_info.find('thesaurusTerms')
+  else:
+    code[1] = 'a'
 
-  ## Thesaurus
+  return ''.join(code)
 
-  if thesaurus is not None:
-    temp_synonyms = thesaurus.find('synonyms')
-    synonyms = []
-    syn_group = []
 
-    if temp_synonyms is not None:
-      for index, syn in enumerate(temp_synonyms):
-        syn_type = syn.get('type')
-        syn_lang = syn.get(xml_lang)
-        stats['thesaurus']['num'] += 1
 
-        if index == 0:
-          syn_group.append({'S': "s"})
+class _DocumentContext(object):
+  """
+  Der Zustand eines Titels während `process_document()`: der entstehende Record, die Anzahlen für
+  `StatsAccumulator.add_document()` und die Werte, die erst nach dem Durchlauf durch alle Abschnitte (z.B. für den
+  Materialcode) zusammengeführt werden.
+
+  :param counters: Die Zähler des `StatsAccumulator`
+  :type counters: dict
+  :param warnings: Die Zusammenfassung der Warnungen
+  :type warnings: WarningSummary
+  """
+  __slots__ = ('record', 'counters', 'warnings', 'counts', 'doc_id', 'genres', 'isbn10', 'isbn13', 'journal', 'issn',
+               'eissn', 'dependend', 'url_found', 'title_lang', 'article_info', 'journal_info', 'publ_date')
+
+  def __init__(self, counters, warnings):
+    self.record = PicaRecord()
+    self.counters = counters
+    self.warnings = warnings
+    self.counts = dict.fromkeys(StatsAccumulator.DISTRIBUTIONS, 0)
+    self.doc_id = None
+    self.genres = []
+    self.isbn10 = []
+    self.isbn13 = []
+    self.journal = []
+    self.issn = []
+    self.eissn = []
+    self.dependend = True
+    self.url_found = False
+    self.title_lang = ""
+    self.article_info = None
+    self.journal_info = None
+    self.publ_date = None
+
+
+def _text_fields(tag, prefix=(), counter=None, count=None, skip_empty=True):
+  """
+  Erzeugt eine Regel für ein Element, dessen Kind-Elemente jeweils als Feld `tag` mit ihrem Text in Unterfeld 'a'
+  übernommen werden (z.B. `<freeTerms>`).
+
+  :param tag: Das PICA-Feld, z.B. '044L/01'
+  :type tag: str
+  :param prefix: Die Unterfelder vor dem Text, z.B. `(('S', "s"),)`
+  :type prefix: tuple
+  :param counter: Der Zähler in `StatsAccumulator.counters`, in dem die Texte gezählt werden, z.B. `('subjects', 'values')`
+  :type counter: tuple
+  :param count: Der Schlüssel aus `StatsAccumulator.DISTRIBUTIONS`, unter dem die Kind-Elemente gezählt werden
+  :type count: str
+  :param skip_empty: Eine Flag, ob Kind-Elemente ohne Text übersprungen werden
+  :type skip_empty: bool
+  :returns: function
+  """
 
-        if syn_type == 'DES' or syn_type == 'SYN':
-          stats['thesaurus']['des'].append(syn.text)
+  def rule(ctx, node):
+    for child in node:
+      text = child.text
 
-          if index > 0 and ( temp_synonyms[index-1].get('type') == 'SUP' or ( syn_lang == 'DE' and temp_synonyms[index-1].get(xml_lang) == 'EN') ):
-            synonyms.append(syn_group)
-            syn_group = []
-            syn_group.append({'S': "s"})
+      if count is not None:
+        ctx.counts[count] += 1
 
-        if syn_lang == 'DE':
-          syn_group.append({'a': syn.text})
+      if text is None and skip_empty:
+        continue
 
-        if index == (len(temp_synonyms) - 1):
-          synonyms.append(syn_group)
+      if counter is not None:
+        ctx.counters[counter[0]][counter[1]][text] += 1
 
-      for group in synonyms:
-        record.append({'044N': group})
+      ctx.record.add(tag, list(prefix) + [('a', text)])
 
-  ## Free Terms
+  return rule
 
-  free_terms = functional_info.find('freeTerms')
 
-  if free_terms is not None:
-    for ft in free_terms:
-      if ft.text is not None:
-        record.append({'044L/01': [{'S': "s"}, {'a': ft.text}]})
+def _map_metadata_copyright(ctx, node):
+  metadata_cr = _first_child(node, DC_RIGHTS)
 
-  return [record, stats]
+  if metadata_cr is not None and metadata_cr.text is not None:
+    md_cr = metadata_cr.text
+    md_cr.replace("Copyright", "©")
+    md_cr.replace("(c)", "©")
 
+    ctx.record.add('037I', [('a', 'Metadaten: ' + md_cr)])
 
-def write_to_file(record, num_record, fpath):
-  """
-  Diese Funktion liest eine Liste von PICA-Feldern und schreibt diese im PICA-Internformat in eine Datei.
 
-  Struktur eines `records`::
+def _map_document_id(ctx, node):
+  ctx.doc_id = node.text
 
-    [
-      {
-        '031N': [
-          {'d': "15"},
-          {'j':"2004"}
-        ]
-      },
-      {
-        '002@': [
-          {'0': "Osx"}
-        ]
-      }
-    ]
+  if node.text is not None:
+    ctx.record.add('007G', [('c', "WTI"), ('0', node.text)])
 
-  :param record: die Liste mit PICA-Feldern
-  :type record: list
-  :param num_record: die laufende Titelanzahl in der aktuellen Datei
-  :type num_record: int
-  :param fpath: der Dateiname inklusive Pfad
-  :type fpath: str
-  """
-  record = sorted(record, key=lambda x: list(x.keys())[0])
 
-  with open(fpath, 'a+') as f:
-    f.write('<1D>' + "\n")
-    f.write('##TitleSequenceNumber ' + str(num_record) + "\n")
+def _map_document_types(ctx, node):
+  document_def = _first_child(node, 'documentAdvancedType')
+  genres_counter = ctx.counters['genres']['values']
+  types_counter = ctx.counters['types']['values']
 
-    for field in record:
-      field_name = list(field.keys())[0]
-      f.write('<1E>')
-      f.write(field_name + " ")
+  for group in document_def.iterchildren('documentGenreGroup'):
+    for genre in group:
+      genre_code = _child_text(genre, 'documentGenreCode')
+      ctx.genres.append(genre_code)
+      genres_counter[genre_code] += 1
 
-      for subfield in field[field_name]:
-        subfield_name = list(subfield.keys())[0]
-        f.write('<1F>')
-        f.write(subfield_name)
-        if type(subfield_name) is str and subfield[subfield_name] is not None:
-          if type(subfield[subfield_name]) is str:
-            f.write(subfield[subfield_name])
+  for group in document_def.iterchildren('documentTypeGroup'):
+    for ty in group:
+      types_counter[_child_text(ty, 'documentTypeCode')] += 1
 
-          else:
-            log.warning(field_name)
-            log.warning(subfield_name)
-            log.warning(subfield)
 
-        else:
-          log.warning(field_name)
-          log.warning(subfield_name)
-          log.warning(subfield)
+def _map_copyright(ctx, node):
+  doc_copyright = _first_child(node, DC_RIGHTS)
 
-      f.write("\n")
-    f.write("\n")
+  if doc_copyright is not None and doc_copyright.text is not None:
+    doc_cr = doc_copyright.text
+    ctx.counts['copyright_num'] += 1
+    doc_cr.replace("Copyright", "©")
+    doc_cr.replace("(c)", "©")
+    doc_cr.replace("(C)", "©")
+    ctx.record.add('037I', [('a', doc_cr)])
 
 
-def _max_val(d):
-  """
-  Bestimmt den Maximalwert in einem Dictionary und gibt in mit dem dazugehörigen Key zurück.
-  
-  :param d: Das zu untersuchende Python-Dictionary
-  :type d: dict
-  :returns: list
-  """
+def _map_identifiers(ctx, node):
+  counts = ctx.counts
+  warnings = ctx.warnings
 
-  v=list(d.values())
-  k=list(d.keys())
+  for i in node:
+    sel_type = i.get('type')
+    counts['identifiers_num'] += 1
 
-  if len(v) > 0 and len(k) > 0:
-    return [k[v.index(max(v))], max(v)]
+    if sel_type == 'isbn':
+      isbn_type = _check_identifier(sel_type, i.text, warnings, ctx.doc_id)
 
-  else:
-    return [None,None]
+      if isbn_type == 'isbn10':
+        counts['identifiers_isbn10'] += 1
+        ctx.isbn10.append(i.text)
+      elif isbn_type == 'isbn13':
+        counts['identifiers_isbn13'] += 1
+        ctx.isbn13.append(i.text)
+      else:
+        counts['identifiers_isbnX'] += 1
+        warnings.add('Invalid ISBN', 'TEMA' + (ctx.doc_id or '?') + ':' + (i.text or ''))
 
+      continue
 
-def _min_val(d):
-  """
-  Bestimmt den Minimalwert in einem Dictionary und gibt in mit dem dazugehörigen Key zurück.
-  
-  :param d: Das zu untersuchende Python-Dictionary
-  :type d: dict
-  :returns: list
-  """
+    _check_identifier(sel_type, i.text, warnings, ctx.doc_id)
 
-  v=list(d.values())
-  k=list(d.keys())
+    if sel_type == 'isbn10':
+      counts['identifiers_isbn10'] += 1
+      ctx.isbn10.append(i.text)
 
-  if len(v) > 0 and len(k) > 0:
-    return [k[v.index(min(v))], min(v)]
+    elif sel_type == 'isbn13':
+      counts['identifiers_isbn13'] += 1
+      ctx.isbn13.append(i.text)
+
+    elif sel_type == 'issn':
+      counts['identifiers_issn'] += 1
+      ctx.journal.append(i.text)
+      ctx.issn.append(i.text)
+
+    elif sel_type == 'eissn':
+      counts['identifiers_eissn'] += 1
+      ctx.journal.append(i.text)
+      ctx.eissn.append(i.text)
+
+
+def _map_languages(ctx, node):
+  counts = ctx.counts
+  names_counter = ctx.counters['lang']['names']
+
+  for lang in node:
+    langcode = _first_child(_first_child(lang, 'languageCodes'), 'code')
+    counts['lang_num'] += 1
+    names_counter[langcode.text] += 1
+
+    if langcode.get('iso') == '639-1':
+      counts['lang_iso2'] += 1
+      al2 = langcode.text.lower()
+
+      if al2 == 'sp':
+        counts['lang_error'] += 1
+        al2 = 'es'
+
+      lang_code = _language_code(al2)
+
+      if lang_code is None:
+        counts['lang_error'] += 1
+
+      else:
+        ctx.record.add('010@', [('a', lang_code)])
+
+    elif langcode.get('iso') == '639-2':
+      counts['lang_iso3'] += 1
+      ctx.record.add('010@', [('a', langcode.text.lower())])
+
+
+def _map_locations(ctx, node):
+  types_counter = ctx.counters['locations']['types']
+  subtypes_counter = ctx.counters['locations']['subtypes']
+
+  for loc in node:
+    ctx.counts['locations_num'] += 1
+    loc_type = loc.get('type')
+    loc_subtype = loc.get('subtype')
+
+    types_counter[loc_type] += 1
+    subtypes_counter[loc_subtype] += 1
+
+    if loc_type == 'url':
+      url_text = loc.text
+      ctx.url_found = True
+      ctx.record.add('009P/05', [('a', url_text)])
+
+      if loc_subtype == 'doi':
+        doi = urlsplit(url_text).path[1:]
+        ctx.record.add('004V', [('0', doi)])
+
+
+def _map_bibliographic_info(ctx, node):
+  if node.get('dependend') == 'false':
+    ctx.dependend = False
+
+
+def _map_title(ctx, node):
+  clean_title = node.text
+
+  if _has_child_elements(node):
+    clean_title = _process_tails(node)
+    ctx.counts['title_tags'] += 1
+
+  if clean_title:
+    ctx.record.add('021A', [('a', clean_title)])
+    ctx.title_lang = node.get(XML_LANG)
 
   else:
-    return [None,None]
+    ctx.warnings.add('No title', ctx.doc_id or '?')
 
 
-def prepare_stats(stats, stats_path):
+def _map_alternative_titles(ctx, node):
+  for alt in node:
+    alt_lang = alt.get(XML_LANG)
+    clean_alt = _process_tails(alt)
+
+    if alt_lang and clean_alt:
+      ctx.counters['title']['alt'][alt_lang] += 1
+      ctx.record.add('021F', [('a', clean_alt)])
+
+
+def _map_abstracts(ctx, node):
+  counts = ctx.counts
+
+  for abstract in node:
+    cleaned_abstract = abstract.text
+
+    if _has_child_elements(abstract):
+      counts['abstracts_tags'] += 1
+      cleaned_abstract = _process_tails(abstract)
+
+    abs_lang = abstract.get(XML_LANG)
+
+    counts['abstracts_num'] += 1
+    ctx.counters['abstracts']['lang'][abs_lang] += 1
+
+    copyright = abstract.get('copyright')
+
+    if cleaned_abstract and copyright is not None:
+      cleaned_abstract += (' [' + copyright + ']')
+
+    if cleaned_abstract:
+      ctx.record.add('020F', [('a', cleaned_abstract)])
+
+
+def _map_affiliations(ctx, node):
+  for aff in node:
+    ctx.counts['authors_with_aff'] += 1
+
+
+def _map_creators(ctx, node):
+  for index, author in enumerate(node):
+    name = _first_child(author, DC_CREATOR)
+
+    if name is not None and len(name) > 0:
+      ctx.counts['authors_num'] += 1
+      name = name.text.split(", ")
+
+      author_fields = []
+
+      if len(name) > 1:
+        author_fields.append(('d', name[1]))
+
+      author_fields.append(('a', name[0]))
+      author_fields.append(('B', "VerfasserIn"))
+      author_fields.append(('4', "aut"))
+
+      if index == 0:
+        ctx.record.add('028A', author_fields)
+
+      else:
+        ctx.record.add('028C', author_fields)
+
+
+def _map_additional_info(ctx, node):
+  ctx.article_info = _first_child(node, 'articleInfo')
+  ctx.journal_info = _first_child(node, 'journalInfo')
+  conference_info = _first_child(node, 'conferenceInfos')
+
+  if conference_info is None:
+    return
+
+  for conf in conference_info.iterchildren('conferenceInfo'):
+    ctx.counts['conference_num'] += 1
+    conf_date_parts = ["",""]
+
+    for date in conf.iterchildren(DC_DATE):
+      if date.get('type') == 'begin':
+        conf_date_parts[0] = date.text.replace("-", ".")
+
+      elif date.get('type') == 'end':
+        conf_date_parts[1] = date.text.replace("-", ".")
+
+    conf_date = '-'.join(conf_date_parts)
+    conf_place = _first_child(conf, 'place')
+
+    for conf_name in conf.iterchildren('name'):
+      if conf_name.text is not None:
+        conf_field = []
+        conf_split = conf_name.text.split(', ')
+        conf_field.append(('a', conf_split[0]))
+
+        if len(conf_split) == 2:
+          conf_field.append(('j', conf_split[1]))
+
+        if conf_place is not None and conf_place.text is not None:
+          conf_field.append(('k', conf_place.text))
+
+        if not conf_date == "-":
+          conf_field.append(('p', conf_date))
+
+        ctx.record.add('030F', conf_field)
+
+
+def _map_publication_info(ctx, node):
+  publ_date = ctx.publ_date = _first_child(node, DCTERMS_ISSUED)
+  publisher = _first_child(node, DC_PUBLISHER)
+  publ_place = _first_child(node, 'publicationPlace')
+
+  if publisher is not None and publisher.text is not None:
+    ctx.counts['publisher_num'] += 1
+    publ_fields = []
+
+    if publ_place is not None and publ_place.text is not None:
+      ctx.counts['publisher_place'] += 1
+      publ_fields.append(('p', publ_place.text))
+
+    publ_fields.append(('n', publisher.text))
+    ctx.record.add('033A', publ_fields)
+
+  if publ_date is not None:
+    if publ_date.text is not None:
+      ctx.counters['date']['values'][publ_date.text] += 1
+
+    ctx.record.add('011@', [('a', publ_date.text)])
+
+
+def _map_classifications(ctx, node):
+  types_counter = ctx.counters['classifications']['types']
+
+  for c in node:
+    c_name = c.get('classificationName')
+    types_counter[c_name] += 1
+    nots = [('b', c_name)]
+
+    for cl in c:
+      nots.append(('a', _child_text(cl, 'code')))
+
+    ctx.record.add('045X', nots)
+
+
+def _map_thesaurus(ctx, node):
+  temp_synonyms = _first_child(node, 'synonyms')
+
+  if temp_synonyms is None:
+    return
+
+  des_counter = ctx.counters['thesaurus']['des']
+  synonyms = []
+  syn_group = []
+  prev_type = prev_lang = None
+
+  for index, syn in enumerate(temp_synonyms):
+    syn_type = syn.get('type')
+    syn_lang = syn.get(XML_LANG)
+    ctx.counts['thesaurus_num'] += 1
+
+    if index == 0:
+      syn_group.append(('S', "s"))
+
+    if syn_type == 'DES' or syn_type == 'SYN':
+      des_counter[syn.text] += 1
+
+      if index > 0 and ( prev_type == 'SUP' or ( syn_lang == 'DE' and prev_lang == 'EN') ):
+        synonyms.append(syn_group)
+        syn_group = []
+        syn_group.append(('S', "s"))
+
+    if syn_lang == 'DE':
+      syn_group.append(('a', syn.text))
+
+    prev_type = syn_type
+    prev_lang = syn_lang
+
+  if syn_group:
+    synonyms.append(syn_group)
+
+  for group in synonyms:
+    ctx.record.add('044N', group)
+
+
+def _map_journal(ctx, material_code):
   """
-  Diese Funktion erzeugt CSV-Dateien für die Inhalte eines Dictionaries mit Statistiken.
+  Erzeugt die Felder zur Zeitschrift bzw. Schriftenreihe und zu den ISBNs, die Werte aus mehreren Abschnitten und
+  den Materialcode benötigen.
 
-  Struktur der `stats`::
+  :param ctx: Der Zustand des Titels
+  :type ctx: _DocumentContext
+  :param material_code: Der Materialcode aus `_decide_material()`
+  :type material_code: str
+  """
 
-    {
-      'lang':{
-        'num':{'1': 20, '0': 50, '2': 10},
-        'names':{'de': 30, 'en': 10}
-      },
-      'genres':{
-        'values':{'J': 300, 'CA': 80, 'B': 10}
-      }
-    }
+  journal_info = ctx.journal_info
+  article_info = ctx.article_info
+  isbn10 = ctx.isbn10
+  isbn13 = ctx.isbn13
+  record = ctx.record
 
-  :param stats: Die übergebenen Statistiken
-  :type stats: dict.
+  if journal_info is None:
+    return
+
+  journal_year = ""
+  journal_title = _child_text(journal_info, DC_TITLE)
+
+  if journal_title is None and article_info is not None:
+    journal_title = _child_text(article_info, DC_TITLE)
+
+  if journal_title is None:
+    journal_title = ""
+
+  journal_vol = _child_text(journal_info, 'volumeNumber') or ""
+  journal_iss = _child_text(journal_info, 'issueNumber') or ""
+
+  if not ctx.dependend:
+    if journal_title:
+      series_fields = [('a', journal_title)]
+
+      if journal_vol:
+        series_fields.append(('l', journal_vol))
+
+      record.add('036E', series_fields)
+
+    if len(isbn10) > 0 and len(isbn13) > 0:
+      record.fields.extend(_match_isbns(isbn10, isbn13))
+
+    elif len(isbn13) > 0:
+      for isbn in isbn13:
+        record.add('004A', [('A', isbn)])
+
+    elif len(isbn10) > 0:
+      for isbn in isbn10:
+        record.add('004A', [('0', isbn)])
+
+  elif journal_title is not None:
+    pages = ""
+    if article_info is not None:
+      article_pages = _child_text(article_info, 'pages')
+
+      if article_pages is not None:
+        splitpages = article_pages.split("-")
+
+        if len(splitpages) == 2:
+          pages = article_pages
+
+        else:
+          ctx.counts['pages_error'] += 1
+
+    precise_infos = []
+    journal_fields = []
+    greater_fields = [('c', "In")]
+
+    if journal_title:
+      journal_fields.append(('a', journal_title))
+      greater_fields.append(('a', journal_title))
+
+    if journal_vol:
+      precise_infos.append(('d', journal_vol))
+
+    if journal_year:
+      precise_infos.append(('j', journal_year))
+
+    else:
+      precise_infos.append(('j', ctx.publ_date.text))
+
+    if journal_iss:
+      precise_infos.append(('e', journal_iss))
+
+    if pages:
+      precise_infos.append(('h', pages))
+
+    record.add('031A', precise_infos)
+
+    if len(ctx.journal) > 0:
+      if material_code == 'Osx':
+        for i in ctx.eissn:
+          journal_fields.append(('0', i))
+          greater_fields.append(('C', "ISS"))
+          greater_fields.append(('6', i))
+
+      elif material_code == 'Asx':
+        for i in ctx.issn:
+          journal_fields.append(('0', i))
+          greater_fields.append(('C', "ISS"))
+          greater_fields.append(('6', i))
+
+    elif len(isbn13) > 0:
+      for isbn in isbn13:
+        journal_fields.append(('i', isbn))
+        greater_fields.append(('C', "ISB"))
+        greater_fields.append(('6', isbn))
+
+    elif len(isbn10) > 0:
+      for isbn in isbn10:
+        journal_fields.append(('i', isbn))
+        greater_fields.append(('C', "ISB"))
+        greater_fields.append(('6', isbn))
+
+    record.add('027D', journal_fields)
+
+    record.add('039B', greater_fields)
+
+
+def _section(enter, child_rules, repeatable=()):
+  """
+  Erzeugt den Eintrag eines Abschnitts in `DOCUMENT_RULES`. Wie bei `find()` wird von jedem Tag nur das erste
+  Kind-Element verarbeitet, außer bei Tags in `repeatable`.
+
+  :param enter: Die Funktion, die mit dem Abschnitt selbst aufgerufen wird (oder `None`)
+  :type enter: function
+  :param child_rules: Die Regeln für die Kind-Elemente nach Tag
+  :type child_rules: dict
+  :param repeatable: Die Tags, deren Kind-Elemente alle verarbeitet werden
+  :type repeatable: tuple
+  :returns: tuple -- die Funktion, die Regeln und die Tags, von denen nur das erste Element verarbeitet wird
   """
-  
-  statsSubf = current_date + '/'
-  os.makedirs(stats_path + statsSubf, exist_ok=True)
-  
-  with open(stats_path + statsSubf + "topic_stats.csv", 'w+') as sf:
-    sf.write("name,num_keys,max_key,max_occ,max_occ_key,min_key,min_occ,min_occ_key,mean\n")
 
-    for topic, value in stats.items():
-      if type(value) is dict:
-        for sub_topic, sval in value.items():
-          row_name = topic + "_" + sub_topic
+  return (enter, child_rules, frozenset(child_rules).difference(repeatable))
+
+
+# Die Regeln für `process_document()`: Zu jedem Abschnitt von `<document>` eine Funktion, die mit dem Abschnitt selbst
+# aufgerufen wird (oder `None`), und die Regeln für dessen Kind-Elemente nach Tag. Jede Regel bekommt den
+# `_DocumentContext` und das Element. Einfache Listen von Texten können mit `_text_fields()` eingetragen werden.
+# Wie bisher mit `find()` wird nur der erste Abschnitt eines Tags und darin (siehe `_section()`) nur das erste
+# Element eines Tags verarbeitet.
+DOCUMENT_RULES = {
+  'systemInfo': _section(None, {
+    'metadataCopyright': _map_metadata_copyright,
+    'documentID': _map_document_id
+  }),
+  'formalInfo': _section(None, {
+    'documentTypes': _map_document_types,
+    'copyright': _map_copyright,
+    'sizes': _text_fields('034D', count='size_num', skip_empty=False),
+    'identifiers': _map_identifiers,
+    'documentLanguages': _map_languages,
+    'locations': _map_locations
+  }),
+  'bibliographicInfo': _section(_map_bibliographic_info, {
+    DC_TITLE: _map_title,
+    'alternativeTitles': _map_alternative_titles,
+    'abstracts': _map_abstracts,
+    'authorsAffiliations': _map_affiliations,
+    'creators': _map_creators,
+    'additionalDocumentInfo': _map_additional_info,
+    'publicationInfo': _map_publication_info
+  }),
+  'classificationInfo': _section(None, {
+    'classifications': _map_classifications,
+    'subjects': _text_fields('044L/00', (('S', 's'),), counter=('subjects', 'values'))
+  }),
+  'functionalInfo': _section(None, {
+    'thesaurusTerms': _map_thesaurus,
+    'freeTerms': _text_fields('044L/01', (('S', "s"),))
+  })
+}
+
+
+def _finish_document(ctx, timer=None):
+  """
+  Ergänzt den Record eines Titels, nachdem alle Abschnitte verarbeitet wurden, um die Felder, die Werte
+  aus mehreren Abschnitten benötigen (Materialcode, Zeitschrift, ISBNs).
 
-          if type(sval) is dict:
-            max_key, max_val = _max_val(sval)
-            min_key, min_val = _min_val(sval)
-            vals = list(sval.values())
-            keys = list(sval.keys())
-            int_keys = []
-            num_zero = ""
-            is_string = 0
-            kv_list = []
-            mean = -1
+  :param ctx: Der Zustand des Titels
+  :type ctx: _DocumentContext
+  :param timer: Ein `Profiler`, dem die Zeit als 'extract.journal' zugerechnet wird
+  :type timer: Profiler
+  """
 
-            with open(stats_path + statsSubf + row_name + ".csv", 'w+') as subfield_stats:
-              subfield_stats.write("value,num\n")
+  if ctx.doc_id is None:
+    log.error("No WTI-ID found!")
+
+  ## Material Code
+
+  material_code = _decide_material(ctx.dependend, ctx.url_found, ctx.genres)
+
+  ctx.record.add('002@', [('0', material_code)])
+
+  _map_journal(ctx, material_code)
+
+  if timer is not None:
+    timer.lap('extract.journal')
+
+
+def _count_document(ctx, stats, timer=None):
+  """
+  Zählt einen vollständig verarbeiteten Titel mit seinen Anzahlen in den Statistiken.
+
+  :param ctx: Der Zustand des Titels
+  :type ctx: _DocumentContext
+  :param stats: Die Statistiken, zu denen der Titel gezählt wird
+  :type stats: StatsAccumulator
+  :param timer: Ein `Profiler`, dem die Zeit als 'extract.stats' zugerechnet wird
+  :type timer: Profiler
+  """
+
+  if ctx.title_lang is not None:
+    stats.counters['title']['lang'][ctx.title_lang] += 1
+
+  stats.add_document(**ctx.counts)
+
+  if timer is not None:
+    timer.lap('extract.stats')
+
+
+def process_document(document, stats=None, timer=None, warnings=None):
+  """
+  Diese Funktion extrahiert PICA+-Felder und Statistiken zu diesen aus dem XML
+
+  Jeder Abschnitt von `<document>` und jedes seiner Kind-Elemente wird genau einmal besucht und nach seinem Tag
+  mit den Regeln aus `DOCUMENT_RULES` verarbeitet, wiederholte Abschnitte und Elemente wie bei `find()` nur beim
+  ersten Mal. Felder, die Werte aus mehreren Abschnitten benötigen (Materialcode, Zeitschrift, ISBNs), werden
+  danach erzeugt.
+
+  :param document: Der XML-Knoten des Titels
+  :type document: etree._Element
+  :param stats: Die Statistiken, zu denen der Titel gezählt wird (ansonsten ein neuer `StatsAccumulator`)
+  :type stats: StatsAccumulator
+  :param timer: Ein `Profiler`, dem die Zeit der einzelnen Abschnitte als 'extract.*' zugerechnet wird
+  :type timer: Profiler
+  :param warnings: Die Zusammenfassung, in der Warnungen zum Titel gesammelt werden (ansonsten eine neue `WarningSummary`)
+  :type warnings: WarningSummary
+  :returns: list -- der `PicaRecord` und die Statistiken
+
+  """
+
+  if stats is None:
+    stats = StatsAccumulator()
+
+  if warnings is None:
+    warnings = WarningSummary()
+
+  ctx = _DocumentContext(stats.counters, warnings)
+  sections_seen = set()
+
+  for section in document:
+    rules = DOCUMENT_RULES.get(section.tag)
+
+    if rules is None or section.tag in sections_seen:
+      continue
+
+    sections_seen.add(section.tag)
+    enter, child_rules, first_only = rules
+    seen = set()
+
+    if enter is not None:
+      enter(ctx, section)
+
+    for child in section:
+      rule = child_rules.get(child.tag)
+
+      if rule is None:
+        continue
+
+      if child.tag in first_only:
+        if child.tag in seen:
+          continue
+
+        seen.add(child.tag)
+
+      rule(ctx, child)
+
+    if timer is not None:
+      timer.lap('extract.' + section.tag)
+
+  _finish_document(ctx, timer)
+  _count_document(ctx, stats, timer)
+
+  return [ctx.record, stats]
+
+
+def collect_stats(document, stats, warnings=None):
+  """
+  Diese Funktion zählt nur die Statistiken eines Titels, ohne einen PICA-Record zu erzeugen.
+
+  Sie liefert dieselben Zahlen wie `process_document()`, überspringt aber alle Teile des XML, die nur für die
+  PICA-Felder gebraucht werden (z.B. ISBN-Paare, Zeitschriftenangaben, Klassifikationscodes und Thesaurus-Gruppen).
+  Sie wird für '--stats_only' verwendet.
+
+  :param document: Der XML-Knoten des Titels
+  :type document: etree._Element
+  :param stats: Die Statistiken, zu denen der Titel gezählt wird
+  :type stats: StatsAccumulator
+  :param warnings: Die Zusammenfassung, in der Warnungen zum Titel gesammelt werden (ansonsten eine neue `WarningSummary`)
+  :type warnings: WarningSummary
+  """
+
+  if warnings is None:
+    warnings = WarningSummary()
+
+  counters = stats.counters
+
+  n_authors = n_aff = 0
+  n_ident = n_isbn10 = n_isbn13 = n_isbnX = n_issn = n_eissn = 0
+  n_lang = n_lang_error = n_iso3 = n_iso2 = 0
+  n_pages_error = n_sizes = n_locations = n_abstracts = n_abstract_tags = 0
+  title_lang = ""
+  n_title_tags = n_conferences = n_copyright = n_publisher = n_publ_place = n_thesaurus = 0
+
+  doc_id = document.find('systemInfo').find('documentID')
+  doc_id = doc_id.text if doc_id is not None else None
+
+  # Formal Info
+
+  formal_info = document.find('formalInfo')
+  document_def = formal_info.find('documentTypes').find('documentAdvancedType')
+
+  for genre_group in document_def.findall('documentGenreGroup'):
+    for genre in genre_group:
+      counters['genres']['values'][genre.find('documentGenreCode').text] += 1
+
+  for type_group in document_def.findall('documentTypeGroup'):
+    for ty in type_group:
+      counters['types']['values'][ty.find('documentTypeCode').text] += 1
+
+  doc_copyright = formal_info.find('copyright')
+
+  if doc_copyright is not None:
+    doc_copyright = doc_copyright.find(DC_RIGHTS)
+
+    if doc_copyright is not None and doc_copyright.text is not None:
+      n_copyright += 1
+
+  sizes = formal_info.find('sizes')
+
+  if sizes is not None:
+    n_sizes = len(sizes)
+
+  identifiers = formal_info.find('identifiers')
+
+  if identifiers is not None:
+    for i in identifiers:
+      sel_type = i.get('type')
+      n_ident += 1
+      id_type = _check_identifier(sel_type, i.text, warnings, doc_id)
+
+      if sel_type == 'isbn10':
+        n_isbn10 += 1
+
+      elif sel_type == 'isbn13':
+        n_isbn13 += 1
+
+      elif sel_type == 'isbn':
+        if id_type == 'isbn10':
+          n_isbn10 += 1
+        elif id_type == 'isbn13':
+          n_isbn13 += 1
+        else:
+          n_isbnX += 1
+          warnings.add('Invalid ISBN', 'TEMA' + (doc_id or '?') + ':' + (i.text or ''))
+
+      elif sel_type == 'issn':
+        n_issn += 1
+
+      elif sel_type == 'eissn':
+        n_eissn += 1
+
+  for lang in formal_info.find('documentLanguages'):
+    langcode = lang.find('languageCodes').find('code')
+    n_lang += 1
+    counters['lang']['names'][langcode.text] += 1
+
+    if langcode.get('iso') == '639-1':
+      n_iso2 += 1
+      al2 = langcode.text.lower()
+
+      if al2 == 'sp':
+        n_lang_error += 1
+        al2 = 'es'
+
+      if _language_code(al2) is None:
+        n_lang_error += 1
+
+    elif langcode.get('iso') == '639-2':
+      n_iso3 += 1
+
+  locations = formal_info.find('locations')
+
+  if locations is not None:
+    for loc in locations:
+      n_locations += 1
+      counters['locations']['types'][loc.get('type')] += 1
+      counters['locations']['subtypes'][loc.get('subtype')] += 1
+
+  # Bibliographic Info
+
+  bibliographic_info = document.find('bibliographicInfo')
+  title = bibliographic_info.find(DC_TITLE)
+
+  if title is not None:
+    clean_title = title.text
+
+    if _has_child_elements(title):
+      clean_title = _process_tails(title)
+      n_title_tags += 1
+
+    if clean_title:
+      title_lang = title.get(XML_LANG)
+
+    else:
+      warnings.add('No title', doc_id or '?')
+
+  alt_titles = bibliographic_info.find('alternativeTitles')
+
+  if alt_titles is not None:
+    for alt in alt_titles:
+      alt_lang = alt.get(XML_LANG)
+
+      if alt_lang and _process_tails(alt):
+        counters['title']['alt'][alt_lang] += 1
+
+  abstracts = bibliographic_info.find('abstracts')
+
+  if abstracts is not None:
+    for abstract in abstracts:
+      if _has_child_elements(abstract):
+        n_abstract_tags += 1
+
+      n_abstracts += 1
+      counters['abstracts']['lang'][abstract.get(XML_LANG)] += 1
+
+  aff_temp = bibliographic_info.find('authorsAffiliations')
+
+  if aff_temp is not None:
+    n_aff = len(aff_temp)
+
+  authors = bibliographic_info.find('creators')
+
+  if authors is not None:
+    for author in authors:
+      name = author.find(DC_CREATOR)
+
+      if name is not None and len(name) > 0:
+        n_authors += 1
+
+  additional_info = bibliographic_info.find('additionalDocumentInfo')
+  conference_info = additional_info.find('conferenceInfos')
+
+  if conference_info is not None:
+    n_conferences = len(conference_info.findall('conferenceInfo'))
+
+  article_info = additional_info.find('articleInfo')
+
+  if bibliographic_info.get('dependend') != 'false' and additional_info.find('journalInfo') is not None and article_info is not None:
+    pages = article_info.find('pages')
+
+    if pages is not None and pages.text is not None and len(pages.text.split("-")) != 2:
+      n_pages_error += 1
+
+  publication_info = bibliographic_info.find('publicationInfo')
+  publisher = publication_info.find(DC_PUBLISHER)
+
+  if publisher is not None and publisher.text is not None:
+    n_publisher += 1
+    publ_place = publication_info.find('publicationPlace')
+
+    if publ_place is not None and publ_place.text is not None:
+      n_publ_place += 1
+
+  publ_date = publication_info.find(DCTERMS_ISSUED)
+
+  if publ_date is not None and publ_date.text is not None:
+    counters['date']['values'][publ_date.text] += 1
+
+  # Classification Info
+
+  classification_info = document.find('classificationInfo')
+
+  if classification_info is not None:
+    classifications = classification_info.find('classifications')
+
+    if classifications is not None:
+      for c in classifications:
+        counters['classifications']['types'][c.get('classificationName')] += 1
+
+    subjects = classification_info.find('subjects')
+
+    if subjects is not None:
+      for sub in subjects:
+        if sub.text is not None:
+          counters['subjects']['values'][sub.text] += 1
+
+  # Functional Info
+
+  thesaurus = document.find('functionalInfo').find('thesaurusTerms')
+  synonyms = None
+
+  if thesaurus is not None:
+    synonyms = thesaurus.find('synonyms')
+
+  if synonyms is not None:
+    for syn in synonyms:
+      n_thesaurus += 1
+
+      if syn.get('type') in ('DES', 'SYN'):
+        counters['thesaurus']['des'][syn.text] += 1
+
+  # Stats
+
+  if title_lang is not None:
+    counters['title']['lang'][title_lang] += 1
+
+  stats.add_document(
+    authors_num=n_authors, authors_with_aff=n_aff,
+    identifiers_num=n_ident, identifiers_isbn10=n_isbn10, identifiers_isbn13=n_isbn13, identifiers_isbnX=n_isbnX,
+    identifiers_issn=n_issn, identifiers_eissn=n_eissn,
+    lang_num=n_lang, lang_error=n_lang_error, lang_iso3=n_iso3, lang_iso2=n_iso2,
+    pages_error=n_pages_error, size_num=n_sizes, locations_num=n_locations,
+    abstracts_num=n_abstracts, abstracts_tags=n_abstract_tags, title_tags=n_title_tags,
+    conference_num=n_conferences, copyright_num=n_copyright,
+    publisher_num=n_publisher, publisher_place=n_publ_place, thesaurus_num=n_thesaurus
+  )
+
+
+def _record_id(record):
+  """
+  Gibt die WTI-ID eines Records aus dem Feld 007G (Unterfeld 0) zurück.
+
+  :param record: der Record
+  :type record: PicaRecord
+  :returns: str -- die ID oder `None`
+  """
+
+  for field in record.fields:
+    if field.tag == '007G':
+      return dict(field.subfields).get('0')
+
+  return None
+
+
+def _serialize_record(record, num_record, warnings=None):
+  """
+  Diese Funktion wandelt einen `PicaRecord` in einen String im PICA-Internformat um.
+
+  Beispiel eines Records mit zwei Feldern::
+
+    <1D>
+    ##TitleSequenceNumber 1
+    <1E>002@ <1F>0Osx
+    <1E>031N <1F>d15<1F>j2004
+
+  :param record: der Record
+  :type record: PicaRecord
+  :param num_record: die laufende Titelanzahl in der aktuellen Datei
+  :type num_record: int
+  :param warnings: die Zusammenfassung für Unterfelder ohne Text (ansonsten wird jedes einzeln geloggt)
+  :type warnings: WarningSummary
+  :returns: str
+  """
+  parts = ['<1D>\n##TitleSequenceNumber ', str(num_record), '\n']
+
+  for field in record.sorted_fields():
+    parts.append('<1E>' + field.tag + ' ')
+
+    for code, value in field.subfields:
+      parts.append('<1F>' + code)
+
+      if type(value) is str:
+        parts.append(value)
+
+      else:
+        _invalid_subfield(record, field, code, value, warnings)
+
+    parts.append('\n')
+
+  parts.append('\n')
+
+  return ''.join(parts)
+
+
+def _invalid_subfield(record, field, code, value, warnings):
+  """
+  Meldet ein Unterfeld ohne Text, das beim Serialisieren ausgelassen wird.
+
+  :param record: der Record
+  :type record: PicaRecord
+  :param field: das Feld
+  :type field: PicaField
+  :param code: der Unterfeld-Code
+  :type code: str
+  :param value: der Wert des Unterfelds
+  :param warnings: die Zusammenfassung (ansonsten wird die Warnung direkt geloggt)
+  :type warnings: WarningSummary
+  """
+
+  if warnings is not None:
+    warnings.add('Subfield without text', 'TEMA' + str(_record_id(record) or '?') + ':' + field.tag + '$' + code)
+
+  else:
+    log.warning(field.tag)
+    log.warning(code)
+    log.warning((code, value))
+
+
+# Zeilenumbrüche würden im normalisierten und im Plain-Format das Ende eines Records bzw. Felds markieren
+_LINE_BREAKS = str.maketrans('\n\r', '  ')
+
+
+def _serialize_normalized(record, num_record, warnings=None):
+  """
+  Diese Funktion wandelt einen `PicaRecord` in einen String im normalisierten PICA+ um: Unterfelder beginnen mit
+  0x1F, Felder enden mit 0x1E und jeder Record steht in einer Zeile. Zeilenumbrüche in Werten werden durch
+  Leerzeichen ersetzt.
+
+  Beispiel eines Records mit zwei Feldern (0x1F als `<US>`, 0x1E als `<RS>`)::
+
+    002@ <US>0Osx<RS>031N <US>d15<US>j2004<RS>
+
+  :param record: der Record
+  :type record: PicaRecord
+  :param num_record: die laufende Titelanzahl (wird im normalisierten Format nicht ausgegeben)
+  :type num_record: int
+  :param warnings: die Zusammenfassung für Unterfelder ohne Text (ansonsten wird jedes einzeln geloggt)
+  :type warnings: WarningSummary
+  :returns: str
+  """
+  parts = []
+
+  for field in record.sorted_fields():
+    parts.append(field.tag + ' ')
+
+    for code, value in field.subfields:
+      parts.append('\x1f' + code)
+
+      if type(value) is str:
+        if '\n' in value or '\r' in value:
+          value = value.translate(_LINE_BREAKS)
+
+        parts.append(value)
+
+      else:
+        _invalid_subfield(record, field, code, value, warnings)
+
+    parts.append('\x1e')
+
+  parts.append('\n')
+
+  return ''.join(parts)
+
+
+def _serialize_plain(record, num_record, warnings=None):
+  """
+  Diese Funktion wandelt einen `PicaRecord` in einen String im PICA-Plain-Format um: ein Feld pro Zeile,
+  Unterfelder mit `$`, ein `$` im Wert wird als `$$` geschrieben. Records sind durch eine Leerzeile getrennt.
+
+  Beispiel eines Records mit zwei Feldern::
+
+    002@ $0Osx
+    031N $d15$j2004
+
+  :param record: der Record
+  :type record: PicaRecord
+  :param num_record: die laufende Titelanzahl (wird im Plain-Format nicht ausgegeben)
+  :type num_record: int
+  :param warnings: die Zusammenfassung für Unterfelder ohne Text (ansonsten wird jedes einzeln geloggt)
+  :type warnings: WarningSummary
+  :returns: str
+  """
+  parts = []
+
+  for field in record.sorted_fields():
+    parts.append(field.tag + ' ')
+
+    for code, value in field.subfields:
+      parts.append('$' + code)
+
+      if type(value) is str:
+        if '\n' in value or '\r' in value:
+          value = value.translate(_LINE_BREAKS)
+
+        parts.append(value.replace('$', '$$'))
+
+      else:
+        _invalid_subfield(record, field, code, value, warnings)
+
+    parts.append('\n')
+
+  parts.append('\n')
+
+  return ''.join(parts)
+
+
+SERIALIZERS = {
+  'intern': _serialize_record,
+  'normalized': _serialize_normalized,
+  'plain': _serialize_plain
+}
+
+
+def write_to_file(record, num_record, fpath, output_format=Constants.OUTPUT_FORMAT):
+  """
+  Diese Funktion hängt einen Record im gewählten Format (UTF-8) an eine Datei an.
+
+  Für viele Records sollte stattdessen ein `PicaWriter` verwendet werden, der die Datei nur einmal öffnet.
+
+  :param record: der Record
+  :type record: PicaRecord
+  :param num_record: die laufende Titelanzahl in der aktuellen Datei
+  :type num_record: int
+  :param fpath: der Dateiname inklusive Pfad
+  :type fpath: str
+  :param output_format: das Format aus `SERIALIZERS` ('intern', 'normalized' oder 'plain')
+  :type output_format: str
+  """
+
+  with open(fpath, 'ab') as f:
+    f.write(SERIALIZERS[output_format](record, num_record).encode('utf-8'))
+
+
+def _manifest_path(fpath, output_format=Constants.OUTPUT_FORMAT):
+  """
+  Gibt den Dateinamen des Manifests zu einer (in Shards geteilten) Output-Datei zurück.
+
+  :param fpath: der Dateiname der Output-Datei inklusive Pfad und Endung
+  :type fpath: str
+  :param output_format: das Format der Output-Datei
+  :type output_format: str
+  :returns: str
+  """
+
+  extension = Constants.FORMAT_EXTENSIONS[output_format]
+
+  return fpath[:len(fpath) - len(extension)] + '_manifest.json'
+
+
+def _checkpoint_path(fpath, output_format=Constants.OUTPUT_FORMAT):
+  """
+  Gibt den Dateinamen des Checkpoints zu einer Output-Datei zurück.
+
+  :param fpath: der Dateiname der Output-Datei inklusive Pfad und Endung
+  :type fpath: str
+  :param output_format: das Format der Output-Datei
+  :type output_format: str
+  :returns: str
+  """
+
+  extension = Constants.FORMAT_EXTENSIONS[output_format]
+
+  return fpath[:len(fpath) - len(extension)] + '_checkpoint.json'
+
+
+def _save_checkpoint(fpath, output_format, writer, xml_file, docs, records, stats, warnings, index_summary, num_warn, done=False):
+  """
+  Schreibt den Checkpoint einer Output-Datei: die Anzahl der verarbeiteten Titel, den Stand des `PicaWriter`
+  (dessen Puffer dabei geschrieben wird) und alle bisher kumulierten Ergebnisse. Die Datei wird atomar ersetzt, sodass
+  immer ein vollständiger Checkpoint vorliegt.
+
+  :param fpath: der Dateiname der Output-Datei inklusive Pfad und Endung
+  :type fpath: str
+  :param output_format: das Format der Output-Datei
+  :type output_format: str
+  :param writer: der Writer der Output-Datei oder `None`
+  :type writer: PicaWriter
+  :param xml_file: die XML-Datei inklusive Pfad
+  :type xml_file: str
+  :param docs: die Anzahl der bereits verarbeiteten (auch übersprungenen) `<document>`-Elemente
+  :type docs: int
+  :param records: die Anzahl der bereits geschriebenen Records
+  :type records: int
+  :param stats: die bisherigen Statistiken
+  :type stats: StatsAccumulator
+  :param warnings: die bisherigen Warnungen zu einzelnen Titeln
+  :type warnings: WarningSummary
+  :param index_summary: die bisherigen Ergebnisse des Index
+  :type index_summary: IndexSummary
+  :param num_warn: die Anzahl an Parser-Fehlern
+  :type num_warn: int
+  :param done: eine Flag, ob die XML-Datei vollständig verarbeitet wurde
+  :type done: bool
+  """
+
+  state = {
+    'file': os.path.basename(xml_file),
+    'docs': docs,
+    'records': records,
+    'done': done,
+    'writer': writer.checkpoint() if writer is not None else None,
+    'stats': stats.to_state(),
+    'warnings': warnings.to_dict(),
+    'index': index_summary.to_state(),
+    'num_warn': num_warn
+  }
+
+  _dump_json(_checkpoint_path(fpath, output_format), state)
+
+
+def _load_checkpoint(fpath, output_format, xml_file):
+  """
+  Liest den Checkpoint einer Output-Datei, wenn er zur XML-Datei passt.
+
+  :param fpath: der Dateiname der Output-Datei inklusive Pfad und Endung
+  :type fpath: str
+  :param output_format: das Format der Output-Datei
+  :type output_format: str
+  :param xml_file: die XML-Datei inklusive Pfad
+  :type xml_file: str
+  :returns: dict -- der Checkpoint mit wiederhergestellten Ergebnissen ('stats', 'warnings', 'index') oder `None`
+  """
+
+  path = _checkpoint_path(fpath, output_format)
+
+  if not os.path.isfile(path):
+    return None
+
+  with open(path) as f:
+    state = json.load(f)
+
+  if state['file'] != os.path.basename(xml_file):
+    log.warning("Checkpoint " + path + " belongs to " + state['file'] + ", ignoring it..")
+    return None
+
+  state['stats'] = StatsAccumulator.from_state(state['stats'])
+  state['warnings'] = WarningSummary.from_dict(state['warnings'])
+  state['index'] = IndexSummary.from_state(state['index'])
+
+  return state
+
+
+def _open_output(fpath, compression=None, compress_level=None, mode='wb'):
+  """
+  Öffnet eine Output-Datei binär (standardmäßig neu, eine vorhandene Datei wird überschrieben), ggf. als mit gzip
+  oder zstd komprimierter Stream.
+
+  Für zstd wird das optionale Paket 'zstandard' benötigt.
+
+  :param fpath: der Dateiname inklusive Pfad und ggf. Endung der Komprimierung
+  :type fpath: str
+  :param compression: 'gzip', 'zstd' oder `None`
+  :type compression: str
+  :param compress_level: die Kompressionsstufe (ansonsten der Standard aus `Constants.COMPRESS_LEVELS`)
+  :type compress_level: int
+  :param mode: 'ab' oder 'wb'
+  :type mode: str
+  :returns: file object
+  """
+
+  if compression is None:
+    return open(fpath, mode)
+
+  if compress_level is None:
+    compress_level = Constants.COMPRESS_LEVELS[compression]
+
+  if compression == 'gzip':
+    return gzip.open(fpath, mode, compresslevel=compress_level)
+
+  import zstandard
+
+  return zstandard.ZstdCompressor(level=compress_level).stream_writer(open(fpath, mode))
+
+
+def _move_to_prev(fpath, compression=None, compress_level=None):
+  """
+  Benennt eine Output-Datei eines früheren Laufs in '.prev' um. Ist eine Komprimierung gewählt, wird eine
+  unkomprimierte Datei dabei komprimiert ('<name>.prev.gz'), bereits komprimierte Dateien behalten ihre Endung.
+
+  :param fpath: der Dateiname inklusive Pfad
+  :type fpath: str
+  :param compression: 'gzip', 'zstd' oder `None`
+  :type compression: str
+  :param compress_level: die Kompressionsstufe
+  :type compress_level: int
+  """
+
+  for extension in Constants.COMPRESSION_EXTENSIONS.values():
+    if fpath.endswith(extension):
+      os.rename(fpath, fpath[:-len(extension)] + ".prev" + extension)
+      return
+
+  if compression is None:
+    os.rename(fpath, fpath + ".prev")
+    return
+
+  with open(fpath, 'rb') as src, _open_output(fpath + ".prev" + Constants.COMPRESSION_EXTENSIONS[compression], compression, compress_level) as dst:
+    shutil.copyfileobj(src, dst, Constants.WRITE_BUFFER_SIZE)
+
+  os.remove(fpath)
+
+
+def _keep_previous(fpath, output_format=Constants.OUTPUT_FORMAT, compression=None, compress_level=None):
+  """
+  Benennt die Output-Datei eines früheren Laufs (bzw. alle Shards '<name>_NNNNN<Endung>' und das Manifest sowie
+  einen Checkpoint) mit `_move_to_prev()` in '.prev' um, damit der neue Lauf nicht an sie anhängt. Berücksichtigt
+  werden unkomprimierte und komprimierte Output-Dateien. Die Shards werden auch ohne Manifest gefunden, z.B. nach
+  einem abgebrochenen Lauf.
+
+  :param fpath: der Dateiname der Output-Datei inklusive Pfad und Endung, ohne Endung der Komprimierung
+  :type fpath: str
+  :param output_format: das Format der Output-Datei
+  :type output_format: str
+  :param compression: 'gzip', 'zstd' oder `None`
+  :type compression: str
+  :param compress_level: die Kompressionsstufe
+  :type compress_level: int
+  """
+
+  for extension in [''] + list(Constants.COMPRESSION_EXTENSIONS.values()):
+    if os.path.isfile(fpath + extension):
+      _move_to_prev(fpath + extension, compression, compress_level)
+
+  directory, fname = os.path.split(fpath)
+  extension = Constants.FORMAT_EXTENSIONS[output_format]
+  shard_name = re.compile(re.escape(fname[:len(fname) - len(extension)]) + r'_[0-9]{5}' + re.escape(extension) +
+                          '(' + '|'.join(re.escape(e) for e in Constants.COMPRESSION_EXTENSIONS.values()) + ')?')
+
+  for name in sorted(os.listdir(directory or '.')):
+    if shard_name.fullmatch(name) and os.path.isfile(os.path.join(directory, name)):
+      _move_to_prev(os.path.join(directory, name), compression, compress_level)
+
+  manifest = _manifest_path(fpath, output_format)
+
+  if os.path.isfile(manifest):
+    os.rename(manifest, manifest + ".prev")
+
+  checkpoint = _checkpoint_path(fpath, output_format)
+
+  if os.path.isfile(checkpoint):
+    os.rename(checkpoint, checkpoint + ".prev")
+
+
+class _BackgroundWriter(object):
+  """
+  Schreibt Daten in einem eigenen Thread in ein Dateiobjekt, damit die Komprimierung (zlib und zstd geben dabei den
+  GIL frei) parallel zur Konvertierung läuft. Die Queue ist begrenzt, sodass der Speicherbedarf konstant bleibt.
+
+  Ein Fehler im Thread wird beim nächsten `write()` oder spätestens bei `close()` ausgelöst.
+
+  :param fileobj: Das Dateiobjekt, z.B. aus `_open_output()`
+  :type fileobj: file object
+  """
+
+  def __init__(self, fileobj):
+    self._file = fileobj
+    self._queue = queue.Queue(maxsize=Constants.BACKGROUND_QUEUE_SIZE)
+    self._error = None
+    self._thread = threading.Thread(target=self._run, daemon=True)
+    self._thread.start()
+
+  def _run(self):
+    while True:
+      data = self._queue.get()
+
+      if data is None:
+        break
+
+      if self._error is None:
+        try:
+          self._file.write(data)
+
+        except Exception as e:
+          self._error = e
+
+  def write(self, data):
+    if self._error is not None:
+      raise self._error
+
+    self._queue.put(data)
+
+  def close(self):
+    self._queue.put(None)
+    self._thread.join()
+
+    try:
+      self._file.close()
+
+    finally:
+      if self._error is not None:
+        raise self._error
+
+
+class PicaWriter(object):
+  """
+  Schreibt Records gepuffert und binär (UTF-8) in eine Datei, im PICA-Internformat oder einem anderen Format aus
+  `SERIALIZERS`.
+
+  Die Datei wird beim ersten Schreiben einmalig geöffnet, jeder Record wird als ein String aufgebaut, kodiert und
+  erst geschrieben, wenn mindestens `buffer_size` Bytes zusammengekommen sind. Das Ergebnis ist identisch mit
+  wiederholten Aufrufen von `write_to_file()`.
+
+  Mit `compression` wird jede Datei als gzip- oder zstd-Stream geschrieben ('.gz' bzw. '.zst'), komprimiert wird
+  in einem `_BackgroundWriter`.
+
+  Mit `shard_records` und/oder `shard_bytes` wird stattdessen in nummerierte Shards geschrieben
+  ('<name>_00001<Endung>', ...), die an Record-Grenzen gewechselt werden, sobald der nächste Record eine der
+  Grenzen überschreiten würde. Beim Schließen wird ein Manifest ('<name>_manifest.json') mit Namen, Anzahl an
+  Records, Größe und der ersten und letzten WTI-ID (007G) jedes Shards geschrieben.
+
+  Mit `checkpoint()` und `restore()` kann eine unterbrochene Ausgabe (unkomprimiert) fortgesetzt werden.
+
+  :param fpath: der Dateiname inklusive Pfad
+  :type fpath: str
+  :param buffer_size: die Puffergröße in Bytes
+  :type buffer_size: int
+  :param warnings: die Zusammenfassung für Warnungen beim Schreiben (ansonsten wird jede einzeln geloggt)
+  :type warnings: WarningSummary
+  :param output_format: das Format ('intern', 'normalized' oder 'plain')
+  :type output_format: str
+  :param shard_records: die höchste Anzahl an Records pro Shard (0: unbegrenzt)
+  :type shard_records: int
+  :param shard_bytes: die höchste Größe eines Shards in Bytes (0: unbegrenzt, vor der Komprimierung)
+  :type shard_bytes: int
+  :param compression: 'gzip', 'zstd' oder `None`
+  :type compression: str
+  :param compress_level: die Kompressionsstufe (ansonsten der Standard aus `Constants.COMPRESS_LEVELS`)
+  :type compress_level: int
+  """
+
+  def __init__(self, fpath, buffer_size=Constants.WRITE_BUFFER_SIZE, warnings=None, output_format=Constants.OUTPUT_FORMAT, shard_records=0, shard_bytes=0, compression=None, compress_level=None):
+    self.fpath = fpath
+    self.buffer_size = buffer_size
+    self.warnings = warnings
+    self.output_format = output_format
+    self.shard_records = shard_records
+    self.shard_bytes = shard_bytes
+    self.compression = compression
+    self.compress_level = compress_level
+    self.shards = []
+    self._suffix = Constants.COMPRESSION_EXTENSIONS.get(compression, '')
+    self._serialize = SERIALIZERS[output_format]
+    self._path = fpath
+    self._shard = None
+    self._file = None
+    self._append = False
+    self._buffer = []
+    self._buffered = 0
+
+  def write(self, record, num_record):
+    """
+    Fügt einen Record dem Puffer hinzu und schreibt den Puffer, wenn er voll ist.
+
+    :param record: der Record
+    :type record: PicaRecord
+    :param num_record: die laufende Titelanzahl in der aktuellen Datei
+    :type num_record: int
+    """
+    chunk = self._serialize(record, num_record, self.warnings).encode('utf-8')
+
+    if self.shard_records or self.shard_bytes:
+      self._count_shard(record, len(chunk))
+
+    self._buffer.append(chunk)
+    self._buffered += len(chunk)
+
+    if self._buffered >= self.buffer_size:
+      self.flush()
+
+  def _count_shard(self, record, size):
+    """
+    Zählt einen Record zum aktuellen Shard und wechselt vorher zum nächsten, wenn eine Grenze erreicht ist.
+
+    :param record: der Record
+    :type record: PicaRecord
+    :param size: die Größe des serialisierten Records in Bytes
+    :type size: int
+    """
+    shard = self._shard
+
+    if shard is None or (self.shard_records and shard['records'] >= self.shard_records) or \
+       (self.shard_bytes and shard['records'] > 0 and shard['bytes'] + size > self.shard_bytes):
+      shard = self._next_shard()
+
+    record_id = _record_id(record)
+
+    if shard['records'] == 0:
+      shard['first_id'] = record_id
+
+    shard['last_id'] = record_id
+    shard['records'] += 1
+    shard['bytes'] += size
+
+  def _next_shard(self):
+    """
+    Schließt den aktuellen Shard und beginnt den nächsten.
+
+    :returns: dict -- der Eintrag des neuen Shards im Manifest
+    """
+    self.flush()
+
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+
+    self._path = self._shard_path(len(self.shards) + 1)
+    self._shard = {'name': os.path.basename(self._path) + self._suffix, 'records': 0, 'bytes': 0, 'first_id': None, 'last_id': None}
+    self.shards.append(self._shard)
+
+    return self._shard
+
+  def _shard_path(self, num):
+    """
+    Gibt den Dateinamen (ohne Endung der Komprimierung) eines Shards zurück.
+
+    :param num: die Nummer des Shards
+    :type num: int
+    :returns: str
+    """
+    extension = Constants.FORMAT_EXTENSIONS[self.output_format]
+
+    return self.fpath[:len(self.fpath) - len(extension)] + '_{:05d}'.format(num) + extension
+
+  def checkpoint(self):
+    """
+    Schreibt den Puffer und gibt den Stand der Ausgabe zurück.
+
+    :returns: dict -- die aktuelle Datei ('name'), deren Größe ('offset') und die bisherigen Shards ('shards')
+    """
+    self.flush()
+    offset = os.path.getsize(self._path) if os.path.isfile(self._path) else 0
+
+    return {'name': os.path.basename(self._path), 'offset': offset, 'shards': self.shards}
+
+  def restore(self, state):
+    """
+    Setzt die Ausgabe auf einen mit `checkpoint()` gespeicherten Stand zurück: Die aktuelle Datei wird auf die
+    gespeicherte Größe gekürzt, danach begonnene Shards werden gelöscht. Weitere Records werden an die aktuelle
+    Datei angehängt, alle anderen Dateien werden neu angelegt.
+
+    :param state: der gespeicherte Stand
+    :type state: dict
+    """
+    self._path = os.path.join(os.path.dirname(self.fpath), state['name'])
+    self.shards = state['shards']
+    self._shard = self.shards[-1] if self.shards else None
+
+    if os.path.isfile(self._path):
+      os.truncate(self._path, state['offset'])
+      self._append = True
+
+    num = len(self.shards) + 1
+
+    while os.path.isfile(self._shard_path(num)):
+      os.remove(self._shard_path(num))
+      num += 1
+
+  def flush(self):
+    """
+    Schreibt den Puffer in die Datei.
+    """
+    if not self._buffer:
+      return
+
+    if self._file is None:
+      if self.compression is None:
+        self._file = open(self._path, 'ab' if self._append else 'wb')
+        self._append = False
+
+      else:
+        self._file = _BackgroundWriter(_open_output(self._path + self._suffix, self.compression, self.compress_level, 'wb'))
+
+    self._file.write(b''.join(self._buffer))
+
+    if self.compression is None:
+      self._file.flush()
+
+    self._buffer = []
+    self._buffered = 0
+
+  def close(self):
+    """
+    Schreibt den restlichen Puffer, schließt die Datei und schreibt ggf. das Manifest der Shards.
+    """
+    self.flush()
+
+    if self._file is not None:
+      self._file.close()
+      self._file = None
+
+    if self.shards:
+      manifest = {
+        'format': self.output_format,
+        'compression': self.compression,
+        'records': sum(shard['records'] for shard in self.shards),
+        'shards': self.shards
+      }
+
+      with open(_manifest_path(self.fpath, self.output_format), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *exc):
+    self.close()
+
+
+def _max_val(d):
+  """
+  Bestimmt den Maximalwert in einem Dictionary und gibt in mit dem dazugehörigen Key zurück.
+  
+  :param d: Das zu untersuchende Python-Dictionary
+  :type d: dict
+  :returns: list
+  """
+
+  v=list(d.values())
+  k=list(d.keys())
+
+  if len(v) > 0 and len(k) > 0:
+    return [k[v.index(max(v))], max(v)]
+
+  else:
+    return [None,None]
+
+
+def _min_val(d):
+  """
+  Bestimmt den Minimalwert in einem Dictionary und gibt in mit dem dazugehörigen Key zurück.
+  
+  :param d: Das zu untersuchende Python-Dictionary
+  :type d: dict
+  :returns: list
+  """
+
+  v=list(d.values())
+  k=list(d.keys())
+
+  if len(v) > 0 and len(k) > 0:
+    return [k[v.index(min(v))], min(v)]
+
+  else:
+    return [None,None]
+
+
+def prepare_stats(stats, stats_path):
+  """
+  Diese Funktion erzeugt CSV-Dateien für die Inhalte eines Dictionaries mit Statistiken.
+
+  Struktur der `stats`::
+
+    {
+      'lang':{
+        'num':{'1': 20, '0': 50, '2': 10},
+        'names':{'de': 30, 'en': 10}
+      },
+      'genres':{
+        'values':{'J': 300, 'CA': 80, 'B': 10}
+      }
+    }
+
+  :param stats: Die übergebenen Statistiken
+  :type stats: dict.
+  """
+  
+  statsSubf = current_date + '/'
+  os.makedirs(stats_path + statsSubf, exist_ok=True)
+  
+  with open(stats_path + statsSubf + "topic_stats.csv", 'w+') as sf:
+    sf.write("name,num_keys,max_key,max_occ,max_occ_key,min_key,min_occ,min_occ_key,mean\n")
+
+    for topic, value in stats.items():
+      if type(value) is dict:
+        for sub_topic, sval in value.items():
+          row_name = topic + "_" + sub_topic
+
+          if type(sval) is dict:
+            max_key, max_val = _max_val(sval)
+            min_key, min_val = _min_val(sval)
+            vals = list(sval.values())
+            keys = list(sval.keys())
+            int_keys = []
+            num_zero = ""
+            is_string = 0
+            mean = -1
+
+            if "0" in sval:
+              num_zero = str(sval["0"])
+
+            with open(stats_path + statsSubf + row_name + ".csv", 'w+') as subfield_stats:
+              subfield_stats.write("value,num\n")
+
+              # Wie `sorted(..., reverse=True)[:10]` (bei gleicher Anzahl bleibt die Reihenfolge erhalten), aber ohne
+              # alle Werte zu sortieren
+              kv_list = heapq.nlargest(10, ((k, v) for k, v in sval.items() if k is not None and v is not None), key=operator.itemgetter(1))
+
+              for k, v in kv_list:
+                subfield_stats.write(k + "," + str(v) + "\n")
+
+            if len(vals) > 0:
+              for k in keys:
+                try:
+                  int_keys.append(int(k))
+
+                except:
+                  is_string = 1
+
+              if is_string == 0:
+                sorted_keys = sorted([int(x) for x in int_keys])
+
+                summage = 0
+
+                for k, v in sval.items():
+                  summage += int(k)*v
+
+                mean = round(summage/stats['num'], 2)
+
+                sf.write(row_name + ",")
+                sf.write(str(len(keys)) + ",")
+
+                if max_key is not None:
+                  sf.write(str(sorted_keys[-1]) + "," + str(max_val) + "," + str(max_key))
+
+                else:
+                  sf.write(",")
+
+                sf.write(",")
+
+                if min_key is not None:
+                  sf.write(str(sorted_keys[0]) + "," + str(min_val) + "," + str(min_key))
+
+                else:
+                  sf.write(",")
+
+                sf.write(",")
+
+                if num_zero:
+                  sf.write(num_zero)
+
+                sf.write(",")
+
+                if mean != -1:
+                  sf.write(str(mean))
+
+                sf.write("\n")
+
+          else:
+            log.warning("Skipped subtopic " + sub_topic + " of " + topic + "!")
+      elif topic != 'num':
+        log.warning("Skipped topic " + topic + "!")
+
+
+
+def save_stats(stats, fpath, num_files, sources=None):
+  """
+  Schreibt die Statistiken eines Laufs kompakt als JSON (`StatsAccumulator.to_state()`) neben die CSV-Dateien, damit
+  sie später mit '--merge_stats' mit denen anderer Läufe zusammengeführt werden können, ohne die XML-Dateien erneut
+  zu lesen.
+
+  :param stats: Die Statistiken
+  :type stats: StatsAccumulator
+  :param fpath: Der Dateiname inklusive Pfad
+  :type fpath: str
+  :param num_files: Die Anzahl der ausgewerteten XML-Dateien
+  :type num_files: int
+  :param sources: Die zusammengeführten Statistik-Dateien (nur bei '--merge_stats')
+  :type sources: list
+  """
+
+  data = {
+    'date': current_date,
+    'files': num_files,
+    'stats': stats.to_state()
+  }
+
+  if sources:
+    data['sources'] = [os.path.abspath(source) for source in sources]
+
+  _dump_json(fpath, data)
+
+
+def load_stats(fpath):
+  """
+  Liest Statistiken, die mit `save_stats()` geschrieben wurden.
+
+  :param fpath: Der Dateiname inklusive Pfad
+  :type fpath: str
+  :returns: list -- die Statistiken (`StatsAccumulator`) und die Anzahl der ausgewerteten XML-Dateien
+  """
+
+  with open(fpath) as f:
+    data = json.load(f)
+
+  return [StatsAccumulator.from_state(data['stats']), data['files']]
+
+
+def _find_stats(paths):
+  """
+  Sucht die Statistik-Dateien für '--merge_stats': Dateien werden direkt übernommen, Verzeichnisse rekursiv nach
+  `Constants.STATS_FNAME` durchsucht (sortiert, ohne die Ergebnisse früherer Zusammenführungen in
+  `Constants.MERGED_STATS_PATH`). Jede Datei wird nur einmal gezählt.
+
+  :param paths: Die übergebenen Dateien und Verzeichnisse
+  :type paths: list
+  :returns: list
+  """
+
+  merged_path = os.path.realpath(Constants.MERGED_STATS_PATH)
+  found = []
+  seen = set()
+
+  for path in paths:
+    if os.path.isdir(path):
+      candidates = []
+
+      for root, dirs, files in os.walk(path):
+        if os.path.realpath(root) == merged_path:
+          dirs[:] = []
+          continue
+
+        if Constants.STATS_FNAME in files:
+          candidates.append(os.path.join(root, Constants.STATS_FNAME))
+
+      candidates.sort()
+
+    else:
+      candidates = [path]
+
+    for candidate in candidates:
+      if os.path.realpath(candidate) not in seen:
+        seen.add(os.path.realpath(candidate))
+        found.append(candidate)
+
+  return found
+
+
+def merge_stats(fpaths):
+  """
+  Summiert die Statistiken beliebig vieler Läufe (aus `save_stats()`) in der übergebenen Reihenfolge. Der Aufwand
+  hängt nur von der Anzahl verschiedener Werte ab, nicht von der Anzahl der Titel.
+
+  :param fpaths: Die Statistik-Dateien
+  :type fpaths: list
+  :returns: list -- die Statistiken (`StatsAccumulator`) und die Anzahl der ausgewerteten XML-Dateien
+  """
+
+  all_stats = StatsAccumulator()
+  num_files = 0
+
+  for fpath in fpaths:
+    stats, files = load_stats(fpath)
+    all_stats.merge(stats)
+    num_files += files
+
+  return [all_stats, num_files]
+
+
+# Document index
+
+class DocumentIndex(object):
+  """
+  Ein persistenter Index (SQLite) der bereits konvertierten Titel mit ihrer WTI-ID (`documentID`, 007G) und einer
+  Prüfsumme des Quell-`<document>`. Titel, die unverändert im Index stehen, werden nicht erneut konvertiert.
+
+  Geschrieben wird der Index nur vom Hauptprozess am Ende eines Laufs (`update()`). Alle Prozesse prüfen daher gegen
+  denselben Stand, sodass das Ergebnis nicht von der Anzahl der Worker oder der Aufteilung der Dateien abhängt.
+
+  :param fpath: Der Dateiname der Datenbank (wird ggf. angelegt)
+  :type fpath: str
+  :param readonly: Eine Flag, ob die Datenbank nur zum Lesen geöffnet werden soll (z.B. in Worker-Prozessen)
+  :type readonly: bool
+  """
+
+  def __init__(self, fpath, readonly=False):
+    self.fpath = fpath
+
+    if readonly:
+      self._db = sqlite3.connect('file:' + quote(os.path.abspath(fpath)) + '?mode=ro', uri=True)
+
+    else:
+      self._db = sqlite3.connect(fpath)
+      self._db.execute("CREATE TABLE IF NOT EXISTS documents (doc_id TEXT PRIMARY KEY, hash TEXT NOT NULL, source TEXT, updated TEXT)")
+      self._db.commit()
+
+  def status(self, doc_id, content_hash):
+    """
+    Vergleicht einen Titel mit dem Index.
+
+    :param doc_id: Die WTI-ID
+    :type doc_id: str
+    :param content_hash: Die Prüfsumme aus `_document_key()`
+    :type content_hash: str
+    :returns: str -- 'new', 'changed' oder 'unchanged'
+    """
+    row = self._db.execute("SELECT hash FROM documents WHERE doc_id = ?", (doc_id,)).fetchone()
+
+    if row is None:
+      return 'new'
+
+    if row[0] == content_hash:
+      return 'unchanged'
+
+    return 'changed'
+
+  def update(self, entries):
+    """
+    Übernimmt neue und geänderte Titel in einer Transaktion in den Index.
+
+    :param entries: Prüfsumme und Quelldatei je WTI-ID, z.B. aus `IndexSummary.entries`
+    :type entries: dict
+    """
+    with self._db:
+      self._db.executemany("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+                           ((doc_id, content_hash, source, current_date) for doc_id, (content_hash, source) in entries.items()))
+
+  def __len__(self):
+    return self._db.execute("SELECT COUNT(*) FROM documents").fetchone()[0]
+
+  def close(self):
+    self._db.close()
+
+
+class IndexSummary(object):
+  """
+  Zählt die mit dem `DocumentIndex` geprüften Titel ('new', 'changed', 'unchanged' sowie 'repeated' für Titel, die
+  im selben Lauf mehrfach vorkommen) und sammelt die neuen und geänderten Titel für `DocumentIndex.update()`.
+
+  Teilergebnisse der Dateien bzw. Abschnitte werden mit `merge()` in ihrer Reihenfolge zusammengeführt.
+  """
+  __slots__ = ('counts', 'entries')
+
+  def __init__(self):
+    self.counts = collections.Counter()
+    self.entries = {}
+
+  def add(self, doc_id, content_hash, status, source):
+    """
+    Zählt einen geprüften Titel.
+
+    :param doc_id: Die WTI-ID
+    :type doc_id: str
+    :param content_hash: Die Prüfsumme aus `_document_key()`
+    :type content_hash: str
+    :param status: Das Ergebnis von `DocumentIndex.status()`
+    :type status: str
+    :param source: Der Name der XML-Datei
+    :type source: str
+    """
+    self.counts[status] += 1
+
+    if status != 'unchanged':
+      self._add_entry(doc_id, (content_hash, source))
+
+  def _add_entry(self, doc_id, entry):
+    if doc_id in self.entries:
+      self.counts['repeated'] += 1
+
+    self.entries[doc_id] = entry
+
+  def merge(self, other):
+    """
+    Addiert die Zähler und Titel einer anderen `IndexSummary`.
+
+    :param other: Die zu addierenden Ergebnisse
+    :type other: IndexSummary
+    """
+    self.counts.update(other.counts)
+
+    for doc_id, entry in other.entries.items():
+      self._add_entry(doc_id, entry)
+
+  def log_summary(self):
+    log.info("Document index: " + ", ".join(str(self.counts[status]) + " " + status for status in ('new', 'changed', 'unchanged', 'repeated')) + " (unchanged documents were skipped)")
+
+  def to_dict(self):
+    """
+    Gibt die Anzahl der Titel je Ergebnis zurück.
+
+    :returns: dict
+    """
+    return dict(sorted(self.counts.items()))
+
+  def to_state(self):
+    """
+    Gibt die Zähler und die gesammelten Titel für einen Checkpoint zurück. Das Gegenstück ist `from_state()`.
+
+    :returns: dict
+    """
+    return {'counts': dict(self.counts), 'entries': self.entries}
+
+  @classmethod
+  def from_state(cls, state):
+    """
+    Erzeugt eine `IndexSummary` aus dem Ergebnis von `to_state()`.
+
+    :param state: Die gespeicherten Zähler und Titel
+    :type state: dict
+    :returns: IndexSummary
+    """
+    summary = cls()
+    summary.counts.update(state['counts'])
+    summary.entries = {doc_id: tuple(entry) for doc_id, entry in state['entries'].items()}
+
+    return summary
+
+
+_indexes = {}
+
+def _get_index(fpath):
+  """
+  Gibt einen nur lesenden `DocumentIndex` zurück, der pro Prozess nur einmal geöffnet wird.
+
+  :param fpath: Der Dateiname der Datenbank
+  :type fpath: str
+  :returns: DocumentIndex
+  """
+
+  key = (os.getpid(), fpath)
+
+  if key not in _indexes:
+    _indexes[key] = DocumentIndex(fpath, readonly=True)
+
+  return _indexes[key]
+
+
+def _document_key(document):
+  """
+  Gibt die WTI-ID und eine Prüfsumme des kanonisierten (exklusives C14N) `<document>` zurück. Die Prüfsumme hängt
+  damit weder von der Formatierung noch von den Namespace-Deklarationen der jeweiligen Lieferung ab.
+
+  :param document: Ein `<document>`-Element
+  :type document: lxml.etree._Element
+  :returns: list -- die WTI-ID (`None`, wenn der Titel keine hat) und die Prüfsumme
+  """
+
+  system_info = document.find('systemInfo')
+  doc_id = system_info.find('documentID') if system_info is not None else None
+
+  if doc_id is None or not doc_id.text:
+    return [None, None]
+
+  try:
+    data = etree.tostring(document, method='c14n', exclusive=True, with_tail=False)
+
+  except etree.C14NError:
+    data = etree.tostring(document, with_tail=False)
+
+  return [doc_id.text, hashlib.blake2b(data, digest_size=16).hexdigest()]
+
+
+def _skip_document(document, index, summary, source):
+  """
+  Prüft einen Titel gegen den `DocumentIndex` und zählt das Ergebnis in der `IndexSummary`.
+
+  :param document: Ein `<document>`-Element
+  :type document: lxml.etree._Element
+  :param index: Der Index
+  :type index: DocumentIndex
+  :param summary: Die Zähler der Datei bzw. des Abschnitts
+  :type summary: IndexSummary
+  :param source: Der Name der XML-Datei
+  :type source: str
+  :returns: bool -- ob der Titel unverändert im Index steht und übersprungen werden kann
+  """
+
+  doc_id, content_hash = _document_key(document)
+
+  if doc_id is None:
+    return False
+
+  status = index.status(doc_id, content_hash)
+  summary.add(doc_id, content_hash, status, source)
+
+  return status == 'unchanged'
+
+# Parsing
+
+class DTDResolver(etree.Resolver):
+  """
+  Löst DTDs und externe Entitäten über einen lokalen Katalog auf, damit der Parser nie auf das Netzwerk zugreift.
+
+  Gesucht wird nach dem Dateinamen der System-ID, zuerst im Katalog-Verzeichnis und dann im Verzeichnis der gerade
+  verarbeiteten XML-Datei (`base_path`). Gefundene Dateien werden im Speicher gehalten. Fehlt eine DTD, wird
+  ohne sie weitergeparst.
+
+  :param catalog_path: Das Katalog-Verzeichnis mit den DTDs
+  :type catalog_path: str
+  """
+
+  def __init__(self, catalog_path):
+    super(DTDResolver, self).__init__()
+    self.catalog_path = catalog_path
+    self.base_path = ''
+    self._cache = {}
+
+  def resolve(self, system_url, public_id, context):
+    if not system_url:
+      return None
+
+    name = os.path.basename(urlsplit(system_url).path)
+
+    if name not in self._cache:
+      self._cache[name] = self._load(name)
+
+    if self._cache[name] is None:
+      return self.resolve_string('', context)
+
+    return self.resolve_string(self._cache[name], context)
+
+  def _load(self, name):
+    for directory in (self.catalog_path, self.base_path):
+      fpath = os.path.join(directory, name)
+
+      if os.path.isfile(fpath):
+        log.debug("Using local DTD " + fpath)
+
+        with open(fpath, 'rb') as f:
+          return f.read()
+
+    log.warning("DTD " + name + " not found in " + self.catalog_path + ", parsing without it!")
+
+    return None
+
+
+_parsers = {}
+
+
+def _get_parser(dtd_path, huge_tree=False):
+  """
+  Gibt einen für `<document>`-Elemente konfigurierten Pull-Parser mit `DTDResolver` zurück.
+
+  Der Parser wird pro Prozess und Katalog nur einmal erzeugt und für alle Dateien wiederverwendet. Kommentare und
+  Processing Instructions werden gar nicht erst in den Baum übernommen.
+
+  :param dtd_path: Das Katalog-Verzeichnis mit den DTDs
+  :type dtd_path: str
+  :param huge_tree: Eine Flag, ob die Sicherheitslimits von libxml2 (Tiefe, Textlänge) aufgehoben werden sollen
+  :type huge_tree: bool
+  :returns: list -- der Parser und sein Resolver
+  """
+
+  key = (os.getpid(), dtd_path, huge_tree)
+
+  if key not in _parsers:
+    parser = etree.XMLPullParser(events=('end',), tag="document", load_dtd=True, no_network=True,
+                                 remove_comments=True, remove_pis=True, huge_tree=huge_tree)
+    resolver = DTDResolver(dtd_path)
+    parser.resolvers.add(resolver)
+    _parsers[key] = [parser, resolver]
+
+  return _parsers[key]
+
+
+def _release(document):
+  """
+  Gibt ein verarbeitetes `<document>` frei. Neben dem Inhalt des Elements werden auch alle vorherigen
+  Geschwister (auch die der Vorfahren) aus dem Baum entfernt, da geleerte Elemente sonst an der Wurzel hängen
+  bleiben und der Speicherbedarf mit der Dateigröße wächst.
+
+  :param document: Das verarbeitete Element
+  :type document: etree._Element
+  """
+
+  document.clear(keep_tail=True)
+
+  node = document
+  parent = node.getparent()
+
+  while parent is not None:
+    while node.getprevious() is not None:
+      del parent[0]
+
+    node = parent
+    parent = node.getparent()
+
+
+def _iter_documents(blocks, base_path, dtd_path=Constants.DTD_PATH, huge_tree=False):
+  """
+  Parst eine XML-Datei blockweise und liefert die `<document>`-Elemente, sobald sie vollständig sind.
+
+  Jedes `<document>` wird mit `_release()` freigegeben, sobald das nächste angefordert wird, sodass der
+  Speicherbedarf unabhängig von der Dateigröße bleibt. Verweise auf ein Element dürfen daher nicht über
+  einen Schritt hinaus gehalten werden.
+
+  :param blocks: Die Datei als Folge von Byte-Blöcken
+  :type blocks: iterable
+  :param base_path: Das Verzeichnis der XML-Datei (für relative DTD-Angaben)
+  :type base_path: str
+  :param dtd_path: Das Katalog-Verzeichnis mit den DTDs
+  :type dtd_path: str
+  :param huge_tree: Eine Flag, ob die Sicherheitslimits von libxml2 aufgehoben werden sollen
+  :type huge_tree: bool
+  :returns: generator -- Tupel aus Event und `etree._Element`
+  """
+
+  parser, resolver = _get_parser(dtd_path, huge_tree)
+  resolver.base_path = base_path
+  closed = False
+
+  try:
+    for block in blocks:
+      parser.feed(block)
+
+      for event, document in parser.read_events():
+        yield event, document
+        _release(document)
+
+    parser.close()
+    closed = True
+
+  finally:
+    if not closed:
+      # Setzt den Parser nach einem Fehler für die nächste Datei zurück
+      try:
+        parser.close()
+
+      except etree.XMLSyntaxError:
+        pass
+
+# Parser target
+
+class _Node(object):
+  """
+  Ein leichtgewichtiger Ersatz für `etree._Element` in `DocumentTarget`, der nur die Teile der API anbietet, die
+  von den Regeln in `DOCUMENT_RULES` verwendet werden (`tag`, `text`, `tail`, `get()`, `iterchildren()`,
+  Iteration und `len()`).
+
+  :param tag: Der Name des Elements
+  :type tag: str
+  :param attrib: Die Attribute des Elements
+  :type attrib: dict
+  """
+  __slots__ = ('tag', 'attrib', 'text', 'tail', 'children')
+
+  def __init__(self, tag, attrib):
+    self.tag = tag
+    self.attrib = attrib
+    self.text = None
+    self.tail = None
+    self.children = []
+
+  def get(self, key, default=None):
+    return self.attrib.get(key, default)
+
+  def iterchildren(self, tag=None):
+    for child in self.children:
+      if tag is None or child.tag == tag:
+        yield child
+
+  def __iter__(self):
+    return iter(self.children)
+
+  def __len__(self):
+    return len(self.children)
+
+
+def _document_counters():
+  """
+  Gibt leere Zähler in der Struktur von `StatsAccumulator.counters` zurück, die erst bei Bedarf angelegt werden.
+
+  :returns: collections.defaultdict
+  """
+
+  return collections.defaultdict(lambda: collections.defaultdict(collections.Counter))
+
+
+class DocumentTarget(object):
+  """
+  Ein Parser-Target für lxml, das die PICA-Records direkt aus den Events des Parsers (`start()`, `data()`,
+  `end()`) erzeugt, ohne dass ein Baum aus `etree._Element` aufgebaut wird.
+
+  Die Kind-Elemente der Abschnitte von `<document>` werden, sobald sie geschlossen sind, als kleiner Baum aus
+  `_Node` an die Regeln in `DOCUMENT_RULES` übergeben und danach verworfen. Elemente ohne Regel werden gar nicht
+  erst gespeichert. Fertige Titel werden als Paar aus `PicaRecord` und `_DocumentContext` in `records` gesammelt;
+  Statistiken und Warnungen eines Titels stehen bis dahin nur in dessen `_DocumentContext` und werden erst mit
+  `_commit_document()` übernommen, sodass ein abgebrochener Titel nicht mitgezählt wird.
+
+  Die Zeit, die libxml2 zum Parsen benötigt, lässt sich dabei nicht von der Verarbeitung trennen und wird den
+  'extract.*'-Abschnitten des `timer` zugerechnet.
+  """
+
+  def __init__(self):
+    self.reset()
+
+  def reset(self, timer=None, skip=0):
+    """
+    Setzt das Target für eine neue Datei zurück, auch nach einem Fehler mitten in einem Titel.
+
+    :param timer: Ein `Profiler`, dem die Zeit der einzelnen Abschnitte als 'extract.*' zugerechnet wird
+    :type timer: Profiler
+    :param skip: Die Anzahl an `<document>`-Elementen am Anfang, die nicht verarbeitet werden (z.B. beim Fortsetzen)
+    :type skip: int
+    """
+    self.timer = timer
+    self.skip = skip
+    self.records = []
+    self._depth = 0
+    self._ctx = None
+    self._child_rules = None
+    self._first_only = None
+    self._sections_seen = set()
+    self._seen = set()
+    self._stack = []
+    self._data = []
+    self._last = None
+    self._tail = False
+
+  def _flush(self):
+    text = ''.join(self._data)
+
+    if self._tail:
+      self._last.tail = text
+
+    else:
+      self._last.text = text
+
+    self._data = []
+
+  def start(self, tag, attrib):
+    if self._depth == 0:
+      if tag == 'document':
+        self._depth = 1
+
+        if self.skip > 0:
+          self.skip -= 1
+
+        else:
+          self._ctx = _DocumentContext(_document_counters(), WarningSummary())
+          self._sections_seen = set()
+
+      return
+
+    self._depth += 1
+
+    if self._ctx is None:
+      return
+
+    stack = self._stack
+
+    if stack:
+      if self._data:
+        self._flush()
+
+      node = _Node(tag, attrib)
+      stack[-1].children.append(node)
+      stack.append(node)
+      self._last = node
+      self._tail = False
+
+    elif self._depth == 2:
+      rules = DOCUMENT_RULES.get(tag)
+      self._child_rules = None
+
+      if rules is not None and tag not in self._sections_seen:
+        self._sections_seen.add(tag)
+        self._seen = set()
+        enter, self._child_rules, self._first_only = rules
+
+        if enter is not None:
+          enter(self._ctx, _Node(tag, attrib))
+
+    elif self._depth == 3 and self._child_rules is not None and tag in self._child_rules:
+      if tag in self._first_only:
+        if tag in self._seen:
+          return
+
+        self._seen.add(tag)
+
+      node = _Node(tag, attrib)
+      stack.append(node)
+      self._last = node
+      self._tail = False
+
+  def data(self, data):
+    if self._stack:
+      self._data.append(data)
+
+  def end(self, tag):
+    if self._depth == 0:
+      return
+
+    self._depth -= 1
+    ctx = self._ctx
+    stack = self._stack
+
+    if stack:
+      if self._data:
+        self._flush()
+
+      node = stack.pop()
+      self._last = node
+      self._tail = True
+
+      if not stack:
+        self._child_rules[node.tag](ctx, node)
+
+    elif self._depth == 1:
+      if ctx is not None and self.timer is not None:
+        self.timer.lap('extract.' + tag)
+
+    elif self._depth == 0:
+      if ctx is None:
+        self.records.append(None)
+
+      else:
+        _finish_document(ctx, self.timer)
+        self.records.append((ctx.record, ctx))
+        self._ctx = None
+
+  def close(self):
+    return None
+
+
+def _commit_document(ctx, stats, warnings, timer=None):
+  """
+  Übernimmt die Statistiken und Warnungen eines von `DocumentTarget` verarbeiteten Titels.
+
+  :param ctx: Der Zustand des Titels
+  :type ctx: _DocumentContext
+  :param stats: Die Statistiken, zu denen der Titel gezählt wird
+  :type stats: StatsAccumulator
+  :param warnings: Die Zusammenfassung, in die die Warnungen des Titels übernommen werden
+  :type warnings: WarningSummary
+  :param timer: Ein `Profiler`, dem die Zeit als 'extract.stats' zugerechnet wird
+  :type timer: Profiler
+  """
+
+  for topic, keys in ctx.counters.items():
+    for key, counter in keys.items():
+      stats.counters[topic][key].update(counter)
+
+  if ctx.warnings.counts:
+    warnings.merge(ctx.warnings)
+
+  _count_document(ctx, stats, timer)
+
+
+_target_parsers = {}
+
+
+def _get_target_parser(dtd_path, huge_tree=False):
+  """
+  Gibt einen Parser mit `DocumentTarget` und `DTDResolver` zurück, der wie bei `_get_parser()` pro Prozess und
+  Katalog nur einmal erzeugt wird.
+
+  :param dtd_path: Das Katalog-Verzeichnis mit den DTDs
+  :type dtd_path: str
+  :param huge_tree: Eine Flag, ob die Sicherheitslimits von libxml2 (Tiefe, Textlänge) aufgehoben werden sollen
+  :type huge_tree: bool
+  :returns: list -- der Parser, sein Target und sein Resolver
+  """
+
+  key = (os.getpid(), dtd_path, huge_tree)
+
+  if key not in _target_parsers:
+    target = DocumentTarget()
+    parser = etree.XMLParser(target=target, load_dtd=True, no_network=True, remove_comments=True, remove_pis=True,
+                             huge_tree=huge_tree)
+    resolver = DTDResolver(dtd_path)
+    parser.resolvers.add(resolver)
+    _target_parsers[key] = [parser, target, resolver]
+
+  return _target_parsers[key]
+
+
+def _iter_records(blocks, base_path, stats, warnings, dtd_path=Constants.DTD_PATH, huge_tree=False, timer=None, skip=0):
+  """
+  Parst eine XML-Datei blockweise mit einem `DocumentTarget` und liefert die fertigen PICA-Records.
+
+  Anders als bei `_iter_documents()` wird kein Baum aufgebaut, der Speicherbedarf hängt nur vom gerade
+  verarbeiteten Titel ab. Statistiken und Warnungen eines Titels werden erst übernommen, wenn sein Record geliefert
+  wird, sodass sie zwischen zwei Schritten immer genau den bisher gelieferten Titeln entsprechen.
+
+  :param blocks: Die Datei als Folge von Byte-Blöcken
+  :type blocks: iterable
+  :param base_path: Das Verzeichnis der XML-Datei (für relative DTD-Angaben)
+  :type base_path: str
+  :param stats: Die Statistiken, zu denen die Titel gezählt werden
+  :type stats: StatsAccumulator
+  :param warnings: Die Zusammenfassung, in der Warnungen zu den Titeln gesammelt werden
+  :type warnings: WarningSummary
+  :param dtd_path: Das Katalog-Verzeichnis mit den DTDs
+  :type dtd_path: str
+  :param huge_tree: Eine Flag, ob die Sicherheitslimits von libxml2 aufgehoben werden sollen
+  :type huge_tree: bool
+  :param timer: Ein `Profiler`, dem die Zeit der einzelnen Abschnitte als 'extract.*' zugerechnet wird
+  :type timer: Profiler
+  :param skip: Die Anzahl an Titeln am Anfang, die nicht verarbeitet werden (für sie wird `None` geliefert)
+  :type skip: int
+  :returns: generator -- Tupel aus 'record' und `PicaRecord`
+  """
+
+  parser, target, resolver = _get_target_parser(dtd_path, huge_tree)
+  resolver.base_path = base_path
+  target.reset(timer, skip)
+  closed = False
+
+  try:
+    for block in itertools.chain(blocks, [None]):
+      if block is None:
+        parser.close()
+        closed = True
+
+      else:
+        parser.feed(block)
+
+      finished = target.records
+
+      if not finished:
+        continue
+
+      target.records = []
+
+      for entry in finished:
+        if entry is None:
+          yield 'record', None
+          continue
+
+        record, ctx = entry
+        _commit_document(ctx, stats, warnings, timer)
+
+        yield 'record', record
+
+  finally:
+    if not closed:
+      # Setzt den Parser nach einem Fehler für die nächste Datei zurück
+      try:
+        parser.close()
+
+      except etree.XMLSyntaxError:
+        pass
+
+      target.reset()
+
+
+# Handle XML files
+
+def _open_xml(fpath):
+  """
+  Öffnet eine XML-Datei zum Lesen. Mit gzip komprimierte Dateien werden dabei nicht auf die Festplatte entpackt,
+  sondern beim Lesen gestreamt, sodass der Parser direkt aus dem Dateiobjekt lesen kann.
+
+  :param fpath: Der Dateiname inklusive Pfad
+  :type fpath: str
+  :returns: file object
+  """
+
+  if fpath.endswith(".gz"):
+    return gzip.open(fpath, 'rb')
+
+  return open(fpath, 'rb')
+
+
+def _strip_extensions(fname):
+  """
+  Entfernt die Dateiendung (und ggf. eine zusätzliche '.gz'-Endung) von einem Dateinamen.
+
+  :param fname: Der Dateiname
+  :type fname: str
+  :returns: str
+  """
+
+  if fname.endswith(".gz"):
+    fname = fname[:fname.rfind('.')]
+
+  return fname[:fname.rfind('.')]
+
+
+def _peak_rss():
+  """
+  Gibt den bisher höchsten Speicherbedarf (Resident Set Size) des aktuellen Prozesses in MiB zurück.
+
+  :returns: float
+  """
+
+  peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+  # Linux liefert KiB, macOS Bytes
+  if sys.platform == 'darwin':
+    peak /= 1024
+
+  return round(peak / 1024, 1)
+
+
+def _close_writer(writer):
+  """
+  Schließt einen `PicaWriter` und protokolliert dabei auftretende Schreibfehler.
+
+  :param writer: Der zu schließende Writer oder `None`
+  :type writer: PicaWriter
+  """
+
+  if writer is None:
+    return
+
+  try:
+    writer.close()
+
+  except:
+    log.error("Problem writing to file.")
+    log.error(sys.exc_info()[0])
+
+
+def _handle_file(xml_file, no_ext, combined, stats_only, cur_file, num_files, buffer_size=Constants.WRITE_BUFFER_SIZE, dtd_path=Constants.DTD_PATH, huge_tree=False, engine=Constants.ENGINE, output_format=Constants.OUTPUT_FORMAT, shard_records=0, shard_bytes=0, compression=None, compress_level=None, index_path=None, checkpoint_interval=0, resume=False, profile=False, metrics=None):
+  """
+  Konvertiert eine einzelne XML-Datei und kumuliert deren Statistiken.
+
+  Die Funktion wird sowohl im seriellen Betrieb als auch in den Worker-Prozessen von `handle_xml()` aufgerufen.
+
+  Alle `checkpoint_interval` Titel (und nach einem unerwarteten Fehler zwischen zwei Titeln) wird ein Checkpoint
+  geschrieben. Mit `resume` werden die Ergebnisse daraus übernommen und die bereits verarbeiteten Titel
+  übersprungen, bei unkomprimierten Dateien ohne sie erneut zu parsen.
+
+  :param xml_file: Die XML-Datei inklusive Pfad
+  :type xml_file: str
+  :param no_ext: Der Dateiname ohne Endungen
+  :type no_ext: str
+  :param combined: Die Output-Datei inklusive Pfad
+  :type combined: str
+  :param stats_only: Eine Flag, ob die Ergebnisse mit einem `PicaWriter` geschrieben werden sollen
+  :type stats_only: bool
+  :param cur_file: Die laufende Nummer der Datei
+  :type cur_file: int
+  :param num_files: Die Gesamtanzahl an XML-Dateien
+  :type num_files: int
+  :param buffer_size: Die Puffergröße des `PicaWriter` in Bytes
+  :type buffer_size: int
+  :param dtd_path: Das Katalog-Verzeichnis mit den DTDs
+  :type dtd_path: str
+  :param huge_tree: Eine Flag, ob die Sicherheitslimits von libxml2 aufgehoben werden sollen
+  :type huge_tree: bool
+  :param engine: Die Art, wie die Titel gelesen werden ('tree': `_iter_documents()` und `process_document()`, 'target': `_iter_records()`)
+  :type engine: str
+  :param output_format: Das Format der Output-Datei ('intern', 'normalized' oder 'plain')
+  :type output_format: str
+  :param shard_records: Die höchste Anzahl an Records pro Shard der Output-Datei (0: keine Shards)
+  :type shard_records: int
+  :param shard_bytes: Die höchste Größe eines Shards in Bytes (0: keine Shards)
+  :type shard_bytes: int
+  :param compression: Die Komprimierung der Output-Datei ('gzip', 'zstd' oder `None`)
+  :type compression: str
+  :param compress_level: Die Kompressionsstufe
+  :type compress_level: int
+  :param index_path: Die Datenbank eines `DocumentIndex`, gegen den die Titel geprüft werden (oder `None`)
+  :type index_path: str
+  :param checkpoint_interval: Die Anzahl an Titeln, nach der jeweils ein Checkpoint geschrieben wird (0: keine)
+  :type checkpoint_interval: int
+  :param resume: Eine Flag, ob die Konvertierung ab einem vorhandenen Checkpoint fortgesetzt werden soll
+  :type resume: bool
+  :param profile: Eine Flag, ob die Zeiten der einzelnen Schritte mit einem `Profiler` gemessen werden sollen
+  :type profile: bool
+  :param metrics: Die laufend aktualisierten Zähler (ansonsten, z.B. in Worker-Prozessen, ein neues `Metrics`-Objekt)
+  :type metrics: Metrics
+  :returns: dict -- die Statistiken ('stats'), die Anzahl an Warnungen ('warnings') und Titeln ('docs'), der höchste Speicherbedarf in MiB ('peak_rss'), die gemessenen Zeiten ('profile'), die Zähler ('metrics'), die gesammelten Warnungen zu einzelnen Titeln ('warning_summary') und die Ergebnisse des Index ('index')
+  """
+
+  all_stats = StatsAccumulator()
+  num_warn = 0
+  docs_in_file = 0
+  docs_seen = 0
+  skip_docs = 0
+  consistent = True
+  writer = None
+  timer = Profiler() if profile else None
+  warnings = WarningSummary()
+  index = _get_index(index_path) if index_path else None
+  index_summary = IndexSummary()
+  state = _load_checkpoint(combined, output_format, xml_file) if resume else None
+
+  if metrics is None:
+    metrics = Metrics()
+
+  metrics.cur_file = cur_file
+  metrics.file_name = os.path.basename(xml_file)
+
+  if state is not None:
+    all_stats = state['stats']
+    warnings = state['warnings']
+    index_summary = state['index']
+    num_warn = state['num_warn']
+    docs_in_file = state['records']
+
+    if state['done']:
+      log.debug("skipping: " + xml_file + ", already converted according to its checkpoint (" + str(cur_file) + "/" + str(num_files) + ")")
+      metrics.files_done += 1
+
+      return {'stats': all_stats, 'warnings': num_warn, 'docs': docs_in_file, 'peak_rss': _peak_rss(), 'profile': timer, 'metrics': metrics, 'warning_summary': warnings, 'index': index_summary}
+
+    log.info("Resuming " + xml_file + " after " + str(state['docs']) + " documents..")
+
+  warning_counter = _WarningCounter(metrics)
+  log.addHandler(warning_counter)
+
+  log.debug("processing: " + xml_file + " (" + str(cur_file) + "/" + str(num_files) + ")")
+
+  xml_stream = _open_xml(xml_file)
+
+  if not stats_only:
+    writer = PicaWriter(combined, buffer_size, warnings, output_format, shard_records, shard_bytes, compression, compress_level)
+
+    if state is not None:
+      writer.restore(state['writer'])
+
+  try:
+    reader = iter(functools.partial(xml_stream.read, Constants.READ_SIZE), b'')
+
+    resume_offset = None
+
+    if state is not None and not xml_file.endswith(".gz"):
+      resume_offset = _resume_offset(xml_file, state['docs'])
+
+    if state is not None:
+      if resume_offset is None:
+        # Komprimierte Dateien (und Dateien, deren Titel nicht sicher ohne Parser gezählt werden können) werden bis
+        # zum Checkpoint geparst, aber nicht verarbeitet
+        skip_docs = state['docs']
+
+      else:
+        prolog, offset = resume_offset
+        xml_stream.seek(offset)
+        reader = itertools.chain([prolog], reader)
+        docs_seen = state['docs']
+
+    blocks = metrics.read_blocks(reader)
+
+    if engine == 'target':
+      documents = _iter_records(blocks, os.path.dirname(xml_file), all_stats, warnings, dtd_path, huge_tree, timer, skip_docs)
+
+    else:
+      documents = _iter_documents(blocks, os.path.dirname(xml_file), dtd_path, huge_tree)
+
+    for event, document in documents:
+      if docs_seen < skip_docs:
+        docs_seen += 1
+        continue
+
+      consistent = False
+      metrics.add_document()
+
+      if timer is not None:
+        timer.lap('parse')
+
+      skip = False
+
+      if index is not None:
+        skip = _skip_document(document, index, index_summary, metrics.file_name)
+
+        if timer is not None:
+          timer.lap('index')
+
+      if skip:
+        pass
+
+      elif stats_only:
+        # `_iter_records()` hat den Titel bereits gezählt
+        if event != 'record':
+          collect_stats(document, all_stats, warnings)
+
+        docs_in_file += 1
+
+        if timer is not None:
+          timer.lap('collect_stats')
+
+      else:
+        record = document if event == 'record' else process_document(document, all_stats, timer, warnings)[0]
+        docs_in_file += 1
+
+        try:
+          writer.write(record, docs_in_file)
+
+        except:
+          log.error("Problem writing to file.")
+          log.error(sys.exc_info()[0])
+
+        if timer is not None:
+          timer.lap('write')
+
+      docs_seen += 1
+      consistent = True
+
+      if checkpoint_interval and docs_seen % checkpoint_interval == 0:
+        _save_checkpoint(combined, output_format, writer, xml_file, docs_seen, docs_in_file, all_stats, warnings, index_summary, num_warn)
+
+    if timer is not None:
+      timer.lap('parse')
+
+    log.debug("Processed " + str(docs_in_file) + " documents in file " + os.path.basename(xml_file) + "!")
+
+  except etree.XMLSyntaxError as e:
+    num_warn += 1
+    metrics.parse_errors += 1
+    log.error("Error while parsing: " + no_ext)
+    log.error(e)
+
+  except:
+    log.error("Unexpected error in " + no_ext + ": " + str(sys.exc_info()[0]))
+
+    # Mitten in einem Titel sind die Statistiken unvollständig, dann gilt der letzte reguläre Checkpoint
+    if checkpoint_interval and consistent:
+      _save_checkpoint(combined, output_format, writer, xml_file, docs_seen, docs_in_file, all_stats, warnings, index_summary, num_warn)
+      log.info("Wrote checkpoint after " + str(docs_seen) + " documents, continue with '--resume'")
+
+    raise
+
+  finally:
+    xml_stream.close()
+    _close_writer(writer)
+
+    if timer is not None:
+      timer.lap('write')
+
+    log.removeHandler(warning_counter)
+
+  if checkpoint_interval:
+    _save_checkpoint(combined, output_format, writer, xml_file, docs_seen, docs_in_file, all_stats, warnings, index_summary, num_warn, done=True)
+
+  warnings.log_summary(os.path.basename(xml_file))
+  metrics.warnings += sum(warnings.counts.values())
+  metrics.files_done += 1
+  peak_rss = _peak_rss()
+  log.debug("Peak RSS after " + os.path.basename(xml_file) + ": " + str(peak_rss) + " MiB")
+
+  return {'stats': all_stats, 'warnings': num_warn, 'docs': docs_in_file, 'peak_rss': peak_rss, 'profile': timer, 'metrics': metrics, 'warning_summary': warnings, 'index': index_summary}
+
+
+def _closing_tags(prolog):
+  """
+  Erzeugt die schließenden Tags für alle im Prolog einer XML-Datei geöffneten Elemente.
+
+  :param prolog: Der Anfang der XML-Datei bis zum ersten `<document>`
+  :type prolog: bytes
+  :returns: bytes
+  """
+
+  open_tags = []
+
+  for closing, name, empty in re.findall(rb'<(/?)([A-Za-z_][\w:.-]*)[^>]*?(/?)>', prolog):
+    if closing:
+      open_tags.pop()
+
+    elif not empty:
+      open_tags.append(name)
+
+  return b''.join(b'</' + name + b'>' for name in reversed(open_tags))
+
+
+_DOC_START = re.compile(rb'<document[\s>]')
+# Was hinter dem letzten `</document>` stehen darf: nur schließende Tags
+_DOC_TAIL = re.compile(rb'(\s*</[^<>]+>)*\s*')
+
+
+def _after_document(mm, pos):
+  """
+  Prüft, ob vor einem mit `_DOC_START` gefundenen `<document` (bis auf Leerraum) ein `</document>` steht. Nur dann
+  ist der Treffer sicher der Anfang eines Titels und nicht z.B. Teil eines Kommentars oder CDATA-Abschnitts.
+
+  :param mm: Der Inhalt der XML-Datei
+  :type mm: mmap.mmap
+  :param pos: Der Byte-Offset des Treffers
+  :type pos: int
+  :returns: bool
+  """
+
+  while pos > 0 and mm[pos - 1] in b' \t\r\n':
+    pos -= 1
+
+  return mm[max(0, pos - len(b'</document>')):pos] == b'</document>'
+
+
+def _open_markup(prolog):
+  """
+  Prüft, ob am Ende des Prologs (vor dem ersten Treffer von `_DOC_START`) ein Kommentar oder CDATA-Abschnitt offen
+  ist, der Treffer also nicht der erste Titel ist.
+
+  :param prolog: Der Anfang der XML-Datei
+  :type prolog: bytes
+  :returns: bool
+  """
+
+  return prolog.rfind(b'<!--') > prolog.rfind(b'-->') or prolog.rfind(b'<![CDATA[') > prolog.rfind(b']]>')
+
+
+def _document_start(mm, num):
+  """
+  Sucht den Anfang des `num`-ten `<document>` (gezählt ab 0) in einer per mmap geöffneten XML-Datei.
+
+  Die Titel werden ohne Parser gezählt. Steht vor einem der Treffer kein `</document>` (siehe `_after_document()`),
+  ist die Zählung nicht sicher und es wird `None` zurückgegeben, die Titel müssen dann geparst werden.
+
+  :param mm: Der Inhalt der XML-Datei
+  :type mm: mmap.mmap
+  :param num: Die Anzahl der davor liegenden Titel
+  :type num: int
+  :returns: int -- der Byte-Offset, -1, wenn die Datei weniger Titel enthält, oder `None`
+  """
+
+  for idx, match in enumerate(_DOC_START.finditer(mm)):
+    if idx == 0:
+      if _open_markup(mm[:match.start()]):
+        return None
+
+    elif not _after_document(mm, match.start()):
+      return None
+
+    if idx == num:
+      return match.start()
+
+  return -1
+
+
+def _resume_offset(xml_file, num):
+  """
+  Ermittelt für eine unkomprimierte XML-Datei den Prolog und den Byte-Offset, ab dem nach `num` bereits
+  verarbeiteten Titeln weitergeparst werden kann, ohne diese erneut zu parsen.
+
+  :param xml_file: Die XML-Datei inklusive Pfad
+  :type xml_file: str
+  :param num: Die Anzahl der bereits verarbeiteten Titel
+  :type num: int
+  :returns: list -- der Prolog und der Offset (hinter dem letzten `</document>`, wenn keine Titel mehr folgen) oder `None`, wenn die Titel nicht sicher ohne Parser gezählt werden können
+  """
+
+  with open(xml_file, 'rb') as f:
+    if os.fstat(f.fileno()).st_size == 0:
+      return [b'', 0]
+
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+      first = _DOC_START.search(mm)
+
+      if first is None:
+        return [b'', 0]
+
+      offset = _document_start(mm, num)
+
+      if offset is None:
+        return None
+
+      if offset == -1:
+        offset = mm.rfind(b'</document>') + len(b'</document>')
+
+      return [mm[:first.start()], offset]
+
+
+def _split_documents(xml_file, num_chunks, skip=0):
+  """
+  Teilt eine unkomprimierte XML-Datei an den Grenzen von `<document>`-Elementen in etwa gleich große Abschnitte.
+
+  Die Datei wird dafür per mmap durchsucht, ohne sie komplett einzulesen. Als Grenze gilt nur ein `<document`,
+  vor dem ein `</document>` steht (siehe `_after_document()`). Lassen sich Anfang oder Ende der Titel nicht sicher
+  bestimmen (z.B. wegen eines Kommentars im Prolog oder hinter dem letzten Titel), wird `None` zurückgegeben und
+  die Datei muss seriell verarbeitet werden.
+
+  :param xml_file: Die XML-Datei inklusive Pfad
+  :type xml_file: str
+  :param num_chunks: Die gewünschte Anzahl an Abschnitten
+  :type num_chunks: int
+  :param skip: Die Anzahl an Titeln am Anfang, die ausgelassen werden (z.B. nach einem Checkpoint)
+  :type skip: int
+  :returns: list -- Prolog, Epilog und eine Liste von (Start, Ende)-Byte-Offsets (oder `None`)
+  """
+
+  doc_start = _DOC_START
+
+  with open(xml_file, 'rb') as f:
+    if os.fstat(f.fileno()).st_size == 0:
+      return [b'', b'', []]
+
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+      first = doc_start.search(mm)
+      last = mm.rfind(b'</document>')
+
+      if first is None or last == -1:
+        return [b'', b'', []]
+
+      end = last + len(b'</document>')
+      prolog = mm[:first.start()]
+
+      if _open_markup(prolog) or _DOC_TAIL.fullmatch(mm, end) is None:
+        return None
+
+      start = _document_start(mm, skip) if skip else first.start()
+
+      if start is None:
+        return None
+
+      if start == -1:
+        return [prolog, _closing_tags(prolog), []]
+
+      bounds = [start]
+      chunk_size = (end - start) // num_chunks
+
+      for i in range(1, num_chunks):
+        match = doc_start.search(mm, max(bounds[-1] + 1, start + i * chunk_size), end)
+
+        while match is not None and not _after_document(mm, match.start()):
+          match = doc_start.search(mm, match.end(), end)
+
+        if match is None:
+          break
+
+        if match.start() > bounds[-1]:
+          bounds.append(match.start())
+
+      bounds.append(end)
+
+  return [prolog, _closing_tags(prolog), list(zip(bounds[:-1], bounds[1:]))]
+
+
+def _read_range(xml_file, start, end):
+  """
+  Liest einen Bereich einer Datei in Blöcken von `Constants.READ_SIZE` Bytes. Der Parser bekommt so wie bei
+  `_handle_file()` nur kleine Blöcke, ein einzelner großer Block würde sonst das Pufferlimit von libxml2
+  überschreiten.
+
+  :param xml_file: Die Datei inklusive Pfad
+  :type xml_file: str
+  :param start: Der Byte-Offset des Anfangs
+  :type start: int
+  :param end: Der Byte-Offset des Endes
+  :type end: int
+  :returns: generator
+  """
+
+  with open(xml_file, 'rb') as f:
+    f.seek(start)
+    remaining = end - start
+
+    while remaining > 0:
+      block = f.read(min(Constants.READ_SIZE, remaining))
+
+      if not block:
+        break
+
+      remaining -= len(block)
+      yield block
+
+
+def _handle_chunk(xml_file, start, end, prolog, epilog, stats_only, dtd_path=Constants.DTD_PATH, huge_tree=False, engine=Constants.ENGINE, index_path=None, profile=False):
+  """
+  Konvertiert einen Abschnitt einer XML-Datei, der mit `_split_documents()` ermittelt wurde.
+
+  Der Abschnitt wird zusammen mit Prolog und Epilog der Datei geparst. Die Records werden nicht geschrieben,
+  sondern zurückgegeben, damit sie in der ursprünglichen Reihenfolge (und mit fortlaufender
+  `##TitleSequenceNumber`) geschrieben werden können.
+
+  :param xml_file: Die XML-Datei inklusive Pfad
+  :type xml_file: str
+  :param start: Der Byte-Offset des ersten `<document>` im Abschnitt
+  :type start: int
+  :param end: Der Byte-Offset hinter dem letzten `</document>` im Abschnitt
+  :type end: int
+  :param prolog: Der Anfang der XML-Datei bis zum ersten `<document>`
+  :type prolog: bytes
+  :param epilog: Die schließenden Tags zum Prolog
+  :type epilog: bytes
+  :param stats_only: Eine Flag, ob nur Statistiken (mit `collect_stats()`) erzeugt werden sollen
+  :type stats_only: bool
+  :param dtd_path: Das Katalog-Verzeichnis mit den DTDs
+  :type dtd_path: str
+  :param huge_tree: Eine Flag, ob die Sicherheitslimits von libxml2 aufgehoben werden sollen
+  :type huge_tree: bool
+  :param engine: Die Art, wie die Titel gelesen werden ('tree' oder 'target')
+  :type engine: str
+  :param index_path: Die Datenbank eines `DocumentIndex`, gegen den die Titel geprüft werden (oder `None`)
+  :type index_path: str
+  :param profile: Eine Flag, ob die Zeiten der einzelnen Schritte mit einem `Profiler` gemessen werden sollen
+  :type profile: bool
+  :returns: dict -- die Statistiken ('stats'), die Records ('records'), die Anzahl an Warnungen ('warnings') und Titeln ('docs'), der höchste Speicherbedarf des Workers in MiB ('peak_rss'), die gemessenen Zeiten ('profile'), die Zähler des Abschnitts ('metrics'), die gesammelten Warnungen zu einzelnen Titeln ('warning_summary') und die Ergebnisse des Index ('index')
+  """
+
+  all_stats = StatsAccumulator()
+  records = []
+  num_warn = 0
+  docs = 0
+  timer = Profiler() if profile else None
+  metrics = Metrics()
+  warnings = WarningSummary()
+  index = _get_index(index_path) if index_path else None
+  index_summary = IndexSummary()
+  warning_counter = _WarningCounter(metrics)
+  log.addHandler(warning_counter)
+
+  blocks = itertools.chain([prolog], metrics.read_blocks(_read_range(xml_file, start, end)), [epilog])
+
+  if engine == 'target':
+    documents = _iter_records(blocks, os.path.dirname(xml_file), all_stats, warnings, dtd_path, huge_tree, timer)
+
+  else:
+    documents = _iter_documents(blocks, os.path.dirname(xml_file), dtd_path, huge_tree)
+
+  try:
+    for event, document in documents:
+      metrics.add_document()
+
+      if timer is not None:
+        timer.lap('parse')
+
+      if index is not None:
+        skip = _skip_document(document, index, index_summary, os.path.basename(xml_file))
+
+        if timer is not None:
+          timer.lap('index')
+
+        if skip:
+          continue
+
+      docs += 1
+
+      if event == 'record':
+        if not stats_only:
+          records.append(document)
+
+      elif stats_only:
+        collect_stats(document, all_stats, warnings)
+
+        if timer is not None:
+          timer.lap('collect_stats')
+
+      else:
+        records.append(process_document(document, all_stats, timer, warnings)[0])
+
+    if timer is not None:
+      timer.lap('parse')
+
+  except etree.XMLSyntaxError as e:
+    num_warn += 1
+    metrics.parse_errors += 1
+    log.error("Error while parsing bytes " + str(start) + "-" + str(end) + " of " + xml_file)
+    log.error(e)
+
+  finally:
+    log.removeHandler(warning_counter)
+
+  metrics.warnings += sum(warnings.counts.values())
+
+  return {'stats': all_stats, 'records': records, 'warnings': num_warn, 'docs': docs, 'peak_rss': _peak_rss(), 'profile': timer, 'metrics': metrics, 'warning_summary': warnings, 'index': index_summary}
+
+
+def _handle_split_file(xml_file, no_ext, combined, stats_only, workers, buffer_size=Constants.WRITE_BUFFER_SIZE, dtd_path=Constants.DTD_PATH, huge_tree=False, engine=Constants.ENGINE, output_format=Constants.OUTPUT_FORMAT, shard_records=0, shard_bytes=0, compression=None, compress_level=None, index_path=None, checkpoint_interval=0, resume=False, timer=None, metrics=None):
+  """
+  Konvertiert eine einzelne große XML-Datei parallel, indem sie mit `_split_documents()` in Abschnitte geteilt wird,
+  die von einem Pool von Prozessen verarbeitet werden. Die Records werden in der ursprünglichen Reihenfolge
+  geschrieben. Lässt sich die Datei nicht sicher teilen, wird sie mit `_handle_file()` seriell verarbeitet.
+
+  Checkpoints werden nach jedem Abschnitt geschrieben, sobald seit dem letzten mindestens `checkpoint_interval`
+  Titel verarbeitet wurden. Mit `resume` beginnt die Aufteilung erst hinter den bereits verarbeiteten Titeln.
+
+  :param xml_file: Die XML-Datei inklusive Pfad
+  :type xml_file: str
+  :param no_ext: Der Dateiname ohne Endungen
+  :type no_ext: str
+  :param combined: Die Output-Datei inklusive Pfad
+  :type combined: str
+  :param stats_only: Eine Flag, ob die Ergebnisse mit einem `PicaWriter` geschrieben werden sollen
+  :type stats_only: bool
+  :param workers: Die Anzahl an parallelen Prozessen
+  :type workers: int
+  :param buffer_size: Die Puffergröße des `PicaWriter` in Bytes
+  :type buffer_size: int
+  :param dtd_path: Das Katalog-Verzeichnis mit den DTDs
+  :type dtd_path: str
+  :param huge_tree: Eine Flag, ob die Sicherheitslimits von libxml2 aufgehoben werden sollen
+  :type huge_tree: bool
+  :param engine: Die Art, wie die Titel gelesen werden ('tree': `_iter_documents()` und `process_document()`, 'target': `_iter_records()`)
+  :type engine: str
+  :param output_format: Das Format der Output-Datei ('intern', 'normalized' oder 'plain')
+  :type output_format: str
+  :param shard_records: Die höchste Anzahl an Records pro Shard der Output-Datei (0: keine Shards)
+  :type shard_records: int
+  :param shard_bytes: Die höchste Größe eines Shards in Bytes (0: keine Shards)
+  :type shard_bytes: int
+  :param compression: Die Komprimierung der Output-Datei ('gzip', 'zstd' oder `None`)
+  :type compression: str
+  :param compress_level: Die Kompressionsstufe
+  :type compress_level: int
+  :param index_path: Die Datenbank eines `DocumentIndex`, gegen den die Titel geprüft werden (oder `None`)
+  :type index_path: str
+  :param checkpoint_interval: Die Anzahl an Titeln, nach der jeweils ein Checkpoint geschrieben wird (0: keine)
+  :type checkpoint_interval: int
+  :param resume: Eine Flag, ob die Konvertierung ab einem vorhandenen Checkpoint fortgesetzt werden soll
+  :type resume: bool
+  :param timer: Ein `Profiler`, zu dem die Zeiten der Worker addiert werden (Wartezeiten werden nicht gezählt)
+  :type timer: Profiler
+  :param metrics: Die Zähler, zu denen die Ergebnisse der Abschnitte addiert werden
+  :type metrics: Metrics
+  :returns: dict -- die Statistiken ('stats'), die Anzahl an Warnungen ('warnings') und Titeln ('docs'), der höchste Speicherbedarf eines Prozesses in MiB ('peak_rss'), die gesammelten Warnungen zu einzelnen Titeln ('warning_summary') und die Ergebnisse des Index ('index')
+  """
+
+  all_stats = StatsAccumulator()
+  warnings = WarningSummary()
+  index_summary = IndexSummary()
+  num_warn = 0
+  docs_in_file = 0
+  docs_seen = 0
+  consistent = True
+  peak_rss = 0
+  writer = None
+  state = _load_checkpoint(combined, output_format, xml_file) if resume else None
+
+  if metrics is None:
+    metrics = Metrics()
+
+  metrics.cur_file = 1
+  metrics.file_name = os.path.basename(xml_file)
+
+  if state is not None:
+    all_stats = state['stats']
+    warnings = state['warnings']
+    index_summary = state['index']
+    num_warn = state['num_warn']
+    docs_in_file = state['records']
+    docs_seen = state['docs']
+
+    if state['done']:
+      log.debug("skipping: " + xml_file + ", already converted according to its checkpoint")
+      metrics.files_done += 1
+
+      return {'stats': all_stats, 'warnings': num_warn, 'docs': docs_in_file, 'peak_rss': _peak_rss(), 'warning_summary': warnings, 'index': index_summary}
+
+    log.info("Resuming " + xml_file + " after " + str(docs_seen) + " documents..")
+
+  # Die Records eines Abschnitts werden komplett an den Hauptprozess zurückgegeben, die Größe der Abschnitte ist
+  # daher begrenzt, damit der Speicherbedarf nicht mit der Datei wächst
+  num_chunks = max(workers * Constants.CHUNKS_PER_WORKER, os.path.getsize(xml_file) // Constants.CHUNK_BYTES)
+  split = _split_documents(xml_file, num_chunks, docs_seen)
+
+  if split is None:
+    log.warning("Could not find safe chunk boundaries in " + xml_file + ", converting it serially..")
+    result = _handle_file(xml_file, no_ext, combined, stats_only, 1, 1, buffer_size, dtd_path, huge_tree, engine, output_format, shard_records, shard_bytes, compression, compress_level, index_path, checkpoint_interval, resume, timer is not None, metrics)
+
+    if timer is not None:
+      timer.merge(result['profile'])
+      timer.start()
+
+    return result
+
+  prolog, epilog, chunks = split
+  last_checkpoint = docs_seen
+
+  if not stats_only:
+    writer = PicaWriter(combined, buffer_size, warnings, output_format, shard_records, shard_bytes, compression, compress_level)
+
+    if state is not None:
+      writer.restore(state['writer'])
+
+  log.debug("processing: " + xml_file + " in " + str(len(chunks)) + " chunks")
+
+  try:
+    with _worker_pool(workers) as executor:
+      pending = collections.deque()
+      chunks = iter(chunks)
+
+      while True:
+        for start, end in chunks:
+          pending.append(executor.submit(_handle_chunk, xml_file, start, end, prolog, epilog, stats_only, dtd_path, huge_tree, engine, index_path, timer is not None))
 
-              for k, v in sval.items():
-                if k is not None and v is not None:
-                  kv_list.append({k: v})
+          if len(pending) >= workers * 2:
+            break
 
-                if k == "0":
-                  num_zero = str(v)
+        if not pending:
+          break
 
-              kv_list = sorted(kv_list, key=lambda x: list(x.values())[0], reverse=True)
+        result = pending.popleft().result()
 
-              if len(kv_list) > 10:
-                kv_list = kv_list[:10]
+        if timer is not None:
+          timer.merge(result['profile'])
+          timer.start()
 
-              for item in kv_list:
-                sf_keys = list(item.keys())
-                sf_values = list(item.values())
-                subfield_stats.write(sf_keys[0] + "," + str(sf_values[0]) + "\n")
+        consistent = False
+        all_stats.merge(result['stats'])
+        warnings.merge(result['warning_summary'])
+        index_summary.merge(result['index'])
+        metrics.merge(result['metrics'])
+        num_warn += result['warnings']
+        peak_rss = max(peak_rss, result['peak_rss'])
 
-            if len(vals) > 0:
-              for k in keys:
-                try:
-                  int_keys.append(int(k))
+        if timer is not None:
+          timer.lap('merge')
 
-                except:
-                  is_string = 1
+        for record in result['records']:
+          docs_in_file += 1
 
-              if is_string == 0:
-                sorted_keys = sorted([int(x) for x in int_keys])
+          try:
+            writer.write(record, docs_in_file)
 
-                summage = 0
+          except:
+            log.error("Problem writing to file.")
+            log.error(sys.exc_info()[0])
 
-                for k, v in sval.items():
-                  summage += int(k)*v
+        if stats_only:
+          docs_in_file += result['docs']
 
-                mean = round(summage/stats['num'], 2)
+        docs_seen += result['metrics'].docs
+        consistent = True
 
-                sf.write(row_name + ",")
-                sf.write(str(len(keys)) + ",")
+        if timer is not None:
+          timer.lap('write')
 
-                if max_key is not None:
-                  sf.write(str(sorted_keys[-1]) + "," + str(max_val) + "," + str(max_key))
+        if checkpoint_interval and docs_seen - last_checkpoint >= checkpoint_interval:
+          _save_checkpoint(combined, output_format, writer, xml_file, docs_seen, docs_in_file, all_stats, warnings, index_summary, num_warn)
+          last_checkpoint = docs_seen
 
-                else:
-                  sf.write(",")
+  except:
+    log.error("Unexpected error in " + no_ext + ": " + str(sys.exc_info()[0]))
 
-                sf.write(",")
+    # Während ein Abschnitt übernommen wird, sind Statistiken und Output ihm schon voraus, dann gilt der letzte
+    # reguläre Checkpoint
+    if checkpoint_interval and consistent:
+      _save_checkpoint(combined, output_format, writer, xml_file, docs_seen, docs_in_file, all_stats, warnings, index_summary, num_warn)
+      log.info("Wrote checkpoint after " + str(docs_seen) + " documents, continue with '--resume'")
 
-                if min_key is not None:
-                  sf.write(str(sorted_keys[0]) + "," + str(min_val) + "," + str(min_key))
+    _close_writer(writer)
+    raise
 
-                else:
-                  sf.write(",")
+  _close_writer(writer)
 
-                sf.write(",")
+  if checkpoint_interval:
+    _save_checkpoint(combined, output_format, writer, xml_file, docs_seen, docs_in_file, all_stats, warnings, index_summary, num_warn, done=True)
 
-                if num_zero:
-                  sf.write(num_zero)
+  warnings.log_summary(os.path.basename(xml_file))
+  metrics.files_done += 1
 
-                sf.write(",")
+  if timer is not None:
+    timer.lap('write')
 
-                if mean != -1:
-                  sf.write(str(mean))
+  if num_warn > 0:
+    log.error("Error while parsing: " + no_ext)
 
-                sf.write("\n")
+  log.debug("Processed " + str(docs_in_file) + " documents in file " + os.path.basename(xml_file) + "!")
 
-          else:
-            log.warning("Skipped subtopic " + sub_topic + " of " + topic + "!")
-      elif topic != 'num':
-        log.warning("Skipped topic " + topic + "!")
+  peak_rss = max(peak_rss, _peak_rss())
+  log.debug("Peak RSS after " + os.path.basename(xml_file) + ": " + str(peak_rss) + " MiB")
 
+  return {'stats': all_stats, 'warnings': num_warn, 'docs': docs_in_file, 'peak_rss': peak_rss, 'warning_summary': warnings, 'index': index_summary}
 
-# Handle XML files
 
-def handle_xml(xml_path, xml_filename, num_files, stats_only, is_update, out_path):
+def handle_xml(xml_path, xml_filename, num_files, stats_only, is_update, out_path, workers=1, buffer_size=Constants.WRITE_BUFFER_SIZE, dtd_path=Constants.DTD_PATH, huge_tree=False, engine=Constants.ENGINE, output_format=Constants.OUTPUT_FORMAT, shard_records=0, shard_bytes=0, compression=None, compress_level=None, index_path=None, checkpoint_interval=0, resume=False, timer=None, metrics=None, files=None, file_results=None):
   """
   Parst die XML-Dateien und kumuliert deren Statistiken.
 
+  Mit `workers` > 1 werden die Dateien auf einen Pool von Prozessen verteilt. Jeder Worker liefert seine eigenen
+  Teilstatistiken, die in der Reihenfolge der Dateien zusammengeführt werden, sodass `prepare_stats()` dieselben
+  Ergebnisse wie bei einem seriellen Lauf erzeugt. Eine einzelne unkomprimierte Datei wird stattdessen mit
+  `_handle_split_file()` in Abschnitte geteilt.
+
+  Mit `index_path` werden Titel, die unverändert in einem `DocumentIndex` stehen, übersprungen. Neue und geänderte
+  Titel werden am Ende des Laufs in den Index übernommen (nicht mit `stats_only`).
+
+  Mit `checkpoint_interval` wird zu jeder Output-Datei regelmäßig ein Checkpoint geschrieben (nicht mit `stats_only`
+  oder komprimierter Ausgabe), mit `resume` wird ein abgebrochener Lauf dort fortgesetzt. Die Checkpoints werden am
+  Ende eines erfolgreichen Laufs gelöscht.
+
   :param xml_path: Der Pfad zu den XML-Dateien
   :type xml_path: str
   :param xml_filename: Ein eventuell gegebener spezifischer Dateiname in dem Verzeichnis
   :type xml_filename: str
   :param num_files: Die Gesamtanzahl an XML-Dateien in dem Verzeichnis
   :type num_files: int
-  :param stats_only: Eine Flag, ob die Ergebnisse mit `write_to_file()` geschrieben werden sollen
+  :param stats_only: Eine Flag, ob die Ergebnisse mit einem `PicaWriter` geschrieben werden sollen
   :type stats_only: bool
   :param is_update: Eine Flag, ob die Ergebnisse in ein mit dem Datum benannten Unterverzeichnis gespeichert werden sollen
   :type stats_only: bool
   :param out_path: Ein manuell angegebener Output-Pfad
   :type out_path: str
-  :returns: list
+  :param workers: Die Anzahl an parallelen Prozessen
+  :type workers: int
+  :param buffer_size: Die Puffergröße des `PicaWriter` in Bytes
+  :type buffer_size: int
+  :param dtd_path: Das Katalog-Verzeichnis mit den DTDs
+  :type dtd_path: str
+  :param huge_tree: Eine Flag, ob die Sicherheitslimits von libxml2 aufgehoben werden sollen
+  :type huge_tree: bool
+  :param engine: Die Art, wie die Titel gelesen werden ('tree': `_iter_documents()` und `process_document()`, 'target': `_iter_records()`)
+  :type engine: str
+  :param output_format: Das Format der Output-Datei ('intern', 'normalized' oder 'plain')
+  :type output_format: str
+  :param shard_records: Die höchste Anzahl an Records pro Shard der Output-Datei (0: keine Shards)
+  :type shard_records: int
+  :param shard_bytes: Die höchste Größe eines Shards in Bytes (0: keine Shards)
+  :type shard_bytes: int
+  :param compression: Die Komprimierung der Output-Datei ('gzip', 'zstd' oder `None`)
+  :type compression: str
+  :param compress_level: Die Kompressionsstufe
+  :type compress_level: int
+  :param index_path: Die Datenbank eines `DocumentIndex`, gegen den die Titel geprüft werden (oder `None`)
+  :type index_path: str
+  :param checkpoint_interval: Die Anzahl an Titeln, nach der jeweils ein Checkpoint geschrieben wird (0: keine)
+  :type checkpoint_interval: int
+  :param resume: Eine Flag, ob die Konvertierung ab einem vorhandenen Checkpoint fortgesetzt werden soll
+  :type resume: bool
+  :param timer: Ein `Profiler`, zu dem die Zeiten aller Dateien addiert werden ('--profile')
+  :type timer: Profiler
+  :param metrics: Die Zähler, die während des Laufs aktualisiert werden (z.B. für einen `MetricsExporter`)
+  :type metrics: Metrics
+  :param files: Die Namen der Dateien im Verzeichnis, die verarbeitet werden sollen (ansonsten alle, z.B. für eine Partition aus `plan_partitions()`)
+  :type files: list
+  :param file_results: Ein Dictionary, in das die Ergebnisse von `_handle_file()` je Dateiname eingetragen werden
+  :type file_results: dict
+  :returns: list -- die Statistiken (`StatsAccumulator`), die Anzahl an Warnungen und Dateien, der höchste Speicherbedarf in MiB, die gesammelten Warnungen zu einzelnen Titeln und die Ergebnisse des Index
   """
 
-  all_stats = {
-    'num': 0
-  }
+  all_stats = StatsAccumulator()
+  all_warnings = WarningSummary()
+  index_summary = IndexSummary()
+  index = None
   num_warn = 0
   cur_file = 0
+  peak_rss = 0
+  jobs = []
 
-  for file in os.listdir(xml_path):
-
-    if (not xml_filename and file.endswith((".xml",".XML","XML.gz"))) or (xml_filename and file == xml_filename):
-
-      nzfile = None
-      no_gz_ext = None
+  if stats_only or compression:
+    checkpoint_interval = 0
 
-      if file.endswith("XML.gz"):
+  if index_path:
+    index = DocumentIndex(index_path)
+    log.debug("Checking documents against index " + index_path + " (" + str(len(index)) + " entries)..")
 
-        zfile = os.path.join(xml_path, file)
-        no_gz_ext = file[:file.rfind('.')]
-        nzfile = os.path.join(xml_path, no_gz_ext)
+  for file in os.listdir(xml_path):
 
-        if not os.path.exists(nzfile):
-          with gzip.GzipFile(zfile, 'rb') as inF:
-            with open(nzfile, 'wb') as outF:
-              s = inF.read()
-              outF.write(s)
-        else:
-          continue
+    if files is not None and file not in files:
+      continue
 
-      else:
-        nzfile = os.path.join(xml_path, file)
-        no_gz_ext = file
+    if (not xml_filename and file.endswith((".xml",".XML","XML.gz"))) or (xml_filename and file == xml_filename):
 
+      xml_file = os.path.join(xml_path, file)
       cur_file += 1
-      no_ext = no_gz_ext[:no_gz_ext.rfind('.')]
+      no_ext = _strip_extensions(file)
 
       base_path = Constants.OUTPUT_PATH
 
@@ -1052,7 +4464,7 @@ def handle_xml(xml_path, xml_filename, num_files, stats_only, is_update, out_pat
         os.makedirs(base_path + datePath, exist_ok=True)
         base_path = base_path + datePath
 
-      ext_fname = no_ext + "_" + Constants.OUTPUT_FNAME
+      ext_fname = no_ext + "_" + Constants.OUTPUT_FNAME + Constants.FORMAT_EXTENSIONS[output_format]
       ext_path = base_path + no_ext + "/"
       combined = ext_path + ext_fname
 
@@ -1062,95 +4474,264 @@ def handle_xml(xml_path, xml_filename, num_files, stats_only, is_update, out_pat
         if not stats_only:
           os.makedirs(ext_path, exist_ok=True)
 
-          if os.path.isfile(combined):
-            os.rename(combined, combined + ".prev")
+          if not (resume and os.path.isfile(_checkpoint_path(combined, output_format))):
+            _keep_previous(combined, output_format, compression, compress_level)
 
       else:
         combined = base_path + ext_fname
 
-        if not stats_only:
-          if os.path.isfile(combined):
-            os.rename(combined, combined + ".prev")
+        if not stats_only and not (resume and os.path.isfile(_checkpoint_path(combined, output_format))):
+          _keep_previous(combined, output_format, compression, compress_level)
 
-      docs_in_file = 0
+      jobs.append((xml_file, no_ext, combined, stats_only, cur_file, num_files, buffer_size, dtd_path, huge_tree, engine, output_format, shard_records, shard_bytes, compression, compress_level, index_path, checkpoint_interval, resume, timer is not None))
 
-      log.debug("processing: " + nzfile + " (" + str(cur_file) + "/" + str(num_files) + ")")
+  if metrics is None:
+    metrics = Metrics()
 
-      try:
-        for event, document in etree.iterparse(nzfile, load_dtd=True, no_network=False, tag="document"):
-          record, stats = process_document(document)
-          docs_in_file += 1
-          all_stats['num'] += 1
+  metrics.num_files = len(jobs)
 
-          for topic, values in stats.items():
-            if type(values) is dict:
-              if topic not in all_stats:
-                all_stats[topic] = {}
+  if workers > 1 and len(jobs) == 1 and not jobs[0][0].endswith(".gz"):
+    xml_file, no_ext, combined, stats_only = jobs[0][:4]
+    result = _handle_split_file(xml_file, no_ext, combined, stats_only, workers, buffer_size, dtd_path, huge_tree, engine, output_format, shard_records, shard_bytes, compression, compress_level, index_path, checkpoint_interval, resume, timer, metrics)
 
-              for k, val in values.items():
-                if k not in all_stats[topic]:
-                  all_stats[topic][k] = {}
+    if file_results is not None:
+      file_results[os.path.basename(xml_file)] = result
 
-                if type(val) is list:
-                  for v in val:
-                    if v not in all_stats[topic][k]:
-                      all_stats[topic][k][v] = 1
+    all_stats.merge(result['stats'])
+    all_warnings.merge(result['warning_summary'])
+    index_summary.merge(result['index'])
+    num_warn += result['warnings']
+    peak_rss = result['peak_rss']
 
-                    else:
-                      all_stats[topic][k][v] += 1
+  elif workers > 1 and len(jobs) > 1:
+    log.debug("Distributing " + str(len(jobs)) + " files to " + str(workers) + " worker processes..")
 
-                elif type(val) is int:
-                  if str(val) not in all_stats[topic][k]:
-                    all_stats[topic][k][str(val)] = 1
+    with _worker_pool(workers) as executor:
+      futures = [executor.submit(_handle_file, *job) for job in jobs]
 
-                  else:
-                    all_stats[topic][k][str(val)] += 1
+      for job, future in zip(jobs, futures):
+        result = future.result()
 
-                elif type(val) is str:
-                  if val not in all_stats[topic][k]:
-                    all_stats[topic][k][val] = 1
+        if timer is not None:
+          timer.merge(result['profile'])
+          timer.start()
 
-                  else:
-                    all_stats[topic][k][val] += 1
+        metrics.cur_file = job[4]
+        metrics.file_name = os.path.basename(job[0])
+        metrics.merge(result['metrics'])
 
-                else:
-                  log.error("Could not process stats for " + topic + " -> " + k)
+        if file_results is not None:
+          file_results[metrics.file_name] = result
+
+        all_stats.merge(result['stats'])
+        all_warnings.merge(result['warning_summary'])
+        index_summary.merge(result['index'])
+        num_warn += result['warnings']
+        peak_rss = max(peak_rss, result['peak_rss'])
 
-            else:
-              log.error("Problem identifying stats for " + topic)
+        if timer is not None:
+          timer.lap('merge')
 
-          if not stats_only:
-            try:
-              write_to_file(record, docs_in_file, combined)
+  else:
+    for job in jobs:
+      result = _handle_file(*job, metrics=metrics)
 
-            except:
-              log.error("Problem writing to file.")
-              log.error(sys.exc_info()[0])
+      if file_results is not None:
+        file_results[os.path.basename(job[0])] = result
 
-          document.clear()
+      if timer is not None:
+        timer.merge(result['profile'])
+        timer.start()
 
-        log.debug("Processed " + str(docs_in_file) + " documents in file " + file + "!")
+      all_stats.merge(result['stats'])
+      all_warnings.merge(result['warning_summary'])
+      index_summary.merge(result['index'])
+      num_warn += result['warnings']
+      peak_rss = max(peak_rss, result['peak_rss'])
 
-      except etree.XMLSyntaxError as e:
-        num_warn += 1
-        log.error("Error while parsing: " + no_ext)
-        log.error(e)
+      if timer is not None:
+        timer.lap('merge')
 
-      except:
-        log.error("Unexpected error in " + no_ext + ": " + str(sys.exc_info()[0]))
-        raise
-        pass
+  if index is not None:
+    index_summary.log_summary()
+
+    if not stats_only:
+      index.update(index_summary.entries)
+
+    index.close()
+
+  if checkpoint_interval:
+    for job in jobs:
+      checkpoint = _checkpoint_path(job[2], output_format)
+
+      if os.path.isfile(checkpoint):
+        os.remove(checkpoint)
+
+  if timer is not None:
+    timer.lap('merge')
+
+  return [all_stats, num_warn, cur_file, peak_rss, all_warnings.to_dict(), index_summary.to_dict()]
 
-      if os.path.exists(nzfile) and os.path.exists(nzfile + ".gz"):
-        os.remove(nzfile)
 
-  return [all_stats, num_warn, cur_file]
+# Partitions
+
+def _dump_json(fpath, data):
+  """
+  Schreibt eine JSON-Datei atomar (über eine temporäre Datei), sodass andere Prozesse nie eine halb geschriebene
+  Datei lesen.
+
+  :param fpath: Der Dateiname inklusive Pfad
+  :type fpath: str
+  :param data: Die zu schreibenden Daten
+  :type data: dict
+  """
+
+  with open(fpath + ".tmp", 'w') as f:
+    json.dump(data, f)
+
+  os.replace(fpath + ".tmp", fpath)
+
+
+def plan_partitions(xml_path, num_partitions):
+  """
+  Teilt die XML-Dateien eines Verzeichnisses in `num_partitions` Partitionen mit möglichst gleicher Gesamtgröße, die
+  unabhängig voneinander (z.B. auf mehreren Rechnern) mit '--partition' konvertiert werden können.
+
+  Die Dateien werden absteigend nach Größe jeweils der bisher kleinsten Partition zugeteilt. Maßgeblich ist die
+  Größe auf der Festplatte, mit gzip komprimierte Dateien werden also unterschätzt.
+
+  :param xml_path: Das Verzeichnis mit den XML-Dateien
+  :type xml_path: str
+  :param num_partitions: Die Anzahl an Partitionen
+  :type num_partitions: int
+  :returns: dict -- das Manifest: die Dateien mit Größe und Partition (in der Reihenfolge, in der `handle_xml()` sie verarbeitet) und je Partition die Dateinamen und die Gesamtgröße
+  """
+
+  files = []
+
+  for file in os.listdir(xml_path):
+    if file.endswith((".xml", ".XML", "XML.gz")):
+      files.append({'name': file, 'size': os.path.getsize(os.path.join(xml_path, file))})
+
+  partitions = [{'files': [], 'bytes': 0} for num in range(num_partitions)]
+
+  for entry in sorted(files, key=lambda f: (-f['size'], f['name'])):
+    num = min(range(num_partitions), key=lambda k: partitions[k]['bytes'])
+    partitions[num]['files'].append(entry['name'])
+    partitions[num]['bytes'] += entry['size']
+    entry['partition'] = num + 1
+
+  return {
+    'created': '{:%Y-%m-%d %H:%M:%S}'.format(datetime.datetime.now()),
+    'input': os.path.abspath(xml_path),
+    'files': files,
+    'partitions': partitions
+  }
+
+
+def _fragment_path(plan_path, partition):
+  """
+  Gibt den Dateinamen des Statistik-Fragments einer Partition zurück, das neben dem Manifest liegt
+  (z.B. 'partitions_2.json').
+
+  :param plan_path: Der Dateiname des Manifests
+  :type plan_path: str
+  :param partition: Die Nummer der Partition (ab 1)
+  :type partition: int
+  :returns: str
+  """
+
+  base, ext = os.path.splitext(plan_path)
+
+  return base + "_" + str(partition) + (ext or ".json")
+
+
+def _save_fragment(fpath, plan, partition, file_results, runtime, peak_rss):
+  """
+  Schreibt das Statistik-Fragment einer Partition: je Datei die Statistiken (`StatsAccumulator.to_state()`), die
+  Warnungen und die Ergebnisse des Index, damit `merge_partitions()` sie in der Reihenfolge des Manifests
+  zusammenführen kann.
+
+  :param fpath: Der Dateiname des Fragments
+  :type fpath: str
+  :param plan: Das Manifest aus `plan_partitions()`
+  :type plan: dict
+  :param partition: Die Nummer der Partition (ab 1)
+  :type partition: int
+  :param file_results: Die Ergebnisse von `_handle_file()` je Dateiname (aus `handle_xml()`)
+  :type file_results: dict
+  :param runtime: Die Laufzeit der Partition
+  :type runtime: str
+  :param peak_rss: Der höchste Speicherbedarf in MiB
+  :type peak_rss: float
+  """
+
+  _dump_json(fpath, {
+    'created': plan['created'],
+    'partition': partition,
+    'runtime': runtime,
+    'peak_rss_mib': peak_rss,
+    'files': [{
+      'name': name,
+      'docs': result['docs'],
+      'warnings': result['warnings'],
+      'stats': result['stats'].to_state(),
+      'record_warnings': result['warning_summary'].to_dict(),
+      'index': result['index'].to_dict()
+    } for name, result in file_results.items()]
+  })
+
+
+def merge_partitions(plan, fragments):
+  """
+  Führt die Statistik-Fragmente der Partitionen eines Manifests zusammen.
+
+  Die Ergebnisse werden Datei für Datei in der Reihenfolge des Manifests addiert. Das Ergebnis hängt damit weder von
+  der Reihenfolge der Fragmente noch von der Verteilung der Dateien ab und entspricht dem eines einzelnen Laufs über
+  das ganze Verzeichnis.
+
+  :param plan: Das Manifest aus `plan_partitions()`
+  :type plan: dict
+  :param fragments: Die Fragmente der Partitionen
+  :type fragments: list
+  :returns: list -- wie bei `handle_xml()` die Statistiken, die Anzahl an Warnungen und Dateien, der höchste Speicherbedarf in MiB, die gesammelten Warnungen zu einzelnen Titeln und die Ergebnisse des Index
+  """
+
+  all_stats = StatsAccumulator()
+  all_warnings = WarningSummary()
+  index_counts = collections.Counter()
+  num_warn = 0
+  num_files = 0
+  peak_rss = 0
+  entries = {}
+
+  for fragment in fragments:
+    peak_rss = max(peak_rss, fragment['peak_rss_mib'])
+
+    for entry in fragment['files']:
+      entries[entry['name']] = entry
+
+  for file in plan['files']:
+    entry = entries.get(file['name'])
+
+    if entry is None:
+      log.warning(file['name'] + " was not converted in partition " + str(file['partition']) + "!")
+      continue
+
+    num_files += 1
+    all_stats.merge(StatsAccumulator.from_state(entry['stats']))
+    all_warnings.merge(WarningSummary.from_dict(entry['record_warnings']))
+    index_counts.update(entry['index'])
+    num_warn += entry['warnings']
+
+  return [all_stats, num_warn, num_files, peak_rss, all_warnings.to_dict(), dict(sorted(index_counts.items()))]
+
 
 # MAIN
 
 def main(argv):
   """
-  Entpackt Dateien und startet die Konvertierung und Erstellung von Statistiken
+  Ermittelt die Eingabedateien und startet die Konvertierung und Erstellung von Statistiken
   
   :param argv: Die beim Programmstart übergebenen Parameter
   :type argv: list
@@ -1165,6 +4746,35 @@ def main(argv):
   stats_only = False
   no_stats = False
   is_update = False
+  workers = 1
+  buffer_size = Constants.WRITE_BUFFER_SIZE
+  dtd_path = Constants.DTD_PATH
+  huge_tree = False
+  engine = Constants.ENGINE
+  output_format = Constants.OUTPUT_FORMAT
+  shard_records = 0
+  shard_bytes = 0
+  compression = None
+  compress_level = None
+  index_path = ""
+  checkpoint_interval = Constants.CHECKPOINT_INTERVAL
+  resume = False
+  num_partitions = 0
+  partition = 0
+  plan_path = Constants.PLAN_FNAME
+  plan = None
+  partition_files = None
+  file_results = None
+  fragments = None
+  stats_paths = []
+  timer = None
+  profile_dump = ""
+  cprofile = None
+  metrics_file = ""
+  metrics_port = None
+  metrics_interval = Constants.METRICS_INTERVAL
+  metrics = None
+  exporter = None
   last_run = {}
 
   os.nice(1)
@@ -1172,6 +4782,10 @@ def main(argv):
   if '--help' in argv or '-h' in argv:
     print(Constants.USAGE_STRING)
     sys.exit()
+
+  if '--update_languages' in argv:
+    update_language_table()
+    sys.exit()
       
   for idx, arg in enumerate(argv):
     if arg == '--in' and len(argv) >= idx+1 and os.path.exists(argv[idx+1]):
@@ -1192,10 +4806,248 @@ def main(argv):
         log.error("Output path does not exist, or multiple paths were supplied!")
         sys.exit()
 
+    if arg == '--workers' and len(argv) > idx+1:
+      if argv[idx+1].isdigit() and int(argv[idx+1]) > 0:
+        workers = int(argv[idx+1])
+      else:
+        print(argv)
+        log.error("Number of workers has to be a positive integer!")
+        sys.exit()
+
+    if arg == '--buffer_size' and len(argv) > idx+1:
+      if argv[idx+1].isdigit() and int(argv[idx+1]) > 0:
+        buffer_size = int(argv[idx+1])
+      else:
+        print(argv)
+        log.error("Buffer size has to be a positive integer!")
+        sys.exit()
+
+    if arg == '--profile_dump' and len(argv) > idx+1:
+      if os.path.isdir(os.path.dirname(os.path.abspath(argv[idx+1]))):
+        profile_dump = argv[idx+1]
+      else:
+        print(argv)
+        log.error("Directory for the profile dump does not exist!")
+        sys.exit()
+
+    if arg == '--metrics_file' and len(argv) > idx+1:
+      if os.path.isdir(os.path.dirname(os.path.abspath(argv[idx+1]))):
+        metrics_file = argv[idx+1]
+      else:
+        print(argv)
+        log.error("Directory for the metrics file does not exist!")
+        sys.exit()
+
+    if arg == '--metrics_port' and len(argv) > idx+1:
+      if argv[idx+1].isdigit() and 0 < int(argv[idx+1]) < 65536:
+        metrics_port = int(argv[idx+1])
+      else:
+        print(argv)
+        log.error("Metrics port has to be a number between 1 and 65535!")
+        sys.exit()
+
+    if arg == '--metrics_interval' and len(argv) > idx+1:
+      if argv[idx+1].isdigit() and int(argv[idx+1]) > 0:
+        metrics_interval = int(argv[idx+1])
+      else:
+        print(argv)
+        log.error("Metrics interval has to be a positive integer!")
+        sys.exit()
+
+    if arg == '--format' and len(argv) > idx+1:
+      if argv[idx+1] in SERIALIZERS:
+        output_format = argv[idx+1]
+      else:
+        print(argv)
+        log.error("Output format has to be one of: " + ", ".join(sorted(SERIALIZERS)) + "!")
+        sys.exit()
+
+    if arg == '--shard_records' and len(argv) > idx+1:
+      if argv[idx+1].isdigit() and int(argv[idx+1]) > 0:
+        shard_records = int(argv[idx+1])
+      else:
+        print(argv)
+        log.error("Number of records per shard has to be a positive integer!")
+        sys.exit()
+
+    if arg == '--shard_bytes' and len(argv) > idx+1:
+      if argv[idx+1].isdigit() and int(argv[idx+1]) > 0:
+        shard_bytes = int(argv[idx+1])
+      else:
+        print(argv)
+        log.error("Shard size has to be a positive integer!")
+        sys.exit()
+
+    if arg == '--compress' and len(argv) > idx+1:
+      if argv[idx+1] in Constants.COMPRESSION_EXTENSIONS:
+        compression = argv[idx+1]
+      else:
+        print(argv)
+        log.error("Compression has to be one of: " + ", ".join(sorted(Constants.COMPRESSION_EXTENSIONS)) + "!")
+        sys.exit()
+
+    if arg == '--compress_level' and len(argv) > idx+1:
+      if argv[idx+1].isdigit() and int(argv[idx+1]) > 0:
+        compress_level = int(argv[idx+1])
+      else:
+        print(argv)
+        log.error("Compression level has to be a positive integer!")
+        sys.exit()
+
+    if arg == '--index' and len(argv) > idx+1:
+      if os.path.isdir(os.path.dirname(os.path.abspath(argv[idx+1]))):
+        index_path = argv[idx+1]
+      else:
+        print(argv)
+        log.error("Directory for the document index does not exist!")
+        sys.exit()
+
+    if arg == '--checkpoint_interval' and len(argv) > idx+1:
+      if argv[idx+1].isdigit() and int(argv[idx+1]) > 0:
+        checkpoint_interval = int(argv[idx+1])
+      else:
+        print(argv)
+        log.error("Checkpoint interval has to be a positive integer!")
+        sys.exit()
+
+    if arg == '--plan' and len(argv) > idx+1:
+      if argv[idx+1].isdigit() and int(argv[idx+1]) > 0:
+        num_partitions = int(argv[idx+1])
+      else:
+        print(argv)
+        log.error("Number of partitions has to be a positive integer!")
+        sys.exit()
+
+    if arg == '--partition' and len(argv) > idx+1:
+      if argv[idx+1].isdigit() and int(argv[idx+1]) > 0:
+        partition = int(argv[idx+1])
+      else:
+        print(argv)
+        log.error("Partition has to be a positive integer!")
+        sys.exit()
+
+    if arg == '--plan_file' and len(argv) > idx+1:
+      if os.path.isdir(os.path.dirname(os.path.abspath(argv[idx+1]))):
+        plan_path = argv[idx+1]
+      else:
+        print(argv)
+        log.error("Directory for the partition plan does not exist!")
+        sys.exit()
+
+    if arg == '--merge_stats':
+      for value in itertools.takewhile(lambda a: not a.startswith('--'), argv[idx+1:]):
+        if os.path.exists(value):
+          stats_paths.append(value)
+        else:
+          print(argv)
+          log.error("Stats to merge have to be existing files or directories!")
+          sys.exit()
+
+      if not stats_paths:
+        print(argv)
+        log.error("No stats to merge were supplied!")
+        sys.exit()
+
+    if arg == '--dtd' and len(argv) > idx+1:
+      if os.path.isdir(argv[idx+1]):
+        dtd_path = argv[idx+1]
+      else:
+        print(argv)
+        log.error("DTD catalog path does not exist!")
+        sys.exit()
+
+    if arg == '--engine' and len(argv) > idx+1:
+      if argv[idx+1] in Constants.ENGINES:
+        engine = argv[idx+1]
+      else:
+        print(argv)
+        log.error("Engine has to be one of: " + ", ".join(Constants.ENGINES) + "!")
+        sys.exit()
+
+  if compress_level is not None and (compression is None or compress_level > Constants.MAX_COMPRESS_LEVELS[compression]):
+    log.error("Compression level needs '--compress' and must not exceed " + str(Constants.MAX_COMPRESS_LEVELS.get(compression)) + "!")
+    sys.exit()
+
+  if compression == 'zstd':
+    try:
+      import zstandard
+
+    except ImportError:
+      log.error("zstd compression needs the 'zstandard' package!")
+      sys.exit()
+
+  if (partition or '--merge' in argv) and not num_partitions:
+    if not os.path.isfile(plan_path):
+      log.error("Partition plan " + plan_path + " not found, create it with '--plan N'!")
+      sys.exit()
+
+    with open(plan_path) as f:
+      plan = json.load(f)
+
+  if partition and plan is not None:
+    if partition > len(plan['partitions']) or xml_filename:
+      log.error("Partition has to be between 1 and " + str(len(plan['partitions'])) + " and needs the input directory of the plan!")
+      sys.exit()
+
+    if not xml_path:
+      xml_path = plan['input']
+
+    partition_files = plan['partitions'][partition - 1]['files']
+    file_results = {}
+    log.debug("Converting partition " + str(partition) + "/" + str(len(plan['partitions'])) + " of " + plan_path + "..")
+
+  if '--merge' in argv and plan is not None:
+    fragments = []
+
+    for num in range(1, len(plan['partitions']) + 1):
+      fragment_path = _fragment_path(plan_path, num)
+
+      if not os.path.isfile(fragment_path):
+        log.error("Stats fragment " + fragment_path + " of partition " + str(num) + " not found, convert it with '--partition " + str(num) + "'!")
+        sys.exit()
+
+      with open(fragment_path) as f:
+        fragment = json.load(f)
+
+      if fragment['created'] != plan['created']:
+        log.error("Stats fragment " + fragment_path + " belongs to another plan!")
+        sys.exit()
+
+      fragments.append(fragment)
+
+  if stats_paths:
+    stats_files = _find_stats(stats_paths)
+
+    if not stats_files:
+      log.error("No " + Constants.STATS_FNAME + " found in " + ", ".join(stats_paths) + "!")
+      sys.exit()
+
+    try:
+      all_stats, num_files = merge_stats(stats_files)
+
+    except (OSError, ValueError, KeyError, TypeError) as e:
+      log.error("Could not read stats: " + str(e))
+      sys.exit()
+
+    prepare_stats(all_stats.to_dict(), Constants.MERGED_STATS_PATH)
+    save_stats(all_stats, Constants.MERGED_STATS_PATH + current_date + '/' + Constants.STATS_FNAME, num_files, stats_files)
+    log.info("Merged " + str(len(stats_files)) + " stats with " + str(all_stats.num) + " records into " + Constants.MERGED_STATS_PATH + current_date + '/')
+    sys.exit()
+
   if not xml_path:
     log.debug("No path given, using current directory..")
     xml_path = '.'
 
+  if num_partitions:
+    if xml_filename:
+      log.error("Planning partitions needs an input directory!")
+      sys.exit()
+
+    plan = plan_partitions(xml_path, num_partitions)
+    _dump_json(plan_path, plan)
+    log.info("Wrote plan for " + str(len(plan['files'])) + " files to " + plan_path + ": " + ", ".join(str(len(p['files'])) + " files/" + str(p['bytes']) + " bytes" for p in plan['partitions']))
+    sys.exit()
+
   if xml_filename and not xml_filename.endswith(('.xml', '.XML','.XML.gz')):
     log.error("Filename has to end with .xml/.XML/.XML.gz")
     sys.exit()
@@ -1206,42 +5058,13 @@ def main(argv):
   if not xml_filename:
     for file in os.listdir(xml_path):
       if file.endswith((".xml",".XML",".XML.gz")):
-        if file.endswith(".XML.gz"):
-          
-          zfile = os.path.join(xml_path, file)
-          no_gz_ext = file[:file.rfind('.')]
-          nzfile = os.path.join(xml_path, no_gz_ext)
-          
-          if not os.path.exists(nzfile):
-            num_files += 1
-          
-          else:
-            log.debug("Decompressed file already exists..")
-        else:
-          num_files += 1
-            
-  else:
-    if xml_filename.endswith(".XML.gz"):
-      log.debug("Handling compressed file " + xml_filename)
-      
-      zfile = os.path.join(xml_path, xml_filename)
-      no_gz_ext = xml_filename[:xml_filename.rfind('.')]
-      nzfile = os.path.join(xml_path, no_gz_ext)
-      
-      if not os.path.exists(nzfile):
-        
-        log.debug("Decompressing file " + xml_filename)
-        
-        with gzip.GzipFile(zfile, 'rb') as inF:
-          with open(nzfile, 'wb') as outF:
-            s = inF.read()
-            outF.write(s)
-            
-      else:
-        log.debug("Found existing decompressed file..")
-          
-      xml_filename = no_gz_ext
-  
+        num_files += 1
+
+  elif xml_filename.endswith(".XML.gz"):
+    log.debug("Streaming compressed file " + xml_filename)
+
+  if partition_files is not None:
+    num_files = len(partition_files)
 
   if not xml_filename:
     log.debug("Found " + str(num_files) + " XML files!")
@@ -1261,46 +5084,135 @@ def main(argv):
     log.debug("Writing to subfolder..")
     is_update = True
 
-  gathered_stats, num_warn, cur_file = handle_xml(xml_path, xml_filename, num_files, stats_only, is_update, out_path)
+  if '--resume' in argv:
+    if stats_only or compression:
+      log.error("Resuming needs uncompressed output files (not with '--stats_only' or '--compress')!")
+      sys.exit()
+
+    log.debug("Resuming from checkpoints..")
+    resume = True
+
+  if '--huge_tree' in argv:
+    log.debug("Lifting parser limits for huge documents..")
+    huge_tree = True
+
+  if engine == 'target':
+    if index_path:
+      log.error("The document index needs the parsed tree of each document (not with '--engine target')!")
+      sys.exit()
+
+    log.debug("Building records directly from parser events..")
+
+  if workers > 1:
+    log.debug("Using " + str(workers) + " worker processes..")
+
+  if '--profile' in argv:
+    log.debug("Measuring time per stage..")
+    timer = Profiler()
+
+  if metrics_file or metrics_port is not None:
+    metrics = Metrics()
+    exporter = MetricsExporter(metrics, metrics_file, metrics_port, metrics_interval)
+
+    try:
+      exporter.start()
+
+    except OSError as e:
+      log.error("Could not start metrics exporter: " + str(e))
+      sys.exit()
+
+  if profile_dump:
+    cprofile = cProfile.Profile()
+    cprofile.enable()
+
+  try:
+    if fragments is not None:
+      log.debug("Merging stats of " + str(len(fragments)) + " partitions..")
+      all_stats, num_warn, cur_file, peak_rss, record_warnings, index_counts = merge_partitions(plan, fragments)
+      last_run['partitions'] = [{'partition': f['partition'], 'files': len(f['files']), 'runtime': f['runtime'], 'peak_rss_mib': f['peak_rss_mib']} for f in fragments]
+
+    else:
+      all_stats, num_warn, cur_file, peak_rss, record_warnings, index_counts = handle_xml(xml_path, xml_filename, num_files, stats_only, is_update, out_path, workers, buffer_size, dtd_path, huge_tree, engine, output_format, shard_records, shard_bytes, compression, compress_level, index_path, checkpoint_interval, resume, timer, metrics, partition_files, file_results)
+
+  finally:
+    if exporter is not None:
+      exporter.stop()
 
   if xml_filename:
     if cur_file == 0:
       log.error("File not found!")
 
     else:
-      no_ext = xml_filename[:xml_filename.rfind('.')]
+      no_ext = _strip_extensions(xml_filename)
 
-  if not no_stats and cur_file > 0:
+  if not no_stats and cur_file > 0 and not partition:
     if xml_filename:
       adjusted_stats_path += no_ext + "/"
 
     os.makedirs(adjusted_stats_path, exist_ok=True)
     log.debug("Generating stats..")
 
+    if timer is not None:
+      timer.start()
+
     try:
-      prepare_stats(gathered_stats, adjusted_stats_path)
+      prepare_stats(all_stats.to_dict(), adjusted_stats_path)
+      save_stats(all_stats, adjusted_stats_path + current_date + '/' + Constants.STATS_FNAME, cur_file)
 
     except:
       log.error("Unexpected error creating stats:", sys.exc_info()[0])
 
+    if timer is not None:
+      timer.lap('prepare_stats')
+
+  if cprofile is not None:
+    cprofile.disable()
+    cprofile.dump_stats(profile_dump)
+    log.debug("Wrote cProfile data to " + profile_dump + " (view with 'python3 -m pstats " + profile_dump + "')")
+
   run_time = str(datetime.timedelta(seconds=(int(time.time()) - start_time)))
   last_run['date'] = current_date
   last_run['runtime'] = run_time
-  last_run['records'] = gathered_stats['num']
+  last_run['records'] = all_stats.num
   last_run['files'] = cur_file
+  last_run['peak_rss_mib'] = peak_rss
 
   log.debug('End: {:%Y-%m-%d %H:%M:%S}'.format(datetime.datetime.now()))
-  log.debug('Processed ' + str(gathered_stats['num']) + " records in " + str(cur_file) + " files!")
+  log.debug('Processed ' + str(all_stats.num) + " records in " + str(cur_file) + " files!")
+  log.debug('Peak RSS: ' + str(peak_rss) + " MiB")
+
+  if timer is not None:
+    timer.log_summary()
+    last_run['profile'] = timer.to_dict()
+
+  if record_warnings:
+    last_run['record_warnings'] = record_warnings
+
+  if index_counts:
+    last_run['index'] = index_counts
 
   if num_warn > 0:
     log.warning('Problems with standard DTD: ' + str(num_warn))
     last_run['warnings'] = num_warn
 
-  with open("last_run.json", "w+") as lr:
-    json.dump(last_run, lr)
+  if partition:
+    # Die Statistiken einer Partition werden erst mit '--merge' ausgewertet
+    fragment_path = _fragment_path(plan_path, partition)
+    _save_fragment(fragment_path, plan, partition, file_results, run_time, peak_rss)
+    log.info("Wrote stats fragment " + fragment_path + ", combine all partitions with '--merge'")
+
+  else:
+    with open("last_run.json", "w+") as lr:
+      json.dump(last_run, lr)
 
 if __name__ == "__main__":
-    main(sys.argv)
+    _start_log_listener()
+
+    try:
+      main(sys.argv)
+
+    finally:
+      _stop_log_listener()
 
 
 